@@ -0,0 +1,101 @@
+"""
+Measures the memory taken by a parsed AST of about 100k nodes, the time to
+walk it, reading every field of every node, and the time to hash it, the
+first time and once the hashes are cached. The same program is then parsed
+with an Interner, sharing its equal subtrees, and stored flat, in a FlatAST,
+and walked through its cursors.
+
+    python benchmarks/ast_memory.py [--nodes 100000] [--repeat 5]
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from stream import Stream, Lexer, Parser
+from utils.flatast import FlatAST
+from utils.interner import Interner
+
+
+def name(i: int) -> str:
+    return "v" + "".join(chr(ord("a") + int(digit)) for digit in str(i))
+
+
+def program(statements: int) -> str:
+    lines = ["declare va = 1;", "declare vb = 2;"]
+    for i in range(2, statements):
+        lines.append(f"declare {name(i)} = ({name(i - 1)} + {i}) * {i % 7 + 1} - {name(i - 2)};")
+    return "\n".join(lines)
+
+
+def walk(node) -> int:
+    """
+    Counts the nodes of an AST, reading each of their fields.
+    """
+    count = 1
+    for field in node.__match_args__:
+        value = getattr(node, field)
+        if isinstance(value, list):
+            for element in value:
+                if hasattr(element, "__match_args__"):
+                    count += walk(element)
+        elif hasattr(value, "__match_args__"):
+            count += walk(value)
+    return count
+
+
+def traced(build):
+    """
+    Builds something, and returns it with the memory it takes.
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    built = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return built, size
+
+
+def timed(function, statements) -> float:
+    start = time.perf_counter()
+    for statement in statements:
+        function(statement)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--nodes", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    opts = parser.parse_args()
+
+    # Each declaration is 9 nodes.
+    source = program(opts.nodes // 9 + 1)
+    statements, size = traced(lambda: list(Parser.from_lexer(Lexer.from_stream(Stream.from_string(source)))))
+    nodes = sum(walk(statement) for statement in statements)
+    walked = min(timed(walk, statements) for _ in range(opts.repeat))
+    print(f"{nodes} nodes: {size / 1e6:.1f} MB, {size / nodes:.0f} bytes per node, walked in {walked * 1000:.1f} ms")
+    hashed = timed(hash, statements)
+    cached = min(timed(hash, statements) for _ in range(opts.repeat))
+    print(f"hashed in {hashed * 1000:.1f} ms, and in {cached * 1000:.2f} ms once cached")
+
+    del statements
+    interner = Interner()
+    start = time.perf_counter()
+    statements, size = traced(lambda: list(Parser.from_lexer(Lexer.from_stream(Stream.from_string(source)), interner)))
+    print(f"interned: {size / 1e6:.1f} MB, {size / nodes:.0f} bytes per node, parsed in {time.perf_counter() - start:.2f}s; {interner.report()}")
+
+    del statements, interner
+    tree, size = traced(lambda: FlatAST.from_nodes(Parser.from_lexer(Lexer.from_stream(Stream.from_string(source)))))
+    walked = min(timed(walk, tree) for _ in range(opts.repeat))
+    print(f"flat: {size / 1e6:.1f} MB, {size / nodes:.0f} bytes per node ({tree.nbytes() / nodes:.0f} in columns), walked in {walked * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Measures the time of a call to a top-level function from inside nested
+loops of another function, where finding the function by name means walking
+the frames of every loop and call around the call site.
+
+    python benchmarks/call_sites.py [--n 30] [--depth 20] [--repeat 3] [--engines tree,closure,stack]
+
+The loops run inside a function called depth levels deep, and make n cubed
+calls.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core import RuntimeEnvironment
+from interpreter import get_evaluator
+from stream import Stream, Lexer, Parser
+
+PROGRAM = """
+deffunct square(x) { functret(x * x); };
+deffunct loops(n) {
+    declare total = 0;
+    for i in range(1, n) do { for j in range(1, n) do { for k in range(1, n) do { assign total = total + callfun square(k);; }; }; };
+    functret(total);
+};
+deffunct nest(d, n) { if d == 0 then functret(callfun loops(n);); else functret(callfun nest(d - 1, n);); ; };
+"""
+
+
+def parse(source: str) -> list:
+    return list(Parser.from_lexer(Lexer.from_stream(Stream.from_string(source))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--n", type=int, default=30)
+    parser.add_argument("--depth", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--engines", type=str, default="tree,closure,stack")
+    opts = parser.parse_args()
+
+    call = parse(f"callfun nest({opts.depth}, {opts.n});")[0]
+    expected = opts.n * opts.n * opts.n * (opts.n + 1) * (2 * opts.n + 1) // 6
+    for engine in opts.engines.split(","):
+        evaluate = get_evaluator(RuntimeEnvironment(), engine)
+        for statement in parse(PROGRAM):
+            evaluate(statement)
+        best = float("inf")
+        for _ in range(opts.repeat):
+            start = time.perf_counter()
+            assert evaluate(call) == expected
+            best = min(best, time.perf_counter() - start)
+        print(f"{engine:>7}: {best / opts.n ** 3 * 1e6:.2f} us per iteration")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Measures the runs per second of a small program embedded in Python, compiled
+once with gossip.compile and run with fresh bindings each time, against
+lexing and parsing it again for every run.
+
+    python benchmarks/embedding.py [--runs 10000] [--engines tree,closure]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import gossip
+from core import RuntimeEnvironment
+from interpreter import get_evaluator
+from stream import Stream, Lexer, Parser
+
+SOURCE = """
+declare rate = base / 100;
+declare price = amount + amount * rate;
+if price > limit then limit else price ;
+"""
+
+
+def reparsed(engine: str, bindings: dict):
+    runtime = RuntimeEnvironment()
+    for name, value in bindings.items():
+        runtime.bind(name, value)
+    evaluate = get_evaluator(runtime, engine)
+    for statement in Parser.from_lexer(Lexer.from_stream(Stream.from_string(SOURCE))):
+        result = evaluate(statement)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10_000)
+    parser.add_argument("--engines", type=str, default="tree,closure")
+    opts = parser.parse_args()
+
+    bindings = [{"amount": i % 500, "base": 20, "limit": 400} for i in range(opts.runs)]
+    for engine in opts.engines.split(","):
+        program = gossip.compile(SOURCE, engine=engine)
+        start = time.perf_counter()
+        compiled = [program.run(b) for b in bindings]
+        once = time.perf_counter() - start
+
+        start = time.perf_counter()
+        assert [reparsed(engine, b) for b in bindings] == compiled
+        every = time.perf_counter() - start
+        print(f"{engine:>7}: compiled once {opts.runs / once:,.0f} runs/s, parsed every run {opts.runs / every:,.0f} runs/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Measures the frames allocated and the peak memory of the nested range loops
+from tests.txt, with the runtime's FramePool, and with a pool which allocates
+a frame for every scope opened, as the runtime did before.
+
+    python benchmarks/frames.py [--end 999] [--engines tree,closure]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core import RuntimeEnvironment, FramePool, Frame
+from interpreter import get_evaluator
+from stream import Stream, Lexer, Parser
+
+PROGRAM = """
+deffunct check(n){declare m = 0; declare r = n;declare q = 1; while r>0 do {assign m = m*q+r%10; assign r = r - r%10; assign r = r/10; if q==1 then assign q = 10;}; functret(m);};
+declare n  = 3; declare m = 0; for i in range(100,END) do { for j in range(100,END) do {declare prod = i*j;declare a = callfun check(prod);;if prod > m && prod == a then assign m = prod;};};print(m);
+"""
+
+
+class FreshFrame(Frame):
+    """
+    A frame which replaces its arrays instead of resetting them.
+    """
+    __slots__ = ("pool",)
+
+    def reset(self):
+        self.pool.allocated += 1
+        Frame.__init__(self, self.scope, self.parent)
+
+
+class FreshIterations(FramePool):
+    """
+    Allocates a new frame whenever a scope is opened, including for every
+    iteration of a loop, as the runtime did before frames were pooled.
+    """
+    def acquire(self, scope, parent):
+        self.allocated += 1
+        frame = FreshFrame(scope, parent)
+        frame.pool = self
+        return frame
+
+    def release(self, frame):
+        pass
+
+
+def run(source: str, engine: str, pool: FramePool, trace: bool):
+    statements = list(Parser.from_lexer(Lexer.from_stream(Stream.from_string(source))))
+    runtime = RuntimeEnvironment()
+    runtime.frames = pool
+    evaluate = get_evaluator(runtime, engine)
+
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        for statement in statements:
+            evaluate(statement)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] if trace else 0
+    if trace:
+        tracemalloc.stop()
+    return elapsed, peak, pool.allocated, out.getvalue().split()[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--end", type=int, default=139, help="upper bound of both ranges; tests.txt uses 999.")
+    parser.add_argument("--engines", default="tree,closure")
+    opts = parser.parse_args()
+
+    source = PROGRAM.replace("END", str(opts.end))
+    print(f"{'engine':8} {'frames':14} {'allocated':>10} {'peak KiB':>10} {'time s':>8}  result")
+    for engine in opts.engines.split(","):
+        for label, pool in (("per iteration", FreshIterations), ("pooled", FramePool)):
+            _, peak, allocated, result = run(source, engine, pool(), trace=True)
+            elapsed, _, _, _ = run(source, engine, pool(), trace=False)
+            print(f"{engine:8} {label:14} {allocated:>10} {peak / 1024:>10.1f} {elapsed:>8.3f}  {result}")
+
+
+if __name__ == "__main__":
+    main()
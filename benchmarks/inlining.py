@@ -0,0 +1,69 @@
+"""
+Measures loops calling small helper functions, with and without their calls
+inlined by an Inliner.
+
+    python benchmarks/inlining.py [--n 40] [--repeat 3] [--max-size 32] [--engines tree,closure,stack,bytecode]
+
+The loops make n squared calls of each helper, from a function of their own.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core import RuntimeEnvironment
+from interpreter import get_evaluator
+from stream import Stream, Lexer, Parser
+from utils.datatypes import Variable
+from utils.inliner import Inliner
+
+PROGRAM = """
+deffunct square(x) { functret(x * x); };
+deffunct clamp(x, low, high) { if x < low then functret(low); else if x > high then functret(high); else functret(x); ; ; };
+deffunct loops(n) {
+    declare total = 0;
+    for i in range(1, n) do { for j in range(1, n) do { assign total = total + callfun square(i - j); + callfun clamp(i * j, 10, 100);; }; };
+    functret(total);
+};
+declare result = callfun loops(N);;
+"""
+
+
+def parse(source: str) -> list:
+    return list(Parser.from_lexer(Lexer.from_stream(Stream.from_string(source))))
+
+
+def run(statements: list, engine: str) -> tuple[float, object]:
+    runtime = RuntimeEnvironment()
+    evaluate = get_evaluator(runtime, engine)
+    start = time.perf_counter()
+    for statement in statements:
+        evaluate(statement)
+    elapsed = time.perf_counter() - start
+    return elapsed, evaluate(Variable("result"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--n", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-size", type=int, default=32)
+    parser.add_argument("--engines", type=str, default="tree,closure,stack,bytecode")
+    opts = parser.parse_args()
+
+    statements = parse(PROGRAM.replace("N", str(opts.n)))
+    inliner = Inliner(opts.max_size)
+    inlined = inliner.inline(statements)
+    print(inliner.report())
+    for engine in opts.engines.split(","):
+        plain = min(run(statements, engine) for _ in range(opts.repeat))
+        fast = min(run(inlined, engine) for _ in range(opts.repeat))
+        assert plain[1] == fast[1]
+        calls = 2 * opts.n * opts.n
+        print(f"{engine:>8}: {plain[0] / calls * 1e6:.2f} us per call, inlined {fast[0] / calls * 1e6:.2f} us ({plain[0] / fast[0]:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Measures how quickly a large generated program of data literals starts,
+and the peak resident memory of lexing it, when it is read into a string
+and when it is mapped into memory with Stream.from_file.
+
+    python benchmarks/large_files.py [--size 100] [--modes read,mmap]
+
+Each mode runs in a process of its own, so that its peak memory is its own.
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from stream import Stream, Lexer, Parser
+
+
+def name(i: int) -> str:
+    return "l" + "".join(chr(ord("a") + int(digit)) for digit in str(i))
+
+
+def write_program(path: str, size: int):
+    with open(path, "w") as f:
+        i = 0
+        while f.tell() < size:
+            values = ", ".join(str((i * 7919 + j) % 100000) for j in range(32))
+            f.write(f"declare {name(i)} = [{values}];\n")
+            i += 1
+
+
+def open_stream(path: str, mode: str) -> Stream:
+    if mode == "mmap":
+        return Stream.from_file(path)
+    with open(path) as f:
+        return Stream.from_string(f.read())
+
+
+def child(path: str, mode: str):
+    start = time.perf_counter()
+    stream = open_stream(path, mode)
+    next(iter(Parser.from_lexer(Lexer.from_stream(stream))))
+    first = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tokens = sum(1 for _ in Lexer.from_stream(open_stream(path, mode)))
+    lexed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:>5}: first statement in {first * 1000:.1f} ms, {tokens} tokens lexed in {lexed:.2f}s, peak RSS {peak:.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=100, help="megabytes of program to generate.")
+    parser.add_argument("--modes", type=str, default="read,mmap")
+    parser.add_argument("--child", nargs=2, metavar=("PATH", "MODE"), help=argparse.SUPPRESS)
+    opts = parser.parse_args()
+
+    if opts.child:
+        return child(*opts.child)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "data.gos")
+        write_program(path, opts.size * 1_000_000)
+        print(f"{os.path.getsize(path) / 1e6:.0f} MB program")
+        for mode in opts.modes.split(","):
+            subprocess.run([sys.executable, __file__, "--child", path, mode], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Measures the throughput of the lexer on a large source, made of the
+example programs repeated until it reaches the requested size.
+
+    python benchmarks/lexer.py [--size 1000000] [--repeat 3]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, ROOT)
+
+from stream import Stream, Lexer
+
+
+def source_of_size(size: int) -> str:
+    programs = [open(path).read() for path in sorted(glob.glob(os.path.join(ROOT, "Euler Problems", "*.gos")))]
+    programs.append(open(os.path.join(ROOT, "tests.txt")).read())
+    chunk = "\n".join(programs) + "\n"
+    return (chunk * (size // len(chunk) + 1))[:size]
+
+
+def lex(source: str) -> int:
+    return sum(1 for _ in Lexer.from_stream(Stream.from_string(source)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=1_000_000, help="characters of source to lex.")
+    parser.add_argument("--repeat", type=int, default=3)
+    opts = parser.parse_args()
+
+    source = source_of_size(opts.size)
+    best = float("inf")
+    for _ in range(opts.repeat):
+        start = time.perf_counter()
+        tokens = lex(source)
+        best = min(best, time.perf_counter() - start)
+    print(f"{len(source)} characters, {tokens} tokens in {best:.3f}s: "
+          f"{len(source) / best / 1e6:.2f} M characters/s, {tokens / best / 1e6:.2f} M tokens/s")
+
+
+if __name__ == "__main__":
+    main()
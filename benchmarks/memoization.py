@@ -0,0 +1,70 @@
+"""
+Measures programs calling pure functions again with the same arguments, a
+naive recursive Fibonacci and the palindrome search of tests.txt, with and
+without memoizing their pure functions.
+
+    python benchmarks/memoization.py [--n 20] [--end 300] [--max-entries 65536] [--engines tree,closure,stack]
+
+The products the palindrome search checks come round again only after a
+whole row of them, so it gains only from tables which hold a few rows.
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core import RuntimeEnvironment
+from interpreter import get_evaluator
+from stream import Stream, Lexer, Parser
+from utils.memo import Memo
+
+FIBONACCI = """
+deffunct fib(n) { if n < 2 then functret(n); else functret(0 + callfun fib(n - 1); + callfun fib(n - 2);); ; };
+print(callfun fib(N););
+"""
+
+PALINDROMES = """
+deffunct check(n){declare m = 0; declare r = n;declare q = 1; while r>0 do {assign m = m*q+r%10; assign r = r - r%10; assign r = r/10; if q==1 then assign q = 10;}; functret(m);};
+declare m = 0; for i in range(100,END) do { for j in range(100,END) do {declare prod = i*j;declare a = callfun check(prod);;if prod > m && prod == a then assign m = prod;};};print(m);
+"""
+
+
+def run(source: str, engine: str, memo: Memo) -> tuple[float, str]:
+    statements = list(Parser.from_lexer(Lexer.from_stream(Stream.from_string(source))))
+    evaluate = get_evaluator(RuntimeEnvironment(memo=memo), engine)
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        for statement in statements:
+            evaluate(statement)
+    return time.perf_counter() - start, output.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--n", type=int, default=20)
+    parser.add_argument("--end", type=int, default=300)
+    parser.add_argument("--max-entries", type=int, default=1 << 16)
+    parser.add_argument("--engines", type=str, default="tree,closure,stack")
+    opts = parser.parse_args()
+
+    programs = {
+        f"fib({opts.n})": FIBONACCI.replace("N", str(opts.n)),
+        f"palindromes to {opts.end}": PALINDROMES.replace("END", str(opts.end)),
+    }
+    for name, source in programs.items():
+        for engine in opts.engines.split(","):
+            plain, expected = run(source, engine, None)
+            memo = Memo(enabled=True, max_entries=opts.max_entries)
+            memoized, output = run(source, engine, memo)
+            assert output == expected
+            print(f"{name} {engine:>7}: {plain:.3f}s, memoized {memoized:.3f}s ({plain / memoized:.1f}x)")
+            print(f"{'':>{len(name) + 9}}{memo.report()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Compares the speed of the numeric modes, on numeric loops whose exact
+results have denominators which grow with every iteration.
+
+    python benchmarks/numeric_modes.py [--terms 5000] [--precision 28] [--engines tree,closure]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core import RuntimeEnvironment
+from interpreter import get_evaluator
+from stream import Stream, Lexer, Parser
+from utils.numbers import NUMERIC_MODES
+
+PROGRAMS = {
+    "harmonic": "declare s = 0; for i in range(1, TERMS) do { assign s = s + 1/i; }; print(s);",
+    "leibniz": """
+declare pi = 0; declare sign = 4; declare k = 1;
+while k < TERMS do { declare d = 2*k - 1; assign pi = pi + sign/d; assign sign = 0 - sign; assign k = k + 1; };
+print(pi);
+""",
+    "decay": "declare x = 0; for i in range(1, TERMS) do { assign x = x*0.99 + 0.01; }; print(x);",
+}
+
+
+def run(source: str, engine: str, numbers: str, precision: int):
+    statements = list(Parser.from_lexer(Lexer.from_stream(Stream.from_string(source))))
+    runtime = RuntimeEnvironment(numbers, precision)
+    evaluate = get_evaluator(runtime, engine)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        for statement in statements:
+            evaluate(statement)
+    return time.perf_counter() - start, out.getvalue().split()[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--terms", type=int, default=5000)
+    parser.add_argument("--precision", type=int, default=28, help="significant digits of the decimal mode.")
+    parser.add_argument("--engines", default="tree,closure")
+    opts = parser.parse_args()
+
+    # Exact results have thousands of digits, which print refuses to write by default.
+    if hasattr(sys, "set_int_max_str_digits"):
+        sys.set_int_max_str_digits(0)
+
+    print(f"{'program':10} {'engine':8} {'numbers':9} {'time s':>8}  result")
+    for name, program in PROGRAMS.items():
+        source = program.replace("TERMS", str(opts.terms))
+        for engine in opts.engines.split(","):
+            for numbers in NUMERIC_MODES:
+                elapsed, result = run(source, engine, numbers, opts.precision)
+                if len(result) > 24:
+                    result = result[:21] + "..."
+                print(f"{name:10} {engine:8} {numbers:9} {elapsed:>8.3f}  {result}")
+
+
+if __name__ == "__main__":
+    main()
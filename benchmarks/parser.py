@@ -0,0 +1,132 @@
+"""
+Measures the parser on machine generated expressions, and the depth of the
+Python stack it needs to parse them, then runs the sum on each engine.
+
+    python benchmarks/parser.py [--terms 10000] [--depth 8] [--repeat 3] [--seed 0] [--engines tree,closure,stack,bytecode]
+
+The shapes of expression are:
+
+    sum         | t + t - t + ... |, a single chain of one operator.
+    arithmetic  terms joined by random arithmetic operators.
+    mixed       every binary operator, prefix operators and parentheses
+                nested up to --depth deep.
+
+The other shapes are only parsed, as they may divide by zero or mix types.
+A sum of n terms nests n deep, so only the stack engine, which resolves and
+evaluates without recursion, runs the longer ones; the others report the
+error they stop with.
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core import RuntimeEnvironment
+from interpreter import get_evaluator
+from stream import Stream, Lexer, Parser, BINARY_OPERATORS, PREFIX_OPERATORS
+
+ARITHMETIC = ["+", "-", "*", "/", "%"]
+
+
+def term(rng: random.Random) -> str:
+    return rng.choice(["x", "y", "total", str(rng.randint(0, 999)), "1.5", "True"])
+
+
+def expression(shape: str, terms: int, depth: int, rng: random.Random) -> str:
+    if shape == "sum":
+        return " ".join(term(rng) if i % 2 == 0 else rng.choice("+-") for i in range(2 * terms - 1))
+    operators = ARITHMETIC if shape == "arithmetic" else [token.op for token in BINARY_OPERATORS]
+    prefixes = [token.op for token in PREFIX_OPERATORS]
+    parts = []
+    open_parentheses = 0
+    for i in range(terms):
+        if shape == "mixed":
+            if open_parentheses < depth and rng.random() < 0.2:
+                parts.append("(")
+                open_parentheses += 1
+            if rng.random() < 0.1:
+                parts.append(rng.choice(prefixes) + " ")
+        parts.append(term(rng))
+        if shape == "mixed" and open_parentheses and rng.random() < 0.2:
+            parts.append(")")
+            open_parentheses -= 1
+        if i < terms - 1:
+            parts.append(f" {rng.choice(operators)} ")
+    parts.append(")" * open_parentheses)
+    return "".join(parts)
+
+
+def parse(source: str):
+    return list(Parser.from_lexer(Lexer.from_stream(Stream.from_string(source))))
+
+
+def run(statements: list, engine: str) -> str:
+    """
+    Runs the parsed program on engine, and tells how long it took, or which
+    error it stopped with.
+    """
+    evaluate = get_evaluator(RuntimeEnvironment(), engine)
+    output = io.StringIO()
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(output):
+            for statement in statements:
+                evaluate(statement)
+    except Exception as e:
+        return type(e).__name__
+    return f"{(time.perf_counter() - start) * 1000:.1f} ms"
+
+
+def stack_depth(source: str) -> int:
+    """
+    The deepest the Python stack grows, in frames, while parsing source.
+    """
+    depth = deepest = 0
+
+    def profile(frame, event, arg):
+        nonlocal depth, deepest
+        if event == "call":
+            depth += 1
+            deepest = max(deepest, depth)
+        elif event == "return":
+            depth -= 1
+
+    sys.setprofile(profile)
+    try:
+        parse(source)
+    finally:
+        sys.setprofile(None)
+    return deepest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--terms", type=int, default=10_000)
+    parser.add_argument("--depth", type=int, default=8, help="the deepest parentheses nest in mixed expressions.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engines", type=str, default="tree,closure,stack,bytecode")
+    opts = parser.parse_args()
+
+    rng = random.Random(opts.seed)
+    for shape in ["sum", "arithmetic", "mixed"]:
+        source = f"declare x = 3; declare y = 7; declare total = 11; print({expression(shape, opts.terms, opts.depth, rng)});"
+        best = float("inf")
+        for _ in range(opts.repeat):
+            start = time.perf_counter()
+            parse(source)
+            best = min(best, time.perf_counter() - start)
+        print(f"{shape:>10}: {opts.terms} terms in {best * 1000:.1f} ms, "
+              f"{opts.terms / best / 1e3:.0f}k terms/s, stack depth {stack_depth(source)}")
+        if shape == "sum":
+            statements = parse(source)
+            print(f"{'':>12}run: " + ", ".join(f"{engine} {run(statements, engine)}" for engine in opts.engines.split(",")))
+
+
+if __name__ == "__main__":
+    main()
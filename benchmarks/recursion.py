@@ -0,0 +1,72 @@
+"""
+Measures the time a Gossip function call takes on the tree-walking
+evaluator, on the stack evaluator and on the bytecode virtual machine,
+through a recursive Fibonacci, and the deepest recursion each reaches.
+
+    python benchmarks/recursion.py [--n 18] [--depth 5000] [--repeat 3]
+
+Top-level functions are found through a cache of global functions rather
+than through the frames of their callers, so a call takes the same time at
+any depth.
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core import RuntimeEnvironment
+from interpreter import get_evaluator
+from stream import Stream, Lexer, Parser
+
+FIBONACCI = "deffunct fib(n) { if n < 2 then functret(n); else functret(0 + callfun fib(n - 1); + callfun fib(n - 2);); ; };"
+SUM = "deffunct sum(n) { if n == 0 then functret(0); else functret(n + callfun sum(n - 1);); ; };"
+
+
+def parse(source: str) -> list:
+    return list(Parser.from_lexer(Lexer.from_stream(Stream.from_string(source))))
+
+
+def evaluator(engine: str, definition: str):
+    evaluate = get_evaluator(RuntimeEnvironment(), engine)
+    for statement in parse(definition):
+        evaluate(statement)
+    return evaluate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--n", type=int, default=18)
+    parser.add_argument("--depth", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    opts = parser.parse_args()
+
+    calls = [1, 1]
+    for _ in range(2, opts.n + 1):
+        calls.append(calls[-1] + calls[-2] + 1)
+    call = parse(f"callfun fib({opts.n});")[0]
+    for engine in ("tree", "stack", "bytecode"):
+        best = float("inf")
+        for _ in range(opts.repeat):
+            evaluate = evaluator(engine, FIBONACCI)
+            start = time.perf_counter()
+            evaluate(call)
+            best = min(best, time.perf_counter() - start)
+
+        evaluate = evaluator(engine, SUM)
+        start = time.perf_counter()
+        try:
+            # The tree-walker reports every level of a recursion too deep for Python.
+            with contextlib.redirect_stdout(io.StringIO()):
+                evaluate(parse(f"callfun sum({opts.depth});")[0])
+            depth = f"reached depth {opts.depth} in {time.perf_counter() - start:.2f}s"
+        except Exception as e:
+            depth = f"failed at depth {opts.depth} with {type(e).__name__}"
+        print(f"{engine:>8}: {best / calls[opts.n] * 1e6:.1f} us per call, {depth}")
+
+
+if __name__ == "__main__":
+    main()
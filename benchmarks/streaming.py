@@ -0,0 +1,73 @@
+"""
+Measures how soon main.py prints the first output of a long generated
+program, and the peak resident memory of running it, when the program is
+piped in with -f - and when it is run from a file with -f.
+
+    python benchmarks/streaming.py [--statements 1000000] [--cache] [--engine closure] [--modes stdin,file]
+
+The program counts up one statement at a time, printing every 100000th count.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def write_program(f, statements: int):
+    f.write(b"declare x = 0;\n")
+    for i in range(statements):
+        f.write(b"assign x = x + 1; print(x);\n" if i % 100000 == 0 else b"assign x = x + 1;\n")
+
+
+def run(command: list, program: str = None, statements: int = 0) -> tuple[float, float, int, float]:
+    """
+    Runs main.py, feeding it the program on standard input if no file is
+    given. Returns the seconds to the first line of output and to the end,
+    the number of lines printed, and the peak RSS of the run in MB.
+    """
+    start = time.perf_counter()
+    stdin = subprocess.PIPE if program is None else subprocess.DEVNULL
+    process = subprocess.Popen(command, cwd=ROOT, stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    if program is None:
+        # The child prints while it is still being fed, so it is fed from a thread of its own.
+        feeder = threading.Thread(target=lambda: (write_program(process.stdin, statements), process.stdin.close()))
+        feeder.start()
+    first = None
+    lines = 0
+    for _ in process.stdout:
+        if first is None:
+            first = time.perf_counter() - start
+        lines += 1
+    _, _, usage = os.wait4(process.pid, 0)
+    if program is None:
+        feeder.join()
+    return first, time.perf_counter() - start, lines, usage.ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--statements", type=int, default=1_000_000)
+    parser.add_argument("--engine", type=str, default="closure")
+    parser.add_argument("--modes", type=str, default="stdin,file")
+    parser.add_argument("--cache", action="store_true", help="run the file through the parse cache, as main.py does by default.")
+    opts = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "count.gos")
+        with open(path, "wb") as f:
+            write_program(f, opts.statements)
+        print(f"{opts.statements} statements, {os.path.getsize(path) / 1e6:.0f} MB")
+        for mode in opts.modes.split(","):
+            command = [sys.executable, "-u", "main.py", "-e", opts.engine, "-f", "-" if mode == "stdin" else path]
+            if not opts.cache:
+                command.append("--no-cache")
+            first, total, lines, peak = run(command, None if mode == "stdin" else path, opts.statements)
+            print(f"{mode:>5}: first output in {first * 1000:.0f} ms, {lines} lines in {total:.1f}s, peak RSS {peak:.0f} MB")
+
+if __name__ == "__main__":
+    main()
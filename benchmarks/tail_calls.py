@@ -0,0 +1,61 @@
+"""
+Measures an accumulator loop written as a tail-recursive Gossip function,
+which runs in one frame on every engine but the python one, however many
+times it calls itself.
+
+    python benchmarks/tail_calls.py [--n 1000000] [--engines tree,closure,stack,bytecode] [--memory]
+
+Frames counts the frames the runtime allocated for the whole loop; the
+bytecode engine keeps frames of its own, and does not report them. With
+--memory, the peak memory of the loop is traced too, which slows it down.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core import RuntimeEnvironment
+from interpreter import get_evaluator
+from stream import Stream, Lexer, Parser
+
+LOOP = "deffunct loop(n, acc) { if n == 0 then functret(acc); else functret(callfun loop(n - 1, acc + n);); ; };"
+
+
+def parse(source: str) -> list:
+    return list(Parser.from_lexer(Lexer.from_stream(Stream.from_string(source))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--n", type=int, default=1_000_000)
+    parser.add_argument("--engines", type=str, default="tree,closure,stack,bytecode")
+    parser.add_argument("--memory", action="store_true")
+    opts = parser.parse_args()
+
+    call = parse(f"callfun loop({opts.n}, 0);")[0]
+    for engine in opts.engines.split(","):
+        runtime = RuntimeEnvironment()
+        evaluate = get_evaluator(runtime, engine)
+        for statement in parse(LOOP):
+            evaluate(statement)
+
+        if opts.memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        result = evaluate(call)
+        elapsed = time.perf_counter() - start
+        assert result == opts.n * (opts.n + 1) // 2
+        report = f"{engine:>8}: {elapsed / opts.n * 1e6:.1f} us per call"
+        if opts.memory:
+            report += f", peak {tracemalloc.get_traced_memory()[1] / 1024:.0f} KiB"
+            tracemalloc.stop()
+        if engine != "bytecode":
+            report += f", {runtime.frames.allocated} frames"
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1155 @@
+import hashlib
+import marshal
+import operator
+import os
+import threading
+from array import array
+from fractions import Fraction
+from utils.datatypes import AST, NumLiteral, BinOp, Variable, Value, Let, If, BoolLiteral, UnOp, ASTSequence, Assign, ForLoop, Range, Print, Declare, While, DoWhile, StringLiteral, ListObject, StringSlice, ListCons, ListOp, funct_call, funct_def, funct_ret, ListIndex
+
+from utils.errors import DeclarationError, InvalidProgramError, InvalidConditionError, VariableRedeclarationError, InvalidConcatenationError, IndexOutOfBoundsError, InvalidOperation, InvalidArgumentToList, ListError, BadAssignment
+from utils.numbers import divide, gossip_type, inclusive_range
+from utils.resolver import TailCall, tail_calls, reuses_frame
+
+
+"""
+Opcodes. Every instruction is two words long, an opcode and its argument,
+so the code of a CodeObject is a flat list of integers.
+"""
+
+NOP = 0
+LOAD_CONST = 1
+LOAD_FAST = 2              # arg: slot. Falls back to a lookup by name if the slot is unset.
+LOAD_NAME = 3              # arg: index into names. Searches the frames dynamically.
+LOAD_RAW = 4               # arg: slot. Reads a hidden slot, no checks.
+STORE_RAW = 5              # arg: slot. Pops into a hidden slot, no checks.
+DECLARE = 6                # arg: slot. Raises if the slot is already set in this block.
+DECLARE_LIST = 7           # arg: operand (slot, element type name, or FIRST_ELEMENT).
+COPY_ELEMENT_TYPE = 8      # arg: operand (slot, source name).
+ASSIGN_FAST = 9            # arg: slot.
+ASSIGN_NAME = 10           # arg: index into names.
+POP_TOP = 11
+CLEAR = 12                 # arg: operand (slots of a block). Ends a scope.
+BINARY_OP = 13             # arg: index into BINARY_OPERATORS.
+UNARY_NEGATIVE = 14        # arg: index into consts of the description of the node, raised if it fails.
+JUMP = 15                  # arg: target.
+POP_JUMP_IF_FALSE = 16     # arg: target. Truthiness, as used by the loops.
+POP_JUMP_IF_TRUE = 17      # arg: target.
+POP_JUMP_IF_NOT_TRUE = 18  # arg: target. Tests `== True`, as used by If.
+CHECK_BOOL = 19            # arg: index into consts of the condition's description.
+GET_ITER = 20
+FOR_ITER = 21              # arg: target once the iterator is exhausted.
+RANGE = 22                 # Pops the step, end and start of an inclusive range.
+BUILD_LIST = 23            # arg: operand (length, element type name, FIRST_ELEMENT, or None to not check).
+MAKE_FUNCTION = 24         # arg: index into consts of the function's CodeObject.
+DEFINE = 25                # arg: slot. Binds a function, replacing any earlier binding.
+LOAD_FUNCTION = 26         # arg: index into names.
+CALL = 27                  # arg: number of arguments.
+RETURN_VALUE = 28
+PRINT = 29
+PRINT_SEQUENCE = 30        # arg: index into consts of the printed values.
+SLICE = 31
+LIST_INDEX = 32
+LIST_CONS = 33             # arg: operand (name or None, element type name, FIRST_ELEMENT or None).
+LIST_OP = 34               # arg: operand (operation, name or None).
+UNSUPPORTED = 35           # arg: index into consts of the description of the node.
+
+# Superinstructions, fused from the most common instruction sequences.
+BINARY_FAST_CONST = 36     # arg: operand (slot, constant, operator).
+BINARY_FAST_FAST = 37      # arg: operand (slot, slot, operator).
+ASSIGN_FAST_CONST = 38     # arg: operand (slot, constant, operator). For | assign i = i + 1 |.
+COMPARE_FAST_CONST_JUMP = 39  # arg: operand (slot, constant, operator, target, jump when).
+
+# A call in tail position of a function body. A call of the running function
+# rebinds the frame to the arguments and jumps to the start of the body;
+# any other is a CALL.
+TAIL_CALL = 40             # arg: number of arguments.
+
+OPNAMES = {value: name for name, value in list(globals().items()) if name.isupper() and isinstance(value, int)}
+
+BINARY_OPERATORS = ["+", "-", "*", "/", "%", "==", "!=", "<", ">", "<=", ">=", "&&", "||"]
+BINARY_FUNCTIONS = [
+    operator.add,
+    operator.sub,
+    operator.mul,
+    divide,
+    operator.mod,
+    operator.eq,
+    operator.ne,
+    operator.lt,
+    operator.gt,
+    operator.le,
+    operator.ge,
+    lambda l, r: l and r,
+    lambda l, r: l or r,
+]
+COMPARISONS = {"==", "!=", "<", ">", "<=", ">="}
+
+ELEMENT_TYPES = {"Fraction": Fraction, "str": str, "bool": bool, "list": list, "int": int, "float": float}
+# Stands for the element type of a list literal whose type the parser could
+# not infer: the type of the first element of the list.
+FIRST_ELEMENT = "*"
+
+MAGIC = b"GOSC"
+FORMAT_VERSION = 6
+
+
+class Unset:
+    """
+    Marks a slot whose variable has not been declared (yet) in the live scope.
+    """
+    def __repr__(self):
+        return "UNSET"
+
+
+UNSET = Unset()
+
+
+class CodeObject:
+    """
+    A compiled unit: either a function body or a top-level statement.
+    Statements of the same program share the slot tables of their Module.
+    functions caches the global functions its calls load, by call site;
+    it is filled at runtime, and not saved.
+    """
+    __slots__ = ("code", "consts", "names", "operands", "nlocals", "params", "slot_names", "lookup", "name", "functions")
+
+    def __init__(self, name, params=()):
+        self.name = name
+        self.params = tuple(params)
+        self.code = []
+        self.consts = []
+        self.names = []
+        self.operands = []
+        self.nlocals = 0
+        self.slot_names = []
+        self.lookup = {}
+        self.functions = {}
+
+    def disassemble(self) -> str:
+        """
+        Returns a human-readable listing of the instructions.
+        """
+        lines = []
+        for pc in range(0, len(self.code), 2):
+            op, arg = self.code[pc], self.code[pc + 1]
+            detail = ""
+            if op in (LOAD_CONST, MAKE_FUNCTION, PRINT_SEQUENCE, CHECK_BOOL, UNSUPPORTED, UNARY_NEGATIVE):
+                detail = repr(self.consts[arg])
+            elif op in (LOAD_NAME, ASSIGN_NAME, LOAD_FUNCTION):
+                detail = self.names[arg]
+            elif op in (LOAD_FAST, DECLARE, ASSIGN_FAST, DEFINE, LOAD_RAW, STORE_RAW):
+                detail = self.slot_names[arg] or "<hidden>"
+            elif op == BINARY_OP:
+                detail = BINARY_OPERATORS[arg]
+            elif op in (DECLARE_LIST, COPY_ELEMENT_TYPE, CLEAR, BUILD_LIST, LIST_CONS, LIST_OP, BINARY_FAST_CONST, BINARY_FAST_FAST, ASSIGN_FAST_CONST, COMPARE_FAST_CONST_JUMP):
+                detail = repr(self.operands[arg])
+            lines.append(f"{pc:>5} {OPNAMES[op]:<24} {arg:<5} {detail}")
+        return "\n".join(lines)
+
+
+class Function:
+    """
+    A function value, as created by MAKE_FUNCTION at runtime.
+    """
+    __slots__ = ("code",)
+
+    def __init__(self, code: CodeObject):
+        self.code = code
+
+
+class Module:
+    """
+    A compiled program: its top-level statements, and the slot tables of the
+    module frame they share. inner_names holds the names also declared by
+    some scope inside the program, which may shadow a binding of the module
+    frame at runtime; a name which is not is always found there.
+    """
+    __slots__ = ("statements", "nlocals", "slot_names", "lookup", "globals", "inner_names")
+
+    def __init__(self):
+        self.statements = []
+        self.nlocals = 0
+        self.slot_names = []
+        self.lookup = {}
+        self.globals = {}
+        self.inner_names = set()
+
+
+class Block:
+    """
+    A compile-time scope: one Let, loop iteration or function call.
+    """
+    __slots__ = ("names", "slots", "depth")
+
+    def __init__(self, depth):
+        self.names = {}
+        self.slots = []
+        self.depth = depth
+
+
+class BytecodeCompiler():
+    """
+    Compiles an AST into flat bytecode for the VirtualMachine.
+    Variables are resolved at compile time to slots of the frame of the
+    enclosing function (or of the module), when they are declared in a
+    scope that is lexically visible. All other names are looked up by name
+    at runtime, following the dynamic scoping of RuntimeEnvironment.
+    """
+    def __init__(self, module: Module = None):
+        self.module = module if module is not None else Module()
+        self.module_block = Block(0)
+        self.module_block.names = self.module.globals
+        self.module_depths = {}
+
+    def compile_module(self, program: list) -> Module:
+        """
+        Compiles every top-level statement of a program into the module.
+        """
+        for statement in program:
+            self.compile_statement(statement)
+        return self.module
+
+    def compile_statement(self, statement: AST) -> CodeObject:
+        """
+        Compiles a top-level statement into a CodeObject running on the module frame.
+        """
+        code = CodeObject("<statement>")
+        code.slot_names = self.module.slot_names
+        code.lookup = self.module.lookup
+        self.code = code
+        self.blocks = [self.module_block]
+        self.depths = self.module_depths
+        self.compile(statement)
+        self.emit(RETURN_VALUE)
+        self.module.nlocals = len(self.module.slot_names)
+        code.nlocals = self.module.nlocals
+        self.module.statements.append(code)
+        return code
+
+    def compile_function(self, function: funct_def) -> CodeObject:
+        """
+        Compiles a function body into its own CodeObject, with a slot per parameter.
+        """
+        name, params, body = function.name.name, function.var_list, function.body
+        saved = self.code, self.blocks, self.depths
+        code = CodeObject(name, [param.name for param in params])
+        self.code = code
+        self.blocks = [Block(0)]
+        self.depths = {}
+        for param in params:
+            self.declare(param.name)
+        self.compile(tail_calls(body) if reuses_frame(function) else body)
+        self.emit(RETURN_VALUE)
+        code.nlocals = len(code.slot_names)
+        self.code, self.blocks, self.depths = saved
+        return code
+
+    # Helpers for emitting code.
+
+    def emit(self, op: int, arg: int = 0) -> int:
+        self.code.code.append(op)
+        self.code.code.append(arg)
+        return len(self.code.code) - 2
+
+    def patch(self, at: int, target: int = None):
+        self.code.code[at + 1] = len(self.code.code) if target is None else target
+
+    def const(self, value) -> int:
+        consts = self.code.consts
+        for i, c in enumerate(consts):
+            if type(c) is type(value) and c == value:
+                return i
+        consts.append(value)
+        return len(consts) - 1
+
+    def name(self, name: str) -> int:
+        if name not in self.code.names:
+            self.code.names.append(name)
+        return self.code.names.index(name)
+
+    def operand(self, *values) -> int:
+        self.code.operands.append(list(values))
+        return len(self.code.operands) - 1
+
+    # Helpers for scopes.
+
+    def allocate(self, name: str = None) -> int:
+        """
+        Allocates a slot in the current frame. Hidden slots have no name.
+        """
+        slot = len(self.code.slot_names)
+        self.code.slot_names.append(name)
+        return slot
+
+    def declare(self, name: str) -> int:
+        """
+        Returns the slot of name in the innermost block, allocating it if needed.
+        """
+        block = self.blocks[-1]
+        if name in block.names:
+            return block.names[name]
+        if block is not self.module_block:
+            self.module.inner_names.add(name)
+        slot = self.allocate(name)
+        block.names[name] = slot
+        block.slots.append(slot)
+
+        # Keep the slots of every name ordered innermost scope first.
+        slots = self.code.lookup.setdefault(name, [])
+        depths = [self.depths.get((name, s), 0) for s in slots]
+        position = 0
+        while position < len(slots) and depths[position] >= block.depth:
+            position += 1
+        slots.insert(position, slot)
+        self.depths[(name, slot)] = block.depth
+        return slot
+
+    def resolve(self, name: str):
+        """
+        Returns the slot of a lexically visible declaration of name, or None.
+        """
+        for block in reversed(self.blocks):
+            if name in block.names:
+                return block.names[name]
+        return None
+
+    def push_block(self) -> Block:
+        block = Block(self.blocks[-1].depth + 1)
+        self.blocks.append(block)
+        return block
+
+    def pop_block(self, clear_at: list):
+        """
+        Closes the innermost block, and fills in the slots cleared by its CLEAR instructions.
+        """
+        block = self.blocks.pop()
+        for operand in clear_at:
+            self.code.operands[operand] = list(block.slots)
+
+    def compile_condition(self, cond: AST, jump: int, when: bool, strict: bool = False) -> int:
+        """
+        Compiles a condition followed by a conditional jump, fusing
+        | variable <comparison> literal | into a single superinstruction.
+        Returns the position of the jump, to patch its target later.
+        """
+        match cond:
+            case BinOp(op, Variable(name), NumLiteral(value) | BoolLiteral(value)) if op in COMPARISONS and self.resolve(name) is not None:
+                operand = self.operand(self.resolve(name), value, BINARY_OPERATORS.index(op), jump, when)
+                self.emit(COMPARE_FAST_CONST_JUMP, operand)
+                return ("operand", operand)
+        self.compile(cond)
+        if strict and not when:
+            return ("code", self.emit(POP_JUMP_IF_NOT_TRUE, jump))
+        return ("code", self.emit(POP_JUMP_IF_TRUE if when else POP_JUMP_IF_FALSE, jump))
+
+    def patch_condition(self, jump, target: int = None):
+        kind, at = jump
+        target = len(self.code.code) if target is None else target
+        if kind == "operand":
+            self.code.operands[at][3] = target
+        else:
+            self.patch(at, target)
+
+    def load(self, name: str):
+        slot = self.resolve(name)
+        if slot is None:
+            self.emit(LOAD_NAME, self.name(name))
+        else:
+            self.emit(LOAD_FAST, slot)
+
+    def compile(self, program: AST):
+        """
+        Recursively compiles an AST into instructions that leave exactly one
+        value, the Value of the program, on the stack.
+        """
+        match program:
+            case NumLiteral(value) | BoolLiteral(value) | StringLiteral(value):
+                self.emit(LOAD_CONST, self.const(value))
+
+            case StringSlice(Variable(name), start, end):
+                self.load(name)
+                self.compile(start)
+                self.compile(end)
+                self.emit(SLICE)
+
+            case ListObject(elements, element_type):
+                for element in elements:
+                    self.compile(element)
+                self.emit(BUILD_LIST, self.operand(len(elements), type_name(element_type)))
+
+            case ListCons(to_add, base_list):
+                self.compile(to_add)
+                if isinstance(base_list, Variable):
+                    self.compile(base_list)
+                    self.emit(LIST_CONS, self.operand(base_list.name, None))
+                elif isinstance(base_list, ListObject):
+                    self.compile(base_list)
+                    self.emit(LIST_CONS, self.operand(None, type_name(base_list.element_type)))
+                else:
+                    self.emit(LOAD_CONST, self.const(None))
+                    self.emit(LIST_CONS, self.operand(None, None))
+
+            case ListOp(op, base_list) if op in ("is-empty?", "head", "tail"):
+                self.compile(base_list)
+                name = base_list.name if isinstance(base_list, Variable) else None
+                self.emit(LIST_OP, self.operand(op, name, isinstance(base_list, ListObject)))
+
+            case ListIndex(index, base_list):
+                self.compile(base_list)
+                self.compile(index)
+                self.emit(LIST_INDEX)
+
+            case Variable(name):
+                self.load(name)
+
+            case Declare(Variable(name), value):
+                self.compile(value)
+                slot = self.declare(name)
+                if isinstance(value, ListObject):
+                    self.emit(DECLARE_LIST, self.operand(slot, type_name(value.element_type)))
+                else:
+                    self.emit(DECLARE, slot)
+                    if isinstance(value, Variable):
+                        self.emit(COPY_ELEMENT_TYPE, self.operand(slot, value.name))
+
+            case Assign(Variable(name), BinOp(op, Variable(other), NumLiteral(value))) if other == name and op in BINARY_OPERATORS and self.resolve(name) is not None:
+                self.emit(ASSIGN_FAST_CONST, self.operand(self.resolve(name), value, BINARY_OPERATORS.index(op)))
+
+            case Assign(Variable(name), expression):
+                self.compile(expression)
+                slot = self.resolve(name)
+                if slot is None:
+                    self.emit(ASSIGN_NAME, self.name(name))
+                else:
+                    self.emit(ASSIGN_FAST, slot)
+
+            case ASTSequence(seq):
+                for ast in seq[:-1]:
+                    self.compile(ast)
+                    self.emit(POP_TOP)
+                self.compile(seq[-1])
+
+            case Let(Variable(name), e1, e2):
+                self.compile(e1)
+                self.push_block()
+                self.emit(DECLARE, self.declare(name))
+                self.emit(POP_TOP)
+                self.compile(e2)
+                clear = self.operand()
+                self.emit(CLEAR, clear)
+                self.pop_block([clear])
+
+            case Range(left, right, step):
+                self.compile(left)
+                self.compile(right)
+                if step is not None:
+                    self.compile(step)
+                else:
+                    self.emit(LOAD_CONST, self.const(1))
+                self.emit(RANGE)
+
+            case Print(ASTSequence(expression_list)):
+                self.emit(PRINT_SEQUENCE, self.const(tuple(expression.value for expression in expression_list)))
+
+            case Print(expression):
+                self.compile(expression)
+                self.emit(PRINT)
+
+            case BinOp(op, Variable(name), NumLiteral(value)) if op in BINARY_OPERATORS and self.resolve(name) is not None:
+                self.emit(BINARY_FAST_CONST, self.operand(self.resolve(name), value, BINARY_OPERATORS.index(op)))
+
+            case BinOp(op, Variable(left), Variable(right)) if op in BINARY_OPERATORS and self.resolve(left) is not None and self.resolve(right) is not None:
+                self.emit(BINARY_FAST_FAST, self.operand(self.resolve(left), self.resolve(right), BINARY_OPERATORS.index(op)))
+
+            case BinOp(op, left, right) if op in BINARY_OPERATORS:
+                self.compile(left)
+                self.compile(right)
+                self.emit(BINARY_OP, BINARY_OPERATORS.index(op))
+
+            case UnOp("-", right):
+                self.compile(right)
+                self.emit(UNARY_NEGATIVE, self.const(repr(program)))
+
+            case If(cond, e1, e2):
+                jump = self.compile_condition(cond, 0, when=False, strict=True)
+                self.compile(e1)
+                end = self.emit(JUMP)
+                self.patch_condition(jump)
+                if e2 is None:
+                    self.emit(LOAD_CONST, self.const(None))
+                else:
+                    self.compile(e2)
+                self.patch(end)
+
+            case ForLoop(Variable(name), sequence, stat):
+                result = self.allocate()
+                self.emit(LOAD_CONST, self.const(None))
+                self.emit(STORE_RAW, result)
+                if isinstance(sequence, ASTSequence):
+                    for expression in sequence.seq:
+                        self.compile(expression)
+                    self.emit(BUILD_LIST, self.operand(len(sequence.seq), None))
+                else:
+                    self.compile(sequence)
+                self.emit(GET_ITER)
+                loop = len(self.code.code)
+                exhausted = self.emit(FOR_ITER)
+                self.push_block()
+                clear_start = self.operand()
+                self.emit(CLEAR, clear_start)
+                self.emit(STORE_RAW, self.declare(name))
+                self.compile(stat)
+                self.emit(STORE_RAW, result)
+                self.emit(JUMP, loop)
+                self.patch(exhausted)
+                clear_end = self.operand()
+                self.emit(CLEAR, clear_end)
+                self.pop_block([clear_start, clear_end])
+                self.emit(LOAD_RAW, result)
+
+            case While(cond, sequence):
+                result = self.allocate()
+                self.emit(LOAD_CONST, self.const(None))
+                self.emit(STORE_RAW, result)
+                self.compile(cond)
+                self.emit(CHECK_BOOL, self.const(repr(cond)))
+                skip = self.emit(POP_JUMP_IF_FALSE)
+                loop = len(self.code.code)
+                self.push_block()
+                clear_start = self.operand()
+                self.emit(CLEAR, clear_start)
+                self.compile(sequence)
+                self.emit(STORE_RAW, result)
+                # The condition is evaluated again inside the scope of the iteration.
+                self.patch_condition(self.compile_condition(cond, 0, when=True), loop)
+                clear_end = self.operand()
+                self.emit(CLEAR, clear_end)
+                self.pop_block([clear_start, clear_end])
+                self.patch(skip)
+                self.emit(LOAD_RAW, result)
+
+            case DoWhile(sequence, cond):
+                result = self.allocate()
+                self.push_block()
+                self.compile(sequence)
+                self.emit(STORE_RAW, result)
+                first = self.operand()
+                self.emit(CLEAR, first)
+                self.pop_block([first])
+                self.compile(cond)
+                self.emit(CHECK_BOOL, self.const(repr(cond)))
+                skip = self.emit(POP_JUMP_IF_FALSE)
+                loop = len(self.code.code)
+                self.push_block()
+                clear_start = self.operand()
+                self.emit(CLEAR, clear_start)
+                self.compile(sequence)
+                self.emit(STORE_RAW, result)
+                self.patch_condition(self.compile_condition(cond, 0, when=True), loop)
+                clear_end = self.operand()
+                self.emit(CLEAR, clear_end)
+                self.pop_block([clear_start, clear_end])
+                self.patch(skip)
+                self.emit(LOAD_RAW, result)
+
+            case funct_ret(funct_val):
+                self.compile(funct_val)
+
+            case funct_def(Variable(name), arg_list, body):
+                function = self.compile_function(program)
+                self.emit(MAKE_FUNCTION, len(self.code.consts))
+                self.code.consts.append(function)
+                self.emit(DEFINE, self.declare(name))
+                self.emit(LOAD_CONST, self.const(0))
+
+            case funct_call(Variable(name), arg_val):
+                self.emit(LOAD_FUNCTION, self.name(name))
+                for arg in arg_val:
+                    self.compile(arg)
+                self.emit(TAIL_CALL if type(program) is TailCall else CALL, len(arg_val))
+
+            case _:
+                self.emit(UNSUPPORTED, self.const(repr(program)))
+
+
+class Frame:
+    """
+    The activation of a CodeObject. Frames are linked to their callers,
+    which is where dynamically scoped names are looked up.
+    """
+    __slots__ = ("code", "pc", "stack", "locals", "parent", "element_types")
+
+    def __init__(self, code: CodeObject, nlocals: int, parent=None):
+        self.code = code
+        self.pc = 0
+        self.stack = []
+        self.locals = [UNSET] * nlocals
+        self.parent = parent
+        self.element_types = {}
+
+
+def find(frame: Frame, name: str):
+    """
+    Finds the innermost live binding of name, searching the frame and then its callers.
+    Returns the frame and the slot of the binding, or (None, None).
+    """
+    while frame is not None:
+        slots = frame.code.lookup.get(name)
+        if slots:
+            local_values = frame.locals
+            for slot in slots:
+                if local_values[slot] is not UNSET:
+                    return frame, slot
+        frame = frame.parent
+    return None, None
+
+
+class VirtualMachine():
+    """
+    A stack-based virtual machine for bytecode from the BytecodeCompiler.
+    The dispatch loop runs calls in place, by switching frames, so
+    Gossip recursion does not recurse in Python.
+    """
+    def __init__(self):
+        self.module = Module()
+        self.compiler = BytecodeCompiler(self.module)
+        self.frame = Frame(None, 0)
+
+    def run(self, program: AST) -> Value:
+        """
+        Compiles and runs a single top-level statement on the module frame.
+        """
+        return self.execute(self.compiler.compile_statement(program))
+
+    def eval(self, program: AST, environment = None, reset_scope = False) -> Value:
+        """
+        Same as run, so the machine can stand in for a RuntimeEnvironment.
+        """
+        return self.run(program)
+
+    def load_module(self, module: Module):
+        """
+        Makes a (possibly deserialized) module the one statements run against.
+        """
+        self.module = module
+        self.compiler = BytecodeCompiler(module)
+        self.frame = Frame(None, module.nlocals)
+
+    def execute(self, code: CodeObject) -> Value:
+        """
+        Runs a top-level statement of the current module.
+        """
+        frame = self.frame
+        frame.code = code
+        frame.pc = 0
+        frame.stack = []
+        if len(frame.locals) < code.nlocals:
+            frame.locals.extend([UNSET] * (code.nlocals - len(frame.locals)))
+
+        functions = BINARY_FUNCTIONS
+        module_values = frame.locals
+        inner_names = self.module.inner_names
+        ops = code.code
+        consts = code.consts
+        operands = code.operands
+        local_values = frame.locals
+        stack = frame.stack
+        push = stack.append
+        pop = stack.pop
+        pc = 0
+
+        while True:
+            op = ops[pc]
+            arg = ops[pc + 1]
+            pc += 2
+
+            if op == LOAD_FAST:
+                value = local_values[arg]
+                if value is UNSET:
+                    value = self.load_name(frame, code.slot_names[arg])
+                push(value)
+
+            elif op == LOAD_CONST:
+                push(consts[arg])
+
+            elif op == COMPARE_FAST_CONST_JUMP:
+                slot, constant, index, target, when = operands[arg]
+                value = local_values[slot]
+                if value is UNSET:
+                    value = self.load_name(frame, code.slot_names[slot])
+                try:
+                    result = functions[index](value, constant)
+                except:
+                    binary_error(index, value, constant)
+                if result == when:
+                    pc = target
+
+            elif op == BINARY_FAST_CONST:
+                slot, constant, index = operands[arg]
+                value = local_values[slot]
+                if value is UNSET:
+                    value = self.load_name(frame, code.slot_names[slot])
+                try:
+                    push(functions[index](value, constant))
+                except:
+                    binary_error(index, value, constant)
+
+            elif op == ASSIGN_FAST_CONST:
+                slot, constant, index = operands[arg]
+                value = local_values[slot]
+                if value is UNSET:
+                    name = code.slot_names[slot]
+                    push(self.assign_name(frame, name, binary(index, self.load_name(frame, name), constant)))
+                else:
+                    try:
+                        result = functions[index](value, constant)
+                    except:
+                        binary_error(index, value, constant)
+                    if type(value) is not type(result) and gossip_type(value) is not gossip_type(result):
+                        raise BadAssignment(code.slot_names[slot], gossip_type(value), gossip_type(result))
+                    local_values[slot] = result
+                    push(result)
+
+            elif op == BINARY_FAST_FAST:
+                left, right, index = operands[arg]
+                l = local_values[left]
+                if l is UNSET:
+                    l = self.load_name(frame, code.slot_names[left])
+                r = local_values[right]
+                if r is UNSET:
+                    r = self.load_name(frame, code.slot_names[right])
+                try:
+                    push(functions[index](l, r))
+                except:
+                    binary_error(index, l, r)
+
+            elif op == BINARY_OP:
+                r = pop()
+                l = pop()
+                try:
+                    push(functions[arg](l, r))
+                except:
+                    binary_error(arg, l, r)
+
+            elif op == POP_TOP:
+                pop()
+
+            elif op == JUMP:
+                pc = arg
+
+            elif op == POP_JUMP_IF_FALSE:
+                if not pop():
+                    pc = arg
+
+            elif op == POP_JUMP_IF_TRUE:
+                if pop():
+                    pc = arg
+
+            elif op == POP_JUMP_IF_NOT_TRUE:
+                if pop() != True:
+                    pc = arg
+
+            elif op == ASSIGN_FAST:
+                value = stack[-1]
+                old = local_values[arg]
+                if old is UNSET:
+                    self.assign_name(frame, code.slot_names[arg], value)
+                else:
+                    if type(old) is not type(value) and gossip_type(old) is not gossip_type(value):
+                        raise BadAssignment(code.slot_names[arg], gossip_type(old), gossip_type(value))
+                    local_values[arg] = value
+
+            elif op == ASSIGN_NAME:
+                self.assign_name(frame, code.names[arg], stack[-1])
+
+            elif op == LOAD_NAME:
+                push(self.load_name(frame, code.names[arg]))
+
+            elif op == LOAD_RAW:
+                push(local_values[arg])
+
+            elif op == STORE_RAW:
+                local_values[arg] = pop()
+
+            elif op == DECLARE:
+                if local_values[arg] is not UNSET:
+                    raise VariableRedeclarationError(code.slot_names[arg])
+                local_values[arg] = stack[-1]
+
+            elif op == CLEAR:
+                for slot in operands[arg]:
+                    local_values[slot] = UNSET
+                    frame.element_types.pop(slot, None)
+
+            elif op == FOR_ITER:
+                value = next(stack[-1], UNSET)
+                if value is UNSET:
+                    pop()
+                    pc = arg
+                else:
+                    push(value)
+
+            elif op == GET_ITER:
+                push(iter(pop()))
+
+            elif op == LOAD_FUNCTION:
+                cached = code.functions.get(pc)
+                if cached is not None and module_values[cached[0]] is cached[1] and code.names[arg] not in inner_names:
+                    push(cached[1])
+                else:
+                    push(self.load_function(frame, code, pc, code.names[arg]))
+
+            elif op == CALL or op == TAIL_CALL:
+                args = stack[len(stack) - arg:]
+                del stack[len(stack) - arg:]
+                function = pop()
+                callee = function.code
+                if len(callee.params) != arg:
+                    raise Exception("Not enough arguements")
+                if op == TAIL_CALL and callee is code:
+                    local_values[:arg] = args
+                    local_values[arg:] = [UNSET] * (callee.nlocals - arg)
+                    frame.element_types.clear()
+                    pc = 0
+                else:
+                    frame.pc = pc
+                    frame = Frame(callee, callee.nlocals, frame)
+                    frame.locals[:arg] = args
+                    code, ops, consts, operands = callee, callee.code, callee.consts, callee.operands
+                    local_values = frame.locals
+                    stack = frame.stack
+                    push = stack.append
+                    pop = stack.pop
+                    pc = 0
+
+            elif op == RETURN_VALUE:
+                value = pop()
+                if frame.parent is None:
+                    return value
+                frame = frame.parent
+                code = frame.code
+                ops, consts, operands = code.code, code.consts, code.operands
+                local_values = frame.locals
+                stack = frame.stack
+                push = stack.append
+                pop = stack.pop
+                pc = frame.pc
+                push(value)
+
+            elif op == CHECK_BOOL:
+                if type(stack[-1]) != bool:
+                    raise InvalidConditionError(consts[arg])
+
+            elif op == RANGE:
+                step = pop()
+                end = pop()
+                start = pop()
+                push(inclusive_range(start, end, step))
+
+            elif op == UNARY_NEGATIVE:
+                value = pop()
+                try:
+                    push(0 - value)
+                except:
+                    # Like the tree-walker, which finds no case for the negation once it has failed.
+                    InvalidOperation("Unary Negation", value)
+                    raise InvalidProgramError(f"Runtime environment does not support program: {consts[arg]}.")
+
+            elif op == PRINT:
+                print(stack[-1])
+
+            elif op == PRINT_SEQUENCE:
+                values = consts[arg]
+                for value in values[:-1]:
+                    print(value)
+                print(values[-1], end="")
+                push(values[-1])
+
+            elif op == MAKE_FUNCTION:
+                push(Function(consts[arg]))
+
+            elif op == DEFINE:
+                local_values[arg] = pop()
+
+            elif op == DECLARE_LIST:
+                slot, element_type = operands[arg]
+                if local_values[slot] is not UNSET:
+                    raise VariableRedeclarationError(code.slot_names[slot])
+                local_values[slot] = stack[-1]
+                frame.element_types[slot] = named_type(element_type, stack[-1])
+
+            elif op == COPY_ELEMENT_TYPE:
+                slot, name = operands[arg]
+                holder, source = find(frame, name)
+                if holder is not None and source in holder.element_types:
+                    frame.element_types[slot] = holder.element_types[source]
+
+            elif op == BUILD_LIST:
+                length, element_type = operands[arg]
+                values = stack[len(stack) - length:]
+                del stack[len(stack) - length:]
+                if element_type is not None:
+                    element_type = named_type(element_type, values)
+                    for value in values:
+                        if gossip_type(value) is not element_type:
+                            raise InvalidArgumentToList(element_type)
+                push(values)
+
+            elif op == SLICE:
+                end = int(pop())
+                start = int(pop())
+                string = pop()
+                try:
+                    push(string[start:end])
+                except:
+                    if(start<0 or end>len(string)):
+                        raise IndexOutOfBoundsError("Slice Index out of range")
+                    raise IndexOutOfBoundsError()
+
+            elif op == LIST_INDEX:
+                index = int(pop())
+                values = pop()
+                if(index<0 or index>=len(values)):
+                    raise ListError("Index out of range.")
+                push(values[index])
+
+            elif op == LIST_CONS:
+                name, element_type = operands[arg]
+                base = pop()
+                value = pop()
+                push(self.list_cons(frame, name, element_type, value, base))
+
+            elif op == LIST_OP:
+                operation, name, literal = operands[arg]
+                push(self.list_op(frame, operation, name, literal, pop()))
+
+            elif op == UNSUPPORTED:
+                raise InvalidProgramError(f"Runtime environment does not support program: {consts[arg]}.")
+
+            elif op == NOP:
+                pass
+
+            else:
+                raise InvalidProgramError(f"Unknown opcode {op}.")
+
+    # Slow paths, kept out of the dispatch loop.
+
+    def load_function(self, frame: Frame, code: CodeObject, site: int, name: str) -> Function:
+        """
+        Finds the function a call site of code calls, through the frames of
+        the callers. A function bound in the module frame, under a name no
+        inner scope declares, is cached for the site, until it is defined
+        again.
+        """
+        holder, slot = find(frame, name)
+        if holder is None or type(holder.locals[slot]) is not Function:
+            raise Exception("Function is not defined")
+        if holder is self.frame and name not in self.module.inner_names:
+            code.functions[site] = (slot, holder.locals[slot])
+        return holder.locals[slot]
+
+    def load_name(self, frame: Frame, name: str) -> Value:
+        holder, slot = find(frame, name)
+        if holder is None:
+            raise DeclarationError(name)
+        return holder.locals[slot]
+
+    def assign_name(self, frame: Frame, name: str, value: Value) -> Value:
+        holder, slot = find(frame, name)
+        var_type = None if holder is None else gossip_type(holder.locals[slot])
+        if var_type is not gossip_type(value):
+            raise BadAssignment(name, var_type, gossip_type(value))
+        holder.locals[slot] = value
+        return value
+
+    def list_cons(self, frame, name, element_type, value, base):
+        if name is not None:
+            holder, slot = find(frame, name)
+            if holder is None or slot not in holder.element_types:
+                raise ListError("Variable referenced during Cons operation doesn't exist.")
+            the_type = holder.element_types[slot]
+        elif element_type is not None:
+            the_type = named_type(element_type, base)
+        else:
+            raise ListError("Argument to Cons() is not a list.")
+
+        if gossip_type(value) is not the_type:
+            raise ListError("Input element is not of the same type as given list type.")
+
+        new_list = [value]
+        new_list.extend(base)
+        if name is not None:
+            holder.locals[slot] = new_list
+        return new_list
+
+    def list_op(self, frame, operation, name, literal, values):
+        if not literal:
+            if name is None or type(values) is not list:
+                label = "Head" if operation == "head" else "IsEmpty"
+                raise ListError(f"Argument to {label}() is not a list.")
+        if operation == "is-empty?":
+            return len(values) == 0
+        if len(values) == 0:
+            raise ListError(f"No {operation} in an empty list")
+        return values[0] if operation == "head" else values[1:]
+
+
+def binary(index: int, left: Value, right: Value) -> Value:
+    """
+    Applies the binary operator at index, outside of the dispatch loop.
+    """
+    try:
+        return BINARY_FUNCTIONS[index](left, right)
+    except:
+        binary_error(index, left, right)
+
+
+def binary_error(index: int, left: Value, right: Value):
+    """
+    Raises the same error as RuntimeEnvironment for a failed binary operation.
+    """
+    if index == 0:
+        raise InvalidConcatenationError()
+    raise InvalidOperation(BINARY_OPERATORS[index], left, right)
+
+
+def type_name(element_type) -> str:
+    """
+    Names the element type of a list literal in an operand.
+    """
+    return FIRST_ELEMENT if element_type is None else element_type.__name__
+
+
+def named_type(name: str, values: list) -> type:
+    """
+    The element type named in an operand, for a list of values.
+    """
+    return gossip_type(values[0]) if name == FIRST_ELEMENT else ELEMENT_TYPES[name]
+
+
+"""
+Serialization. Modules are written with marshal, after encoding the
+constants marshal does not know about (Fractions and CodeObjects).
+"""
+
+
+def encode_value(value):
+    if type(value) is Fraction:
+        return ("F", value.numerator, value.denominator)
+    if type(value) is CodeObject:
+        return ("C", encode_code(value))
+    if type(value) is tuple:
+        return ("T", tuple(encode_value(v) for v in value))
+    return ("V", value)
+
+
+def decode_value(value):
+    tag, *payload = value
+    if tag == "F":
+        return Fraction(*payload)
+    if tag == "C":
+        return decode_code(payload[0])
+    if tag == "T":
+        return tuple(decode_value(v) for v in payload[0])
+    return payload[0]
+
+
+def encode_code(code: CodeObject) -> tuple:
+    return (
+        code.name,
+        code.params,
+        array("i", code.code).tobytes(),
+        tuple(encode_value(c) for c in code.consts),
+        tuple(code.names),
+        tuple(tuple(encode_value(v) for v in operand) for operand in code.operands),
+        code.nlocals,
+        tuple(code.slot_names),
+        tuple((name, tuple(slots)) for name, slots in code.lookup.items()),
+    )
+
+
+def decode_code(data: tuple, module: Module = None) -> CodeObject:
+    name, params, ops, consts, names, operands, nlocals, slot_names, lookup = data
+    code = CodeObject(name, params)
+    instructions = array("i")
+    instructions.frombytes(ops)
+    code.code = instructions.tolist()
+    code.consts = [decode_value(c) for c in consts]
+    code.names = list(names)
+    code.operands = [[decode_value(v) for v in operand] for operand in operands]
+    code.nlocals = nlocals
+    if module is None:
+        code.slot_names = list(slot_names)
+        code.lookup = {name: list(slots) for name, slots in lookup}
+    else:
+        code.slot_names = module.slot_names
+        code.lookup = module.lookup
+    return code
+
+
+def source_hash(source: str | bytes) -> bytes:
+    return hashlib.sha256(source.encode("utf-8") if isinstance(source, str) else source).digest()
+
+
+def dumps(module: Module, source: str) -> bytes:
+    """
+    Serializes a module, tagging it with the hash of the source it was compiled from.
+    """
+    body = (
+        module.nlocals,
+        tuple(module.slot_names),
+        tuple((name, tuple(slots)) for name, slots in module.lookup.items()),
+        tuple(module.globals.items()),
+        tuple(encode_code(statement)[:7] + ((), ()) for statement in module.statements),
+        tuple(module.inner_names),
+    )
+    return MAGIC + bytes([FORMAT_VERSION]) + source_hash(source) + marshal.dumps(body)
+
+
+def loads(data: bytes, source: str = None) -> Module:
+    """
+    Deserializes a module. Returns None if the data is not bytecode of this
+    format, or if it was compiled from a source other than the one given.
+    """
+    header = len(MAGIC) + 1
+    if data[:len(MAGIC)] != MAGIC or data[len(MAGIC)] != FORMAT_VERSION:
+        return None
+    if source is not None and data[header:header + 32] != source_hash(source):
+        return None
+    try:
+        nlocals, slot_names, lookup, globals_, statements, inner_names = marshal.loads(data[header + 32:])
+    except (EOFError, ValueError, TypeError):
+        return None
+    module = Module()
+    module.nlocals = nlocals
+    module.slot_names = list(slot_names)
+    module.lookup = {name: list(slots) for name, slots in lookup}
+    module.globals = dict(globals_)
+    module.inner_names = set(inner_names)
+    module.statements = [decode_code(statement, module) for statement in statements]
+    return module
+
+
+def dump(module: Module, source: str, path: str):
+    """
+    Saves a module to path. It is written to a temporary file first, which
+    then replaces path, so that programs saving the same module at once,
+    from other processes or threads, never read or write a partial one.
+    """
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(dumps(module, source))
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def load(path: str, source: str = None) -> Module:
+    try:
+        with open(path, "rb") as f:
+            return loads(f.read(), source)
+    except OSError:
+        return None
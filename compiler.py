@@ -0,0 +1,596 @@
+import operator
+from fractions import Fraction
+from typing import Callable
+from utils.datatypes import AST, NumLiteral, BinOp, Variable, Value, Let, If, BoolLiteral, UnOp, ASTSequence, Assign, ForLoop, Range, Print, Declare, While, DoWhile, StringLiteral, ListObject, StringSlice, ListCons, ListOp, funct_call, funct_def, funct_ret, ListIndex
+
+from core import RuntimeEnvironment, Frame, Jump, UNSET
+from utils.resolver import Slot, TailCall
+from utils.numbers import divide, gossip_type
+from utils.memo import Memo, MISSING, memo_key
+from utils.errors import DeclarationError, InvalidProgramError, InvalidConditionError, VariableRedeclarationError, InvalidConcatenationError, IndexOutOfBoundsError, InvalidOperation, InvalidArgumentToList, ListError, BadAssignment
+
+
+Closure = Callable[[], Value]
+
+
+class ClosureCompiler():
+    """
+    Compiles an AST into a tree of pre-bound Python closures.
+    The AST is walked exactly once, at compile time; running the result
+    only calls closures, and never goes back through the dispatch in
+    RuntimeEnvironment.eval. The closures read and write the frames of the
+    runtime they were compiled against, at the slots its resolver assigned,
+    so compiled code and eval can be mixed on the same runtime.
+    """
+    def __init__(self, runtime: RuntimeEnvironment = None):
+        self.runtime = runtime if runtime is not None else RuntimeEnvironment()
+        self.bodies = {}
+
+    def run(self, program: AST) -> Value:
+        """
+        Compiles and immediately runs a program.
+        """
+        with self.runtime.numbers.context():
+            return self.compile(program)()
+
+    def compile(self, program: AST) -> Closure:
+        """
+        Resolves a top-level program against the runtime, then compiles it.
+        """
+        return self.compile_node(self.runtime.resolve(program))
+
+    def compile_body(self, body: AST) -> Closure:
+        """
+        Compiles a function body once, and reuses it for every later call.
+        """
+        key = id(body)
+        if key not in self.bodies:
+            # Keep the node alive alongside its closure, so its id is never reused.
+            self.bodies[key] = (body, self.compile_node(body))
+        return self.bodies[key][1]
+
+    def frame_getter(self, depth: int) -> Callable[[], Frame]:
+        """
+        Returns a function fetching the frame depth frames up from the current one.
+        """
+        runtime = self.runtime
+        if depth == 0:
+            return lambda: runtime.frame
+        if depth == 1:
+            return lambda: runtime.frame.parent
+
+        def frame():
+            frame = runtime.frame
+            for _ in range(depth):
+                frame = frame.parent
+            return frame
+        return frame
+
+    def compile_node(self, program: AST) -> Closure:
+        """
+        Recursively compiles a resolved AST or ASTSequence into a closure
+        that takes no arguments and returns the Value of the program.
+        """
+        runtime = self.runtime
+        locate = runtime.locate
+        frames = runtime.frames
+
+        match program:
+            case NumLiteral(value):
+                value = runtime.numbers.number(value)
+                return lambda: value
+
+            case BoolLiteral(value) | StringLiteral(value):
+                return lambda: value
+
+            case StringSlice(Variable(name), start, end):
+                full_string = self.compile_node(Variable(name))
+                start = self.compile_node(start)
+                end = self.compile_node(end)
+
+                def string_slice():
+                    string = full_string()
+                    strt = int(start())
+                    d_end = int(end())
+                    try:
+                        return string[strt:d_end]
+                    except:
+                        if(strt<0 or d_end>len(string)):
+                            raise IndexOutOfBoundsError("Slice Index out of range")
+                        raise IndexOutOfBoundsError()
+                return string_slice
+
+            case ListObject(elements, element_type):
+                elements = [self.compile_node(element) for element in elements]
+
+                def list_object():
+                    values = []
+                    # A list whose type the parser could not infer takes the type of its first element.
+                    the_type = element_type
+                    for element in elements:
+                        value = element()
+                        if the_type is None:
+                            the_type = gossip_type(value)
+                        if gossip_type(value) is not the_type:
+                            raise InvalidArgumentToList(the_type)
+                        values.append(value)
+                    return values
+                return list_object
+
+            case ListCons(to_add, base_list):
+                if not isinstance(base_list, (ListObject, Variable)):
+                    def not_a_list():
+                        raise ListError("Argument to Cons() is not a list.")
+                    return not_a_list
+
+                to_add = self.compile_node(to_add)
+                base = self.compile_node(base_list)
+                var = base_list if isinstance(base_list, Variable) else None
+
+                def list_cons():
+                    value = to_add()
+                    values = None
+                    if var is None:
+                        the_type = base_list.element_type
+                        if the_type is None:
+                            values = base()
+                            the_type = gossip_type(values[0])
+                    else:
+                        frame, slot = locate(var)
+                        if frame is None or frame.element_types[slot] is None:
+                            raise ListError("Variable referenced during Cons operation doesn't exist.")
+                        the_type = frame.element_types[slot]
+
+                    if gossip_type(value) is not the_type:
+                        raise ListError("Input element is not of the same type as given list type.")
+
+                    new_list = [value]
+                    new_list.extend(base() if values is None else values)
+                    if var is not None:
+                        frame.values[slot] = new_list
+                    return new_list
+                return list_cons
+
+            case Slot(name=name, depth=depth, slot=slot):
+                outer = self.frame_getter(depth)
+
+                def local():
+                    value = outer().values[slot]
+                    if value is UNSET:
+                        frame, found = locate(program)
+                        if frame is None:
+                            raise DeclarationError(name)
+                        return frame.values[found]
+                    return value
+
+                if depth == 0:
+                    def local():
+                        value = runtime.frame.values[slot]
+                        if value is UNSET:
+                            frame, found = locate(program)
+                            if frame is None:
+                                raise DeclarationError(name)
+                            return frame.values[found]
+                        return value
+                return local
+
+            case Variable(name):
+                def variable():
+                    frame, slot = locate(program)
+                    if frame is None:
+                        raise DeclarationError(name)
+                    return frame.values[slot]
+                return variable
+
+            case Declare(Slot(name=name, slot=slot), value):
+                if isinstance(value, ListObject):
+                    element_type = value.element_type
+                    value = self.compile_node(value)
+
+                    def declare():
+                        frame = runtime.frame
+                        if frame.values[slot] is not UNSET:
+                            raise VariableRedeclarationError(name)
+                        elems = value()
+                        frame.values[slot] = elems
+                        frame.types[slot] = list
+                        frame.element_types[slot] = element_type or gossip_type(elems[0])
+                        return elems
+                    return declare
+
+                if isinstance(value, Variable):
+                    source = value
+                    value = self.compile_node(value)
+
+                    def declare():
+                        frame = runtime.frame
+                        if frame.values[slot] is not UNSET:
+                            raise VariableRedeclarationError(name)
+                        value_to_be_declared = value()
+                        source_frame, source_slot = locate(source)
+                        frame.values[slot] = value_to_be_declared
+                        frame.types[slot] = gossip_type(value_to_be_declared)
+                        frame.element_types[slot] = source_frame.element_types[source_slot] if source_frame.types[source_slot] is list else None
+                        return value_to_be_declared
+                    return declare
+
+                value = self.compile_node(value)
+
+                def declare():
+                    frame = runtime.frame
+                    if frame.values[slot] is not UNSET:
+                        raise VariableRedeclarationError(name)
+                    value_to_be_declared = value()
+                    frame.values[slot] = value_to_be_declared
+                    frame.types[slot] = gossip_type(value_to_be_declared)
+                    frame.element_types[slot] = None
+                    return value_to_be_declared
+                return declare
+
+            case Assign(Slot(name=name, depth=depth, slot=slot), expression):
+                var = program.var
+                outer = self.frame_getter(depth)
+                expression = self.compile_node(expression)
+
+                def assign():
+                    val = expression()
+                    frame = outer()
+                    if frame.values[slot] is UNSET:
+                        frame, found = locate(var)
+                    else:
+                        found = slot
+                    var_type = None if frame is None else frame.types[found]
+                    val_type = type(val)
+                    if val_type is not var_type:
+                        val_type = gossip_type(val)
+                    if var_type is not val_type:
+                        raise BadAssignment(name, var_type, val_type)
+                    frame.values[found] = val
+                    return val
+                return assign
+
+            case Assign(Variable(name), expression):
+                var = program.var
+                expression = self.compile_node(expression)
+
+                def assign():
+                    val = expression()
+                    frame, slot = locate(var)
+                    var_type = None if frame is None else frame.types[slot]
+                    val_type = type(val)
+                    if val_type is not var_type:
+                        val_type = gossip_type(val)
+                    if var_type is not val_type:
+                        raise BadAssignment(name, var_type, val_type)
+                    frame.values[slot] = val
+                    return val
+                return assign
+
+            case ASTSequence(seq):
+                """
+                Special case. Runs all but the last closure in a loop,
+                then returns the value of the last one.
+                """
+                *init, last = [self.compile_node(ast) for ast in seq]
+
+                def sequence():
+                    for ast in init:
+                        ast()
+                    return last()
+                return sequence
+
+            case Let(Variable(name), e1, e2):
+                scope = program.scope
+                e1 = self.compile_node(e1)
+                e2 = self.compile_node(e2)
+
+                def let():
+                    val = e1()
+                    frame = frames.acquire(scope, runtime.frame)
+                    frame.values[0] = val
+                    frame.types[0] = gossip_type(val)
+                    frame.element_types[0] = None
+                    runtime.frame = frame
+                    try:
+                        return e2()
+                    finally:
+                        runtime.frame = frame.parent
+                        frames.release(frame)
+                return let
+
+            case Range(left, right, step):
+                """
+                Returns an iterator over the range, which produces its values
+                only as they are consumed.
+                """
+                numbers = runtime.numbers
+                left = self.compile_node(left)
+                right = self.compile_node(right)
+                step = self.compile_node(step) if step is not None else (lambda: 1)
+                return lambda: numbers.range(left(), right(), step())
+
+            case Print(ASTSequence(expression_list)):
+                def print_sequence():
+                    for expression in expression_list[:-1]:
+                        print(expression.value)
+                    print(expression_list[-1].value, end="")
+                    return expression_list[-1].value
+                return print_sequence
+
+            case Print(expression):
+                expression = self.compile_node(expression)
+
+                def print_value():
+                    to_return = expression()
+                    print(to_return)
+                    return to_return
+                return print_value
+
+            case ListOp(op, base_list) if op in ("is-empty?", "head", "tail"):
+                label = "Head" if op == "head" else "IsEmpty"
+                base = self.compile_node(base_list)
+                var = base_list if isinstance(base_list, Variable) else None
+                check = not isinstance(base_list, ListObject)
+
+                def list_op():
+                    if check:
+                        frame, slot = (None, None) if var is None else locate(var)
+                        if frame is None or frame.types[slot] is not list:
+                            raise ListError(f"Argument to {label}() is not a list.")
+                    values = base()
+                    if op == "is-empty?":
+                        return len(values) == 0
+                    if len(values) == 0:
+                        raise ListError(f"No {op} in an empty list")
+                    return values[0] if op == "head" else values[1:]
+                return list_op
+
+            case ListIndex(index, base_list):
+                index = self.compile_node(index)
+                base = self.compile_node(base_list)
+
+                def list_index():
+                    values = base()
+                    ind = int(index())
+                    if(ind<0 or ind>=len(values)):
+                        raise ListError("Index out of range.")
+                    return values[ind]
+                return list_index
+
+            case BinOp("+", left, right):
+                left = self.compile_node(left)
+                right = self.compile_node(right)
+
+                def add():
+                    try:
+                        return left() + right()
+                    except:
+                        raise InvalidConcatenationError()
+                return add
+
+            case BinOp(op, left, right) if op in BINARY_OPERATORS:
+                operation = runtime.numbers.divide if op == "/" else BINARY_OPERATORS[op]
+                left = self.compile_node(left)
+                right = self.compile_node(right)
+
+                def binop():
+                    l = left()
+                    r = right()
+                    try:
+                        return operation(l, r)
+                    except:
+                        raise InvalidOperation(op, l, r)
+                return binop
+
+            case UnOp("-", right):
+                operand = self.compile_node(right)
+
+                def negate():
+                    try:
+                        return 0 - operand()
+                    except:
+                        # Like the tree-walker, which finds no case for the negation once it has failed.
+                        InvalidOperation("Unary Negation", right)
+                        raise InvalidProgramError(f"Runtime environment does not support program: {program}.")
+                return negate
+
+            case If(cond, e1, e2):
+                cond = self.compile_node(cond)
+                e1 = self.compile_node(e1)
+                e2 = self.compile_node(e2) if e2 is not None else (lambda: None)
+
+                def if_then_else():
+                    if cond() == True:
+                        return e1()
+                    return e2()
+                return if_then_else
+
+            case ForLoop(Variable(name), sequence, stat):
+                scope = program.scope
+                stat = self.compile_node(stat)
+                if isinstance(sequence, ASTSequence):
+                    elements = [self.compile_node(expression) for expression in sequence.seq]
+                    values = lambda: [element() for element in elements]
+                else:
+                    sequence = self.compile_node(sequence)
+
+                    def values():
+                        evaluated = sequence()
+                        if isinstance(evaluated, ASTSequence):
+                            return [self.compile_node(expression)() for expression in evaluated.seq]
+                        return evaluated
+
+                def for_loop():
+                    result = None
+                    frame = frames.acquire(scope, runtime.frame)
+                    try:
+                        for v1 in values():
+                            frame.values[0] = v1
+                            frame.types[0] = gossip_type(v1)
+                            runtime.frame = frame
+                            result = stat()
+                            runtime.frame = frame.parent
+                            frame.reset()
+                    finally:
+                        runtime.frame = frame.parent
+                        frames.release(frame)
+                    return result
+                return for_loop
+
+            case While(cond, sequence):
+                scope = program.scope
+                cond_node = cond
+                cond = self.compile_node(cond)
+                again = self.compile_node(program.again)
+                sequence = self.compile_node(sequence)
+
+                def while_loop():
+                    truth_value = cond()
+                    if type(truth_value) != bool:
+                        raise InvalidConditionError(cond_node)
+
+                    final_value = None
+                    frame = frames.acquire(scope, runtime.frame)
+                    try:
+                        while truth_value:
+                            runtime.frame = frame
+                            final_value = sequence()
+                            truth_value = again()
+                            runtime.frame = frame.parent
+                            frame.reset()
+                    finally:
+                        runtime.frame = frame.parent
+                        frames.release(frame)
+                    return final_value
+                return while_loop
+
+            case DoWhile(sequence, cond):
+                scope = program.scope
+                cond_node = cond
+                cond = self.compile_node(cond)
+                again = self.compile_node(program.again)
+                sequence = self.compile_node(sequence)
+
+                def do_while_loop():
+                    frame = frames.acquire(scope, runtime.frame)
+                    try:
+                        runtime.frame = frame
+                        final_value = sequence()
+                        runtime.frame = frame.parent
+                        frame.reset()
+
+                        truth_value = cond()
+                        if type(truth_value) != bool:
+                            raise InvalidConditionError(cond_node)
+
+                        while truth_value:
+                            runtime.frame = frame
+                            final_value = sequence()
+                            truth_value = again()
+                            runtime.frame = frame.parent
+                            frame.reset()
+                    finally:
+                        runtime.frame = frame.parent
+                        frames.release(frame)
+                    return final_value
+                return do_while_loop
+
+            case funct_ret(funct_val):
+                return self.compile_node(funct_val)
+
+            case funct_def(Slot(slot=slot), arg_list, body):
+                self.compile_body(body)
+                zero = runtime.numbers.number(0)
+
+                name = program.name.name
+
+                def define():
+                    runtime.memo.define(name, program)
+                    runtime.frame.values[slot] = program
+                    runtime.frame.types[slot] = str
+                    runtime.frame.element_types[slot] = None
+                    return zero
+                return define
+
+            #dynamic scoping on function calls
+            case funct_call(Variable(name), arg_val):
+                args = [self.compile_node(arg) for arg in arg_val]
+                tail = type(program) is TailCall
+                # The inline cache of the call site: the slot of the global
+                # function it last called, the function and its body.
+                site = [None, None, None]
+                global_values = runtime.globals.values
+                inner_names = runtime.globals.scope.inner_names
+
+                def call():
+                    slot, function, code = site
+                    if function is None or global_values[slot] is not function or name in inner_names:
+                        function, slot = runtime.find_function(program)
+                        code = self.compile_body(function.body)
+                        if slot is not None:
+                            site[:] = slot, function, code
+
+                    if tail and function.scope is runtime.frame.scope:
+                        return Jump([arg() for arg in args])
+
+                    callee = frames.acquire(function.scope, runtime.frame)
+                    for x, arg in enumerate(args):
+                        v1 = arg()
+                        callee.values[x] = v1
+                        callee.types[x] = gossip_type(v1)
+                        callee.element_types[x] = None
+
+                    table = runtime.memo.table(name, function) if runtime.memo.active else None
+                    if table is not None:
+                        key = memo_key(callee.values[:len(args)])
+                        value = table.get(key)
+                        if value is not MISSING:
+                            frames.release(callee)
+                            return value
+
+                    runtime.frame = callee
+                    try:
+                        value = code()
+                        while type(value) is Jump:
+                            callee.rebind(value.args)
+                            value = code()
+                    finally:
+                        runtime.frame = callee.parent
+                        frames.release(callee)
+                    if table is not None:
+                        table.put(key, value)
+                    return value
+                return call
+
+        def unsupported():
+            raise InvalidProgramError(f"Runtime environment does not support program: {program}.")
+        return unsupported
+
+
+class CompiledRuntimeEnvironment(RuntimeEnvironment):
+    """
+    A drop-in replacement for RuntimeEnvironment, whose eval compiles the
+    program to closures before running it.
+    """
+    def __init__(self, numbers: str = "fraction", precision: int = 28, memo: Memo = None):
+        super().__init__(numbers, precision, memo=memo)
+        self.compiler = ClosureCompiler(self)
+
+    def eval(self, program: AST or ASTSequence) -> Value:
+        return self.compiler.run(program)
+
+
+BINARY_OPERATORS = {
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": divide,
+    "%": operator.mod,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    ">": operator.gt,
+    "<=": operator.le,
+    ">=": operator.ge,
+    "&&": lambda l, r: l and r,
+    "||": lambda l, r: l or r,
+}
@@ -1,651 +1,760 @@
-from dataclasses import dataclass
-from fractions import Fraction
-from typing import Union, Mapping
-from utils.datatypes import AST, NumLiteral, BinOp, Variable, Value, Let, If, BoolLiteral, UnOp, ASTSequence, Variable, Assign, ForLoop, Range, Print, Declare, Assign, While, DoWhile, StringLiteral, ListObject, StringSlice, ListCons, ListOp, funct_call, funct_def, funct_ret, ListIndex
-from utils.datatypes import NumType,BoolType,StringType,ListType
-
-from utils.errors import DeclarationError, InvalidProgramError, InvalidConditionError, VariableRedeclarationError, AssignmentUsingNone, InvalidConcatenationError, IndexOutOfBoundsError, InvalidOperation, InvalidArgumentToList, ListError, ReferentialError, BadAssignment
-
-
-class RuntimeEnvironment():
-    """
-    The runtime environment. Instantiate to start a new environment.
-    Includes, most importantly, the eval method, which evaluates an AST
-    recursively.
-    """
-    def __init__(self):
-        self.environments = []
-        self.environments.append({})
-        self.environment = self.environments[0]
-        self.scope = 0
-
-    def eval(self, program: AST or ASTSequence, environment = None, reset_scope = False) -> Value:
-        """
-        Recursively evaluates an AST or ASTSequence, returning a Value.
-        By default, retains the environment from the runtime environment.
-        However, you can pass in an environment to override this.
-        """
-        if environment:
-            self.environment = environment
-        if not self.environment:
-            self.environment = {}
-
-        match program:
-            case NumLiteral(value):
-                return value
-            
-            case BoolLiteral(value):
-                return value
-            
-            case StringLiteral(value):
-                return value
-            
-            case StringSlice(Variable(name),start, end):
-                full_string = self.eval(Variable(name))
-
-                #slice indices must be integers and our default type is Fraction for numbers
-                strt = int(self.eval(start))
-                d_end = int(self.eval(end))
-
-                
-                try:
-                    return full_string[strt:d_end]
-                except:
-                    if(strt<0 or d_end>len(full_string)):
-                        raise IndexOutOfBoundsError("Slice Index out of range")
-                    else:
-                        raise IndexOutOfBoundsError()
-
-            case ListObject(elements,element_type):
-                n = len(elements)
-
-                for i in range(n):
-                    if(type(self.eval(elements[i])) is not element_type):
-                        raise InvalidArgumentToList(element_type)
-                    elements[i] = self.eval(elements[i])
-                
-                return elements
-            
-
-            case ListCons(to_add, base_list):
-                to_add = self.eval(to_add)
-                the_type = None
-                scp = self.scope
-
-                if(isinstance(base_list,ListObject)):
-                    the_type = base_list.element_type
-                elif(isinstance(base_list,Variable)):
-
-                    while(scp>=0):
-                        if(base_list.name in self.environments[scp]):
-                            the_type = self.environments[scp][base_list.name]['element_type']
-                    
-                        scp-=1
-
-                    if(the_type==None):
-                        raise ListError("Variable referenced during Cons operation doesn't exist.")
-                                        
-                else:
-                    raise ListError("Argument to Cons() is not a list.")
-                
-                if(type(to_add) is not the_type):
-                    raise ListError("Input element is not of the same type as given list type.")
-
-                new_list = []
-                new_list.append(to_add)
-                
-                if isinstance(base_list,ListObject):
-                    for num in base_list:
-                        new_list.append(num)
-                else:
-                    for num in self.eval(base_list):
-                        new_list.append(num)
-                
-
-                if isinstance(base_list,Variable):
-                    SCOPE = self.scope
-                    self.environments[SCOPE][base_list.name]['value'] = new_list
-                
-                return new_list            
-            
-
-            case Variable(name):
-                scope = self.scope
-                while len(self.environments) < (scope + 1):
-                    scope -= 1
-
-                while scope >= 0:
-                    if name in self.environments[scope]:
-                        return self.environments[scope][name]['value']
-                    scope -= 1
-
-                raise DeclarationError(name)
-            
-            
-            case Declare(Variable(name), value):
-                curent_scope = self.scope
-                while len(self.environments) < (curent_scope + 1):
-                    curent_scope -= 1
-                # print(self.environments)
-                if name in self.environments[curent_scope]:
-                    raise VariableRedeclarationError(name)
-
-                if isinstance(value,ListObject):
-                    elems = self.eval(value)
-                    #scp = self.scope
-                    
-                    self.environments[curent_scope][name] = {}
-                    self.environments[curent_scope][name]['value'] = elems
-                    self.environments[curent_scope][name]['type'] = list
-                    self.environments[curent_scope][name]['element_type'] = value.element_type
-
-                    return elems
-                
-                elif isinstance(value,Variable):
-                    value_to_be_declared = self.eval(value)
-                    value_type = None
-                    value_name = value.name
-                    if_val_is_list_its_el_type = None
-
-                    scp = self.scope
-                    while len(self.environments) < (scp + 1):
-                        scp-= 1
-
-                    while scp >= 0:
-                        if value_name in self.environments[scp]:
-                            value_type = self.environments[scp][value_name]['type']
-
-                            if(value_type is list):
-                                if_val_is_list_its_el_type = self.environments[scp][value_name]['element_type']
-
-                        scp -= 1
-
-                    #curent_scope = self.scope
-
-                    if if_val_is_list_its_el_type == None:
-                        
-                        self.environments[curent_scope][name] = {}
-                        self.environments[curent_scope][name]['value'] = value_to_be_declared
-                        self.environments[curent_scope][name]['type'] = type(value_to_be_declared)
-
-                    else:
-                        
-                        self.environments[curent_scope][name] = {}
-                        self.environments[curent_scope][name]['value'] = value_to_be_declared
-                        self.environments[curent_scope][name]['type'] = type(value_to_be_declared)
-                        self.environments[curent_scope][name]['element_type'] = if_val_is_list_its_el_type
-                
-                    return value_to_be_declared
-
-                else:
-                    value_to_be_declared = self.eval(value)
-                    #curent_scope = self.scope
-                    
-                    
-                    self.environments[curent_scope][name] = {}
-                    self.environments[curent_scope][name]['value'] = value_to_be_declared
-                    self.environments[curent_scope][name]['type'] = type(value_to_be_declared)
-
-                    return value_to_be_declared
-                
-            
-            case Assign(Variable(name), expression):
-                val = self.eval(expression)
-
-                var_type = None
-                scp = self.scope
-
-                if len(self.environments) < (scp + 1):
-                    scp = len(self.environments) - 1 
-
-                while scp >= 0:
-                    if name in self.environments[scp]:
-                        var_type = self.environments[scp][name]['type']
-                        break 
-                    scp -= 1
-                
-                if(var_type is not type(val)):
-                    raise BadAssignment(name,var_type,type(val))
-
-                if name in self.environments[scp]:
-                    self.environments[scp][name]['value'] = val
-                else:
-                    flag = False
-                    scope = scp-1
-                    while scope >= 0:
-                        if name in self.environments[scope]:
-                            flag = True
-                            self.environments[scope][name]['value'] = val
-                            break
-                        else:
-                            scope -= 1
-                    
-                    if not flag:
-                        raise DeclarationError(name)    
-                
-                return val
-            
-            case ASTSequence(seq):
-                """
-                Special case. Evaluates all but the last element in a loop, 
-                then returns the evaluation of the last element.
-                """
-                for ast in seq[:-1]:
-                    x = self.eval(ast)
-
-                return self.eval(seq[-1])
-            
-
-            case Let(Variable(name), e1, e2):
-                """
-                Let is a special case. It evaluates e1, then adds the result
-                to the environment, then evaluates e2 with the new environment.
-                """
-                val = self.eval(e1)
-                self.scope += 1
-                self.environments.append({ name: {'value': val} })
-                expression = self.eval(e2)
-                self.environments.pop()
-                self.scope -= 1
-                return expression
-
-            case Range(left, right):
-                """
-                Evaluates and returns range from left to return, as an ASTSequence.
-                """
-                AST_sequence = []
-                for i in range(int(left.value), int(right.value)+1):
-                    AST_sequence.append(NumLiteral(i))
-                return ASTSequence(AST_sequence)
-
-            case Print(expression):
-                if isinstance(expression, ASTSequence):
-                    expression_list = expression.seq
-                    for expression in expression_list[:-1]:
-                        print(expression.value) # TODO replace with something like: extract_value(exp)
-                                                # TODO so it works both for strings and numbers.
-                    print(expression_list[-1].value, end="")
-                    return expression_list[-1].value
-                else:
-                    to_return = self.eval(expression)
-                    print(to_return)
-                    return to_return
-
-            
-            case ListOp("is-empty?", base_list):
-                value_type = None
-
-                if(not isinstance(base_list,ListObject)):
-                    if(isinstance(base_list,Variable)):
-                        value_name = base_list.name
-                        scp = self.scope
-                        while len(self.environments) < (scp + 1):
-                            scp-= 1
-
-                        while scp >= 0:
-                            if value_name in self.environments[scp]:
-                                value_type = self.environments[scp][value_name]['type']
-
-                            scp -= 1
-                    
-                    if(value_type is not list):
-                        raise ListError("Argument to IsEmpty() is not a list.")
-
-                
-                
-                base_list = self.eval(base_list)  
-                if(len(base_list)!=0):
-                    return False
-                else:
-                    return True
-
-            case ListOp("head", base_list):
-
-                value_type = None
-
-                if(not isinstance(base_list,ListObject)):
-                    if(isinstance(base_list,Variable)):
-                        value_name = base_list.name
-                        scp = self.scope
-                        while len(self.environments) < (scp + 1):
-                            scp-= 1
-
-                        while scp >= 0:
-                            if value_name in self.environments[scp]:
-                                value_type = self.environments[scp][value_name]['type']
-
-                            scp -= 1
-                    
-                    if(value_type is not list):
-                        raise ListError("Argument to Head() is not a list.")
-                
-                
-                
-                base_list = self.eval(base_list)
-                if(len(base_list)==0):
-                    raise ListError("No head in an empty list")
-                else:
-                    return base_list[0]
-            
-            case ListOp("tail", base_list):
-                
-                value_type = None
-
-                if(not isinstance(base_list,ListObject)):
-                    if(isinstance(base_list,Variable)):
-                        value_name = base_list.name
-                        scp = self.scope
-                        while len(self.environments) < (scp + 1):
-                            scp-= 1
-
-                        while scp >= 0:
-                            if value_name in self.environments[scp]:
-                                value_type = self.environments[scp][value_name]['type']
-
-                            scp -= 1
-                    
-                    if(value_type is not list):
-                        raise ListError("Argument to IsEmpty() is not a list.")
-                
-                
-                base_list = self.eval(base_list)
-                if(len(base_list)==0):
-                    raise ListError("No tail in an empty list")
-                else:
-                    return base_list[1:]
-            
-
-            case ListIndex(index,base_list):
-                value_type = None
-
-                if(not isinstance(base_list,ListObject)):
-                    if(isinstance(base_list,Variable)):
-                        value_name = base_list.name
-                        scp = self.scope
-                        while len(self.environments) < (scp + 1):
-                            scp-= 1
-
-                        while scp >= 0:
-                            if value_name in self.environments[scp]:
-                                value_type = self.environments[scp][value_name]['type']
-
-                            scp -= 1
-                    
-                    # if(value_type is not list):
-                    #     raise ListError("Object attempted to be indexed is not a list.")
-                
-
-
-                base_list = self.eval(base_list)
-                ind = int(self.eval(index))
-
-                if(ind<0 or ind>=len(base_list)):
-                    raise ListError("Index out of range.")
-                else:
-                    return base_list[ind]
-                
-                
-
-            # Binary operations are all the same, except for the operator.
-            case BinOp("+", left, right):
-                try:
-                    if(left.type==StringType and right.type==StringType):
-                        # print("gotcha")
-                        dummy_string = left.value + right.value
-                        return dummy_string
-                    else:
-                        left = self.eval(left)
-                        right = self.eval(right)
-                        return left + right
-                except:
-                    raise InvalidConcatenationError()
-                    
-
-            case BinOp("-", left, right):
-                left = self.eval(left)
-                right = self.eval(right)
-                try:
-                    return left - right
-                except:
-                    raise InvalidOperation("-",left,right)
-                
-            case BinOp("*", left, right):
-                left = self.eval(left)
-                right = self.eval(right)
-                try:
-                    return left * right
-                except:
-                    raise InvalidOperation("*",left,right)
-                
-            case BinOp("/", left, right):
-                left = self.eval(left)
-                right = self.eval(right)
-                try:
-                    return left / right
-                except:
-                    raise InvalidOperation("/",left,right)
-            
-            case BinOp("%", left, right):
-                left = self.eval(left)
-                right = self.eval(right)
-
-                try:
-                    return left%right
-                except:
-                    raise InvalidOperation("%", left, right)
-                
-            case BinOp("==", left, right):
-                left = self.eval(left)
-                right = self.eval(right)
-                
-                try:
-                    return left == right
-                except:
-                    raise InvalidOperation("==",left,right)
-                
-            case BinOp("!=", left, right):
-                left = self.eval(left)
-                right = self.eval(right)
-                
-                try:
-                    return left != right
-                except:
-                    raise InvalidOperation("!=",left,right)
-                
-            case BinOp("<", left, right):
-                left = self.eval(left)
-                right = self.eval(right)
-
-                try:
-                    return left < right
-                except:
-                    raise InvalidOperation("<",left,right)
-                
-            case BinOp(">", left, right):
-                left = self.eval(left)
-                right = self.eval(right)
-
-                try:
-                    return left > right
-                except:
-                    raise InvalidOperation(">",left,right)
-                
-            case BinOp("<=", left, right):
-                left = self.eval(left)
-                right = self.eval(right)
-                
-                try:
-                    return left <= right
-                except:
-                    raise InvalidOperation("<=",left,right)
-                
-            case BinOp(">=", left, right):
-                left = self.eval(left)
-                right = self.eval(right)
-                
-                try:
-                    return left >= right
-                except:
-                    raise InvalidOperation(">=",left,right)
-                
-            case BinOp("&&", left, right):
-                left = self.eval(left)
-                right = self.eval(right)
-                
-                try:
-                    return left and right
-                except:
-                    raise InvalidOperation("&&",left,right)
-                
-            case BinOp("||", left, right):
-                left = self.eval(left)
-                right = self.eval(right)
-                
-                try:
-                    return left or right
-                except:
-                    raise InvalidOperation("||",left,right)
-
-            # Unary operation is the same, except for the operator.
-            case UnOp("-", right):
-                try:
-                    return 0 - self.eval(right)
-                except:
-                    InvalidOperation("Unary Negation",right)
-
-            # Again, If is different, so we define it separately.
-            case If(cond, e1, e2):
-                if self.eval(cond) == True:
-                    self.scope += 1
-                    to_return = self.eval(e1)
-                    self.scope -= 1
-                else:
-                    self.scope += 1
-                    if(e2==None):
-                        return None 
-                    to_return = self.eval(e2)
-                    self.scope -= 1
-                
-                return to_return
-            
-            case ForLoop(Variable(name), sequence, stat):
-                if not isinstance(sequence, ASTSequence):
-                    sequence = self.eval(sequence)
-                length = sequence.length
-                value_list = sequence.seq
-                for expression in value_list: 
-                    v1 = self.eval(expression)
-                    self.scope += 1
-                    self.environments.append({ name : {"value": v1, "type": type(v1) }})
-                    result = self.eval(stat)
-                    self.scope -= 1
-                    self.environments.pop()
-                return(result)
-            
-            case While(cond, sequence):
-                truth_value = self.eval(cond)
-
-                if type(truth_value) != bool:
-                    raise InvalidConditionError(cond)
-                
-                final_value = None
-
-                while(truth_value):
-
-                    self.scope += 1
-                    scp = self.scope
-                    
-                    current_scope_mappings={}
-                    self.environments.append(current_scope_mappings)
-                    final_value = self.eval(sequence)
-                    
-                    truth_value= self.eval(cond)
-                    self.environments.pop()
-                    self.scope -= 1
-                
-                return final_value
-            
-            case DoWhile(sequence, cond):
-                final_value = None
-                self.scope += 1
-                scp = self.scope
-                    
-                current_scope_mappings={}
-                self.environments.append(current_scope_mappings)
-                final_value = self.eval(sequence)
-
-                self.environments.pop()
-                self.scope -= 1
-
-                truth_value = self.eval(cond)
-
-                if type(truth_value) != bool:
-                    raise InvalidConditionError
-                
-                while(truth_value):
-
-                    self.scope += 1
-                    scp = self.scope
-                    
-                    current_scope_mappings={}
-                    self.environments.append(current_scope_mappings)
-                    final_value = self.eval(sequence)
-                    
-                    truth_value= self.eval(cond)
-                    self.environments.pop()
-                    self.scope -= 1
-                
-                return final_value
-            
-            case funct_ret(funct_val):
-                #print(funct_val)
-                return(self.eval(funct_val))
-            
-            case funct_def(Variable(name), arg_list, body):
-            
-                func = [arg_list, body]
-                funct_1 =  {"value":func, "type": str}
-                scp = self.scope
-                while len(self.environments) < (scp + 1):
-                        scp-= 1
-                
-                self.environments[scp][name] = funct_1
-                # print(self.environments)
-                return(self.eval(NumLiteral(0)))
-            
-
-            #dynamic scoping on function calls 
-            case funct_call(Variable(name), arg_val):
-                self.scope +=1
-                src = self.scope
-                # print(src)
-                if(len(self.environments)<self.scope + 1):
-                    src = len(self.environments) - 1
-
-                # print(src)
-                while src >=0:
-                    if name in self.environments[src]:  
-                        dictt = {}
-                        arg_name = self.environments[src][name]["value"][0]
-
-                        if(len(arg_name)!=len(arg_val)):
-                            raise Exception("Not enough arguements")
-                        
-                        for x in range(len(arg_name)):
-                            v1 = self.eval(arg_val[x])
-                            dictt[arg_name[x].name] = {"value":v1, "type": type(v1)}
-
-                        self.environments.append(dictt)
-                        m = self.eval(self.environments[src][name]["value"][1])
-                        if(len(self.environments)>1):
-                            self.environments.pop()
-                        self.scope -= 1 
-                        return(m)
-                    else:
-                            src -= 1 
-                    
-                    
-                raise Exception("Function is not defined")               
-            
-                
-        raise InvalidProgramError(f"Runtime environment does not support program: {program}.")
+from dataclasses import dataclass
+from fractions import Fraction
+from typing import Union, Mapping
+from utils.datatypes import AST, NumLiteral, BinOp, Variable, Value, Let, If, BoolLiteral, UnOp, ASTSequence, Variable, Assign, ForLoop, Range, Print, Declare, Assign, While, DoWhile, StringLiteral, ListObject, StringSlice, ListCons, ListOp, funct_call, funct_def, funct_ret, ListIndex
+from utils.datatypes import NumType,BoolType,StringType,ListType
+from utils.resolver import Scope, Resolver, Slot, TailCall
+from utils.flatast import Cursor
+from utils.numbers import NumericMode, gossip_type
+from utils.memo import Memo, MISSING, memo_key
+
+from utils.errors import DeclarationError, InvalidProgramError, InvalidConditionError, VariableRedeclarationError, AssignmentUsingNone, InvalidConcatenationError, IndexOutOfBoundsError, InvalidOperation, InvalidArgumentToList, ListError, ReferentialError, BadAssignment
+
+
+UNSET = object()
+
+
+class Frame():
+    """
+    The variables of one scope at runtime. Values, types and element types
+    are kept in arrays, indexed by the slots the Resolver assigned to names.
+    A slot holding UNSET has not been declared in this frame.
+    """
+    __slots__ = ("scope", "parent", "values", "types", "element_types", "blank")
+
+    def __init__(self, scope: Scope, parent = None):
+        self.scope = scope
+        self.parent = parent
+        size = len(scope)
+        self.values = [UNSET] * size
+        self.types = [None] * size
+        self.element_types = [None] * size
+        self.blank = (UNSET,) * size
+
+    def grow(self):
+        """
+        Makes room for names declared in the scope since the frame was made.
+        """
+        missing = len(self.scope) - len(self.values)
+        if missing > 0:
+            self.values.extend([UNSET] * missing)
+            self.types.extend([None] * missing)
+            self.element_types.extend([None] * missing)
+            self.blank = (UNSET,) * len(self.values)
+
+    def reset(self):
+        """
+        Undeclares every slot. Types are always written along with values,
+        so only the values need clearing.
+        """
+        self.values[:] = self.blank
+
+    def rebind(self, args: list):
+        """
+        Resets the frame for another call of the same function, with args
+        as the values of its parameters.
+        """
+        self.reset()
+        for x, value in enumerate(args):
+            self.values[x] = value
+            self.types[x] = gossip_type(value)
+            self.element_types[x] = None
+
+    def clear(self):
+        self.reset()
+        for slot in range(len(self.values)):
+            self.types[slot] = None
+            self.element_types[slot] = None
+
+
+class Jump():
+    """
+    The value of a function calling itself in tail position: the arguments
+    of the call, which the call running the function rebinds its frame to
+    before evaluating the body again, so that tail recursion takes neither
+    a frame nor a Python frame per call.
+    """
+    __slots__ = ("args",)
+
+    def __init__(self, args: list):
+        self.args = args
+
+
+class FramePool():
+    """
+    Free lists of frames, kept by size. Frames are taken from the pool when
+    a loop, let or function call opens a scope and returned when it closes,
+    so running a loop does not allocate a frame per iteration, or even per
+    run once the pool is warm. Loops go further and reuse a single frame for
+    all their iterations, resetting it in between.
+    """
+    __slots__ = ("free", "allocated")
+
+    def __init__(self):
+        self.free = {}
+        self.allocated = 0
+
+    def acquire(self, scope: Scope, parent: Frame) -> Frame:
+        frames = self.free.get(len(scope))
+        if frames:
+            frame = frames.pop()
+            frame.scope = scope
+            frame.parent = parent
+            return frame
+        self.allocated += 1
+        return Frame(scope, parent)
+
+    def release(self, frame: Frame):
+        frame.reset()
+        frame.scope = frame.parent = None
+        frames = self.free.get(len(frame.values))
+        if frames is None:
+            frames = self.free[len(frame.values)] = []
+        frames.append(frame)
+
+
+class RuntimeEnvironment():
+    """
+    The runtime environment. Instantiate to start a new environment.
+    Includes, most importantly, the eval method, which resolves an AST and
+    then evaluates it recursively.
+
+    numbers selects the representation of numbers, "fraction", "decimal" or
+    "float", and precision the significant digits Decimals are rounded to.
+    scope is the layout of the global frame, for programs resolved against
+    it beforehand, such as those of a gossip.Program. memo holds the values
+    of the pure functions memoized on the runtime; by default, none are.
+
+    A runtime holds the state of the program running on it, its frames, its
+    current frame and its memo, and so runs on one thread at a time. Runtimes share
+    no state with each other, so any number of them can run at once.
+    """
+    def __init__(self, numbers: str = "fraction", precision: int = 28, scope: Scope = None, memo: Memo = None):
+        self.numbers = NumericMode(numbers, precision)
+        self.globals = Frame(scope if scope is not None else Scope())
+        self.frame = self.globals
+        self.frames = FramePool()
+        self.resolver = Resolver(self.globals.scope)
+        self.memo = memo if memo is not None else Memo()
+        self.functions = {}
+
+    def resolve(self, program: AST or ASTSequence) -> AST:
+        """
+        Resolves the names of a top-level program to slots, and makes room
+        for its declarations in the global frame. The program may be a Cursor
+        for a statement of a FlatAST, which is built into nodes here, as the
+        resolver copies the program anyway.
+        """
+        if isinstance(program, Cursor):
+            program = program.node()
+        resolved = self.resolver.resolve(program)
+        self.globals.grow()
+        self.frame = self.globals
+        return resolved
+
+    def bind(self, name: str, value: Value):
+        """
+        Declares a global variable from Python, with a number, bool, string
+        or list of them as its value. Numbers are converted to those of the
+        numeric mode.
+        """
+        if type(value) is list:
+            value = [self.numbers.number(element) if gossip_type(element) is Fraction else element for element in value]
+        elif gossip_type(value) is Fraction:
+            value = self.numbers.number(value)
+        elif type(value) not in (bool, str):
+            raise TypeError(f"Cannot bind {name} to a {type(value).__name__}; Gossip values are numbers, bools, strings and lists.")
+        slot = self.globals.scope.declare(name)
+        self.globals.grow()
+        if self.globals.values[slot] is not UNSET:
+            raise VariableRedeclarationError(name)
+        self.globals.values[slot] = value
+        self.globals.types[slot] = gossip_type(value)
+        self.globals.element_types[slot] = gossip_type(value[0]) if type(value) is list and value else None
+
+    def find(self, name: str):
+        """
+        Looks a name up dynamically, from the innermost frame outwards.
+        Returns the frame and slot it is bound to, or (None, None).
+        """
+        frame = self.frame
+        while frame is not None:
+            slot = frame.scope.slots.get(name)
+            if slot is not None and slot < len(frame.values) and frame.values[slot] is not UNSET:
+                return frame, slot
+            frame = frame.parent
+        return None, None
+
+    def locate(self, var: Variable):
+        """
+        Returns the frame and slot a variable is bound to, or (None, None).
+        Slots are read directly; if a slot was never declared at runtime,
+        such as by an if which did not run, the name is looked up dynamically.
+        """
+        if type(var) is Slot:
+            frame = self.frame
+            for _ in range(var.depth):
+                frame = frame.parent
+            if frame.values[var.slot] is not UNSET:
+                return frame, var.slot
+        return self.find(var.name)
+
+    def find_function(self, call: funct_call) -> tuple[funct_def, int]:
+        """
+        Looks up the function a call calls, and checks it takes as many
+        arguments as the call passes. Returns the function, and its slot in
+        the global frame if the lookup may be cached: when the function is
+        bound there, under a name no inner scope declares, the name is found
+        there from any frame, and stands for the function until it is
+        defined again. Otherwise the slot is None.
+        """
+        frame, slot = self.locate(call.name)
+        if frame is None or not isinstance(frame.values[slot], funct_def):
+            raise Exception("Function is not defined")
+        function = frame.values[slot]
+        if len(function.var_list) != len(call.arg_val):
+            raise Exception("Not enough arguements")
+        if frame is self.globals and call.name.name not in self.globals.scope.inner_names:
+            return function, slot
+        return function, None
+
+    def function(self, call: funct_call) -> funct_def:
+        """
+        Returns the function a call calls, from the cache of global functions
+        when the binding it was found at still holds it. Unlike the closure
+        and bytecode engines, which cache by call site, the cache is kept by
+        name: call nodes are frozen, so they cannot hold a cache, and equal
+        calls are one node, so keying on the node would share entries between
+        sites all the same, at the cost of hashing the whole call. Since the
+        entry of a name is only used while the global binding holds it, the
+        sites calling the name would cache the same entry anyway.
+        """
+        name = call.name.name
+        cached = self.functions.get(name)
+        if cached is not None:
+            slot, function = cached
+            if self.globals.values[slot] is function and len(function.var_list) == len(call.arg_val) and name not in self.globals.scope.inner_names:
+                return function
+        function, slot = self.find_function(call)
+        if slot is not None:
+            self.functions[name] = (slot, function)
+        return function
+
+    def eval(self, program: AST or ASTSequence) -> Value:
+        """
+        Resolves a top-level program, then evaluates it in the global frame.
+        """
+        with self.numbers.context():
+            return self.evaluate(self.resolve(program))
+
+    def evaluate(self, program: AST or ASTSequence) -> Value:
+        """
+        Recursively evaluates a resolved AST or ASTSequence, returning a Value.
+        """
+        match program:
+            case NumLiteral(value):
+                if self.numbers.exact:
+                    return value
+                return self.numbers.number(value)
+            
+            case BoolLiteral(value):
+                return value
+            
+            case StringLiteral(value):
+                return value
+            
+            case StringSlice(Variable(name),start, end):
+                full_string = self.evaluate(Variable(name))
+
+                #slice indices must be integers, and numbers may be Fractions
+                strt = int(self.evaluate(start))
+                d_end = int(self.evaluate(end))
+
+                
+                try:
+                    return full_string[strt:d_end]
+                except:
+                    if(strt<0 or d_end>len(full_string)):
+                        raise IndexOutOfBoundsError("Slice Index out of range")
+                    else:
+                        raise IndexOutOfBoundsError()
+
+            case ListObject(elements,element_type):
+                values = []
+                for element in elements:
+                    value = self.evaluate(element)
+                    # A list whose type the parser could not infer takes the type of its first element.
+                    if element_type is None:
+                        element_type = gossip_type(value)
+                    if(gossip_type(value) is not element_type):
+                        raise InvalidArgumentToList(element_type)
+                    values.append(value)
+                
+                return values
+            
+
+            case ListCons(to_add, base_list):
+                to_add = self.evaluate(to_add)
+                the_type = None
+                values = None
+
+                if(isinstance(base_list,ListObject)):
+                    the_type = base_list.element_type
+                    if the_type is None:
+                        values = self.evaluate(base_list)
+                        the_type = gossip_type(values[0])
+                elif(isinstance(base_list,Variable)):
+                    frame, slot = self.locate(base_list)
+                    if frame is not None:
+                        the_type = frame.element_types[slot]
+
+                    if(the_type==None):
+                        raise ListError("Variable referenced during Cons operation doesn't exist.")
+                                        
+                else:
+                    raise ListError("Argument to Cons() is not a list.")
+                
+                if(gossip_type(to_add) is not the_type):
+                    raise ListError("Input element is not of the same type as given list type.")
+
+                new_list = []
+                new_list.append(to_add)
+                
+                for num in self.evaluate(base_list) if values is None else values:
+                    new_list.append(num)
+
+                if isinstance(base_list,Variable):
+                    frame.values[slot] = new_list
+                
+                return new_list            
+            
+
+            case Variable(name):
+                frame, slot = self.locate(program)
+                if frame is None:
+                    raise DeclarationError(name)
+                return frame.values[slot]
+            
+            
+            case Declare(Slot(name=name, slot=slot), value):
+                frame = self.frame
+                if frame.values[slot] is not UNSET:
+                    raise VariableRedeclarationError(name)
+
+                if isinstance(value,ListObject):
+                    elems = self.evaluate(value)
+                    
+                    frame.values[slot] = elems
+                    frame.types[slot] = list
+                    frame.element_types[slot] = value.element_type or gossip_type(elems[0])
+
+                    return elems
+                
+                elif isinstance(value,Variable):
+                    value_to_be_declared = self.evaluate(value)
+                    if_val_is_list_its_el_type = None
+
+                    value_frame, value_slot = self.locate(value)
+                    if value_frame.types[value_slot] is list:
+                        if_val_is_list_its_el_type = value_frame.element_types[value_slot]
+
+                    frame.values[slot] = value_to_be_declared
+                    frame.types[slot] = gossip_type(value_to_be_declared)
+                    frame.element_types[slot] = if_val_is_list_its_el_type
+                
+                    return value_to_be_declared
+
+                else:
+                    value_to_be_declared = self.evaluate(value)
+                    
+                    frame.values[slot] = value_to_be_declared
+                    frame.types[slot] = gossip_type(value_to_be_declared)
+                    frame.element_types[slot] = None
+
+                    return value_to_be_declared
+                
+            
+            case Assign(Variable(name), expression):
+                val = self.evaluate(expression)
+
+                var_type = None
+                frame, slot = self.locate(program.var)
+                if frame is not None:
+                    var_type = frame.types[slot]
+                
+                if(var_type is not gossip_type(val)):
+                    raise BadAssignment(name,var_type,gossip_type(val))
+
+                frame.values[slot] = val
+                return val
+            
+            case ASTSequence(seq):
+                """
+                Special case. Evaluates all but the last element in a loop, 
+                then returns the evaluation of the last element.
+                """
+                for ast in seq[:-1]:
+                    x = self.evaluate(ast)
+
+                return self.evaluate(seq[-1])
+            
+
+            case Let(Variable(name), e1, e2):
+                """
+                Let is a special case. It evaluates e1, then binds the result
+                in a new frame, then evaluates e2 in that frame.
+                """
+                val = self.evaluate(e1)
+                frame = self.frames.acquire(program.scope, self.frame)
+                frame.values[0] = val
+                frame.types[0] = gossip_type(val)
+                frame.element_types[0] = None
+                self.frame = frame
+                expression = self.evaluate(e2)
+                self.frame = frame.parent
+                self.frames.release(frame)
+                return expression
+
+            case Range(left, right, step):
+                """
+                Evaluates the bounds, and returns an iterator over the range from
+                left to right, which produces its values only as they are consumed.
+                """
+                step = 1 if step is None else self.evaluate(step)
+                return self.numbers.range(self.evaluate(left), self.evaluate(right), step)
+
+            case Print(expression):
+                if isinstance(expression, ASTSequence):
+                    expression_list = expression.seq
+                    for expression in expression_list[:-1]:
+                        print(expression.value) # TODO replace with something like: extract_value(exp)
+                                                # TODO so it works both for strings and numbers.
+                    print(expression_list[-1].value, end="")
+                    return expression_list[-1].value
+                else:
+                    to_return = self.evaluate(expression)
+                    print(to_return)
+                    return to_return
+
+            
+            case ListOp("is-empty?", base_list):
+                value_type = None
+
+                if(not isinstance(base_list,ListObject)):
+                    if(isinstance(base_list,Variable)):
+                        frame, slot = self.locate(base_list)
+                        if frame is not None:
+                            value_type = frame.types[slot]
+                    
+                    if(value_type is not list):
+                        raise ListError("Argument to IsEmpty() is not a list.")
+
+                
+                
+                base_list = self.evaluate(base_list)  
+                if(len(base_list)!=0):
+                    return False
+                else:
+                    return True
+
+            case ListOp("head", base_list):
+
+                value_type = None
+
+                if(not isinstance(base_list,ListObject)):
+                    if(isinstance(base_list,Variable)):
+                        frame, slot = self.locate(base_list)
+                        if frame is not None:
+                            value_type = frame.types[slot]
+                    
+                    if(value_type is not list):
+                        raise ListError("Argument to Head() is not a list.")
+                
+                
+                
+                base_list = self.evaluate(base_list)
+                if(len(base_list)==0):
+                    raise ListError("No head in an empty list")
+                else:
+                    return base_list[0]
+            
+            case ListOp("tail", base_list):
+                
+                value_type = None
+
+                if(not isinstance(base_list,ListObject)):
+                    if(isinstance(base_list,Variable)):
+                        frame, slot = self.locate(base_list)
+                        if frame is not None:
+                            value_type = frame.types[slot]
+                    
+                    if(value_type is not list):
+                        raise ListError("Argument to IsEmpty() is not a list.")
+                
+                
+                base_list = self.evaluate(base_list)
+                if(len(base_list)==0):
+                    raise ListError("No tail in an empty list")
+                else:
+                    return base_list[1:]
+            
+
+            case ListIndex(index,base_list):
+                # if(value_type is not list):
+                #     raise ListError("Object attempted to be indexed is not a list.")
+
+                base_list = self.evaluate(base_list)
+                ind = int(self.evaluate(index))
+
+                if(ind<0 or ind>=len(base_list)):
+                    raise ListError("Index out of range.")
+                else:
+                    return base_list[ind]
+                
+                
+
+            # Binary operations are all the same, except for the operator.
+            case BinOp("+", left, right):
+                try:
+                    if(left.type==StringType and right.type==StringType):
+                        # print("gotcha")
+                        dummy_string = left.value + right.value
+                        return dummy_string
+                    else:
+                        left = self.evaluate(left)
+                        right = self.evaluate(right)
+                        return left + right
+                except:
+                    raise InvalidConcatenationError()
+                    
+
+            case BinOp("-", left, right):
+                left = self.evaluate(left)
+                right = self.evaluate(right)
+                try:
+                    return left - right
+                except:
+                    raise InvalidOperation("-",left,right)
+                
+            case BinOp("*", left, right):
+                left = self.evaluate(left)
+                right = self.evaluate(right)
+                try:
+                    return left * right
+                except:
+                    raise InvalidOperation("*",left,right)
+                
+            case BinOp("/", left, right):
+                left = self.evaluate(left)
+                right = self.evaluate(right)
+                try:
+                    return self.numbers.divide(left, right)
+                except:
+                    raise InvalidOperation("/",left,right)
+            
+            case BinOp("%", left, right):
+                left = self.evaluate(left)
+                right = self.evaluate(right)
+
+                try:
+                    return left%right
+                except:
+                    raise InvalidOperation("%", left, right)
+                
+            case BinOp("==", left, right):
+                left = self.evaluate(left)
+                right = self.evaluate(right)
+                
+                try:
+                    return left == right
+                except:
+                    raise InvalidOperation("==",left,right)
+                
+            case BinOp("!=", left, right):
+                left = self.evaluate(left)
+                right = self.evaluate(right)
+                
+                try:
+                    return left != right
+                except:
+                    raise InvalidOperation("!=",left,right)
+                
+            case BinOp("<", left, right):
+                left = self.evaluate(left)
+                right = self.evaluate(right)
+
+                try:
+                    return left < right
+                except:
+                    raise InvalidOperation("<",left,right)
+                
+            case BinOp(">", left, right):
+                left = self.evaluate(left)
+                right = self.evaluate(right)
+
+                try:
+                    return left > right
+                except:
+                    raise InvalidOperation(">",left,right)
+                
+            case BinOp("<=", left, right):
+                left = self.evaluate(left)
+                right = self.evaluate(right)
+                
+                try:
+                    return left <= right
+                except:
+                    raise InvalidOperation("<=",left,right)
+                
+            case BinOp(">=", left, right):
+                left = self.evaluate(left)
+                right = self.evaluate(right)
+                
+                try:
+                    return left >= right
+                except:
+                    raise InvalidOperation(">=",left,right)
+                
+            case BinOp("&&", left, right):
+                left = self.evaluate(left)
+                right = self.evaluate(right)
+                
+                try:
+                    return left and right
+                except:
+                    raise InvalidOperation("&&",left,right)
+                
+            case BinOp("||", left, right):
+                left = self.evaluate(left)
+                right = self.evaluate(right)
+                
+                try:
+                    return left or right
+                except:
+                    raise InvalidOperation("||",left,right)
+
+            # Unary operation is the same, except for the operator.
+            case UnOp("-", right):
+                try:
+                    return 0 - self.evaluate(right)
+                except:
+                    InvalidOperation("Unary Negation",right)
+
+            # Again, If is different, so we define it separately.
+            # It does not open a frame: declarations in its branches go to the enclosing one.
+            case If(cond, e1, e2):
+                if self.evaluate(cond) == True:
+                    return self.evaluate(e1)
+                if(e2==None):
+                    return None 
+                return self.evaluate(e2)
+            
+            case ForLoop(Variable(name), sequence, stat):
+                if not isinstance(sequence, ASTSequence):
+                    sequence = self.evaluate(sequence)
+                # Values are evaluated, or taken from a range, one iteration at a time.
+                values = map(self.evaluate, sequence.seq) if isinstance(sequence, ASTSequence) else sequence
+                result = None
+                frame = self.frames.acquire(program.scope, self.frame)
+                for v1 in values:
+                    frame.values[0] = v1
+                    frame.types[0] = gossip_type(v1)
+                    self.frame = frame
+                    result = self.evaluate(stat)
+                    self.frame = frame.parent
+                    frame.reset()
+                self.frames.release(frame)
+                return(result)
+            
+            case While(cond, sequence):
+                truth_value = self.evaluate(cond)
+
+                if type(truth_value) != bool:
+                    raise InvalidConditionError(cond)
+                
+                final_value = None
+                frame = self.frames.acquire(program.scope, self.frame)
+
+                while(truth_value):
+                    self.frame = frame
+                    final_value = self.evaluate(sequence)
+                    
+                    truth_value= self.evaluate(program.again)
+                    self.frame = frame.parent
+                    frame.reset()
+                
+                self.frames.release(frame)
+                return final_value
+            
+            case DoWhile(sequence, cond):
+                final_value = None
+                frame = self.frames.acquire(program.scope, self.frame)
+                self.frame = frame
+                final_value = self.evaluate(sequence)
+                self.frame = frame.parent
+                frame.reset()
+
+                truth_value = self.evaluate(cond)
+
+                if type(truth_value) != bool:
+                    raise InvalidConditionError
+                
+                while(truth_value):
+                    self.frame = frame
+                    final_value = self.evaluate(sequence)
+                    
+                    truth_value= self.evaluate(program.again)
+                    self.frame = frame.parent
+                    frame.reset()
+                
+                self.frames.release(frame)
+                return final_value
+            
+            case funct_ret(funct_val):
+                #print(funct_val)
+                return(self.evaluate(funct_val))
+            
+            case funct_def(Slot(slot=slot), arg_list, body):
+                self.memo.define(program.name.name, program)
+                self.frame.values[slot] = program
+                self.frame.types[slot] = str
+                self.frame.element_types[slot] = None
+                return(self.evaluate(NumLiteral(0)))
+            
+
+            #dynamic scoping on function calls 
+            case funct_call(Variable(name), arg_val):
+                function = self.function(program)
+                arg_name = function.var_list
+
+                if type(program) is TailCall and function.scope is self.frame.scope:
+                    return Jump([self.evaluate(arg) for arg in arg_val])
+
+                callee = self.frames.acquire(function.scope, self.frame)
+                for x in range(len(arg_name)):
+                    v1 = self.evaluate(arg_val[x])
+                    callee.values[x] = v1
+                    callee.types[x] = gossip_type(v1)
+                    callee.element_types[x] = None
+
+                table = self.memo.table(name, function) if self.memo.active else None
+                if table is not None:
+                    key = memo_key(callee.values[:len(arg_name)])
+                    m = table.get(key)
+                    if m is not MISSING:
+                        self.frames.release(callee)
+                        return m
+
+                self.frame = callee
+                m = self.evaluate(function.body)
+                while type(m) is Jump:
+                    callee.rebind(m.args)
+                    m = self.evaluate(function.body)
+                self.frame = callee.parent
+                self.frames.release(callee)
+                if table is not None:
+                    table.put(key, m)
+                return(m)
+            
+                
+        raise InvalidProgramError(f"Runtime environment does not support program: {program}.")
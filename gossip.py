@@ -0,0 +1,95 @@
+"""
+Embedding Gossip in Python. compile parses a program once, and the Program
+it returns runs as often as needed, each time in a fresh environment, with
+variables bound from Python:
+
+    program = gossip.compile("declare y = x * 2; y + 1;")
+    program.run({"x": 20})    # 41
+    program.run({"x": 1})     # 3
+
+Programs are frozen nodes, which running never changes, so one Program can
+be cached and run any number of times without lexing or parsing again, and
+by any number of threads at once, as each run has an environment of its own.
+"""
+from typing import Iterable, Mapping
+
+from core import RuntimeEnvironment
+from compiler import ClosureCompiler
+from stackeval import StackEvaluator
+from interpreter import as_stream, check_numbers
+from stream import Stream, Lexer, Parser
+from utils.datatypes import AST, Value
+from utils.resolver import Scope, Resolver
+
+ENGINES = ["tree", "closure", "stack"]
+
+
+class Program:
+    """
+    The statements of a parsed program. run evaluates them with the tree,
+    closure or stack engine, and returns the value of the last one.
+
+    Names are resolved to slots once for each set of bound names, rather
+    than on every run; the bound names are the first slots of the global
+    frame, and the program's own declarations follow.
+    """
+
+    def __init__(self, statements: Iterable[AST], engine: str = "tree", numbers: str = "fraction", precision: int = 28):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}.")
+        check_numbers(engine, numbers)
+        self.statements = tuple(statements)
+        self.engine = engine
+        self.numbers = numbers
+        self.precision = precision
+        self.layouts = {}
+
+    def resolve(self, names: tuple) -> tuple[Scope, tuple]:
+        """
+        Returns the layout of the global frame for the bound names, and the
+        statements resolved against it.
+        """
+        layout = self.layouts.get(names)
+        if layout is None:
+            scope = Scope()
+            for name in names:
+                scope.declare(name)
+            resolver = Resolver(scope)
+            layout = self.layouts[names] = (scope, tuple(resolver.resolve(statement) for statement in self.statements))
+        return layout
+
+    def run(self, bindings: Mapping[str, Value] = None) -> Value:
+        """
+        Runs the program in a fresh environment, in which each name of
+        bindings is a global variable holding its value.
+        """
+        bindings = bindings or {}
+        scope, statements = self.resolve(tuple(bindings))
+        runtime = RuntimeEnvironment(self.numbers, self.precision, scope)
+        for name, value in bindings.items():
+            runtime.bind(name, value)
+        if self.engine == "closure":
+            compiler = ClosureCompiler(runtime)
+            evaluate = lambda statement: compiler.compile_node(statement)()
+        elif self.engine == "stack":
+            evaluate = StackEvaluator(runtime).evaluate
+        else:
+            evaluate = runtime.evaluate
+
+        result = None
+        with runtime.numbers.context():
+            for statement in statements:
+                result = evaluate(statement)
+        return result
+
+    def __len__(self) -> int:
+        return len(self.statements)
+
+
+def compile(source: str | Stream, engine: str = "tree", numbers: str = "fraction", precision: int = 28) -> Program:
+    """
+    Parses a program, given as its source or as a Stream, into a Program
+    which runs on engine, with numbers and precision selecting the numeric
+    mode, as for compile_gossip.
+    """
+    return Program(Parser.from_lexer(Lexer.from_stream(as_stream(source))), engine, numbers, precision)
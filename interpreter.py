@@ -4,6 +4,11 @@ from typing import Union, Mapping
 import os
 
 from core import RuntimeEnvironment
+from compiler import ClosureCompiler
+from stackeval import StackEvaluator
+from bytecode import BytecodeCompiler, VirtualMachine
+import bytecode
+from transpiler import transpile, run_python
 from utils.datatypes import (
     AST,
     NumLiteral,
@@ -22,8 +27,53 @@ from stream import Stream, Lexer, Parser
 from utils.colors import GREEN, BOLD, RESET, RED, BLACK, YELLOW, BLUE, INVERSE, BRIGHT_INVERSE
 from utils.errors import InvalidTokenError, TokenError
 
-def interpret(feedback=False, visualize=False):
-    runtime = RuntimeEnvironment()
+ENGINES = ["tree", "closure", "stack", "bytecode", "python"]
+
+def get_evaluator(runtime, engine="tree"):
+    """
+    Returns the function used to run each top-level statement on the runtime.
+    "tree" walks the AST with RuntimeEnvironment.eval, while "closure" compiles
+    each statement to closures with the ClosureCompiler first. "stack" walks
+    the AST like "tree", but from explicit stacks rather than by recursion,
+    so deep Gossip recursion does not overflow Python's. "bytecode" runs
+    statements on a VirtualMachine, which keeps its own variables instead of
+    those of the runtime. "python" transpiles whole programs, so it is only
+    available through compile_gossip.
+    """
+    if engine == "closure":
+        return ClosureCompiler(runtime).run
+    if engine == "stack":
+        return StackEvaluator(runtime).run
+    if engine == "bytecode":
+        return VirtualMachine().run
+    if engine == "tree":
+        return runtime.eval
+    if engine == "python":
+        raise ValueError("The python engine transpiles whole programs, so it only runs files; use another engine interactively.")
+    raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}.")
+
+def check_numbers(engine="tree", numbers="fraction"):
+    """
+    Numeric modes are options of the RuntimeEnvironment. The bytecode and
+    python engines bake exact constants into the code they generate, so
+    they only run in the default mode.
+    """
+    if numbers != "fraction" and engine not in ("tree", "closure", "stack"):
+        raise ValueError(f"The {engine} engine only supports fraction numbers; use the tree, closure or stack engine for {numbers}.")
+
+def check_memo(engine="tree", memo=None):
+    """
+    Memos are kept by the RuntimeEnvironment too, so the bytecode and python
+    engines do not memoize.
+    """
+    if memo is not None and engine not in ("tree", "closure", "stack"):
+        raise ValueError(f"The {engine} engine does not memoize functions; use the tree, closure or stack engine.")
+
+def interpret(feedback=False, visualize=False, engine="tree", numbers="fraction", precision=28, memo=None):
+    check_numbers(engine, numbers)
+    check_memo(engine, memo)
+    runtime = RuntimeEnvironment(numbers, precision, memo=memo)
+    evaluate = get_evaluator(runtime, engine)
     persist = False
 
     while True:
@@ -60,20 +110,103 @@ def interpret(feedback=False, visualize=False):
                         vis.treebuilder(s)
                     if feedback:
                         if not persist:
-                            print(f"{RED}{runtime.eval(s)}{RESET}")
+                            print(f"{RED}{evaluate(s)}{RESET}")
                     else:
                         if not persist:
-                                runtime.eval(s)
+                                evaluate(s)
                 except:
                     continue
         except Exception as e:
             print(e)
 
-def compile_gossip(lines):
-    runtime = RuntimeEnvironment()
-    for line in lines:
-        L = Lexer.from_stream(Stream.from_string(line))
-        S = Parser.from_lexer(L)
-        for s in S:
-            x = runtime.eval(s)
+def as_stream(lines) -> Stream:
+    """
+    Programs are given as their source, or as a Stream, such as the one
+    Stream.from_file maps a file into.
+    """
+    return lines if isinstance(lines, Stream) else Stream.from_string(lines)
+
+def parse_gossip(lines, parse_cache=None, source_path=None, inliner=None):
+    """
+    Returns the statements of a program, parsed as they are consumed. Given a
+    ParseCache and the path of the source, they are loaded from the cache when
+    it has them, and saved to it otherwise. Given an Inliner, the whole
+    program is parsed first, and returned with the calls of its small
+    functions inlined.
+    """
+    if parse_cache is None or source_path is None:
+        statements = Parser.from_lexer(Lexer.from_stream(as_stream(lines)))
+    else:
+        statements = parse_cache.statements(lines, source_path)
+    return statements if inliner is None else inliner.inline(statements)
+
+def compile_gossip(lines, feedback=False, engine="tree", cache=None, numbers="fraction", precision=28, parse_cache=None, source_path=None, memo=None, inliner=None):
+    """
+    Runs a whole program. With the bytecode engine, cache is the path the
+    compiled program is saved to, and loaded from on later runs of the same
+    source, skipping lexing and parsing. numbers and precision select the
+    numeric mode of the runtime, and memo the Memo of the pure functions it
+    memoizes. parse_cache, source_path and inliner are passed to
+    parse_gossip. Apart from the python engine, which transpiles the program
+    as a whole, and programs inlined, each statement runs as soon as it is
+    parsed.
+    """
+    check_numbers(engine, numbers)
+    check_memo(engine, memo)
+    if engine == "bytecode":
+        return run_bytecode(lines, feedback, cache, parse_cache, source_path, inliner)
+    if engine == "python":
+        return run_python(transpile_gossip(lines, feedback=feedback, parse_cache=parse_cache, source_path=source_path, inliner=inliner))
+
+    runtime = RuntimeEnvironment(numbers, precision, memo=memo)
+    evaluate = get_evaluator(runtime, engine)
+    S = parse_gossip(lines, parse_cache, source_path, inliner)
+    for s in S:
+        x = evaluate(s)
+        if feedback:
             print(x)
+
+def run_bytecode(lines, feedback=False, cache=None, parse_cache=None, source_path=None, inliner=None):
+    """
+    Runs a program on the VirtualMachine, from the module saved at cache if
+    it was compiled from the same source. Otherwise each statement runs as
+    soon as it is compiled, and the module is saved once the program ends.
+    Inlined programs are neither loaded nor saved, as the source alone does
+    not tell which calls the saved module inlined.
+    """
+    lines = as_stream(lines)
+    if inliner is not None:
+        cache = None
+    module = bytecode.load(cache, lines.source) if cache else None
+    vm = VirtualMachine()
+    if module is not None:
+        vm.load_module(module)
+        for statement in module.statements:
+            x = vm.execute(statement)
+            if feedback:
+                print(x)
+        return
+
+    for statement in parse_gossip(lines, parse_cache, source_path, inliner):
+        x = vm.run(statement)
+        if not cache:
+            # Nothing keeps the statements of a module which is not saved.
+            vm.module.statements.clear()
+        if feedback:
+            print(x)
+    if cache:
+        try:
+            bytecode.dump(vm.module, lines.source, cache)
+        except OSError:
+            pass
+
+def transpile_gossip(lines, feedback=False, source_name="<gossip>", output=None, parse_cache=None, source_path=None, inliner=None):
+    """
+    Transpiles a whole program to the source of a Python module, and writes
+    it to output if a path is given.
+    """
+    source = transpile(parse_gossip(lines, parse_cache, source_path, inliner), source_name, feedback)
+    if output:
+        with open(output, "w") as f:
+            f.write(source)
+    return source
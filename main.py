@@ -45,7 +45,12 @@ import urllib.request
 import uuid
 import webbrowser
 
-from interpreter import interpret, compile_gossip
+from interpreter import interpret, compile_gossip, transpile_gossip, ENGINES
+from utils.numbers import NUMERIC_MODES
+from utils.parsecache import ParseCache
+from utils.memo import Memo
+from utils.inliner import Inliner
+from stream import Stream
 from utils.errors import InvalidFileExtensionError
 
 _VERSION_ = "0.0.1a"
@@ -171,7 +176,7 @@ class GossipArgumentParser(argparse.ArgumentParser):
             "-f",
             "--from-file",
             type=str,
-            help="path to input .gos file containing gossip.",
+            help="path to input .gos file containing gossip, or - to read it from standard input.",
         )
         addarg(
             "-u",
@@ -197,6 +202,74 @@ class GossipArgumentParser(argparse.ArgumentParser):
             action="store_true",
             help="show a visualization of the gossip code, line by line.",
         )
+        addarg(
+            "-e",
+            "--engine",
+            type=str,
+            choices=ENGINES,
+            default="tree",
+            help="engine used to run the gossip code: the tree-walking evaluator, the closure compiler, the stack evaluator, which walks the tree without recursion, the bytecode vm, or python, through the transpiler, which only runs files and not --interpret.",
+        )
+        addarg(
+            "-t",
+            "--transpile",
+            type=str,
+            metavar="OUT",
+            help="transpile the input file to a python module at OUT, instead of running it.",
+        )
+        addarg(
+            "-n",
+            "--numbers",
+            type=str,
+            choices=NUMERIC_MODES,
+            default="fraction",
+            help="representation of numbers: exact fractions, decimals rounded to --precision digits, or machine floats. Only the tree, closure and stack engines support decimal and float.",
+        )
+        addarg(
+            "-p",
+            "--precision",
+            type=int,
+            default=28,
+            help="significant digits kept by decimal numbers.",
+        )
+        addarg(
+            "--cache-dir",
+            type=str,
+            metavar="DIR",
+            help="directory of the cache of parsed programs used with --from-file. Defaults to __gossipcache__ next to the input file.",
+        )
+        addarg(
+            "--no-cache",
+            action="store_true",
+            help="always parse the input file, without the cache of parsed programs, and never load or save its compiled bytecode.",
+        )
+        addarg(
+            "--memoize",
+            type=str,
+            nargs="?",
+            const="",
+            metavar="NAMES",
+            help="memoize the pure functions named, separated by commas, or every pure function if none are. Only the tree, closure and stack engines memoize. The hits and misses of each function are reported once a program has run.",
+        )
+        addarg(
+            "--memo-entries",
+            type=int,
+            default=1 << 16,
+            metavar="N",
+            help="arguments whose values are kept for each memoized function; the least recently used are dropped first.",
+        )
+        addarg(
+            "--inline",
+            action="store_true",
+            help="copy the bodies of small, non-recursive functions into the calls of the program, which is then parsed as a whole before it runs. The calls inlined are reported once it has.",
+        )
+        addarg(
+            "--inline-size",
+            type=int,
+            default=32,
+            metavar="N",
+            help="nodes the body of a function inlined may have at most.",
+        )
 
         # Make sure data is properly formatted.
 
@@ -230,6 +303,24 @@ d"     YD                                     888
 
     def main():
         opts = GossipArgumentParser.parse_arguments()
+        memo = None
+        if opts.memoize is not None:
+            names = [name for name in opts.memoize.split(",") if name]
+            memo = Memo(enabled=not names, names=names, max_entries=opts.memo_entries)
+        inliner = Inliner(opts.inline_size) if opts.inline else None
+
+        if opts.from_file == "-":
+            # Standard input is run as it arrives, so it is neither cached nor saved.
+            lines = Stream.from_reader(sys.stdin.buffer)
+            if opts.transpile:
+                transpile_gossip(lines, feedback=opts.show_feedback, source_name="<stdin>", output=opts.transpile, inliner=inliner)
+            else:
+                compile_gossip(lines, feedback=opts.show_feedback, engine=opts.engine, numbers=opts.numbers, precision=opts.precision, memo=memo, inliner=inliner)
+                if memo is not None:
+                    print(memo.report(), file=sys.stderr)
+            if inliner is not None:
+                print(inliner.report(), file=sys.stderr)
+            sys.exit(0)
 
         if opts.from_file:
             file_path = opts.from_file
@@ -237,9 +328,20 @@ d"     YD                                     888
                 if not file_path.endswith(".gos") and os.path.exists(file_path):
                     ext = file_path.split(".")[-1]
                     raise InvalidFileExtensionError(ext)
-                with open(file_path, 'r') as f:
-                    lines = f.read()
-                    compile_gossip(lines)
+                lines = Stream.from_file(file_path)
+                parse_cache = None if opts.no_cache else ParseCache(opts.cache_dir)
+                if opts.transpile:
+                    transpile_gossip(lines, feedback=opts.show_feedback, source_name=os.path.basename(file_path), output=opts.transpile, parse_cache=parse_cache, source_path=file_path, inliner=inliner)
+                else:
+                    # --no-cache keeps the bytecode engine from loading or saving the compiled program too.
+                    cache = None if opts.no_cache else file_path + "c"
+                    compile_gossip(lines, feedback=opts.show_feedback, engine=opts.engine, cache=cache, numbers=opts.numbers, precision=opts.precision, parse_cache=parse_cache, source_path=file_path, memo=memo, inliner=inliner)
+                if parse_cache is not None:
+                    print(parse_cache.report(), file=sys.stderr)
+                if memo is not None:
+                    print(memo.report(), file=sys.stderr)
+                if inliner is not None:
+                    print(inliner.report(), file=sys.stderr)
             except FileNotFoundError:
                 print(f"Error: File '{file_path}' not found.")
                 sys.exit(1)
@@ -257,7 +359,7 @@ d"     YD                                     888
 
         if opts.interpret:
             GossipArgumentParser.show_title_card()
-            interpret(feedback=opts.show_feedback, visualize=opts.visualize)
+            interpret(feedback=opts.show_feedback, visualize=opts.visualize, engine=opts.engine, numbers=opts.numbers, precision=opts.precision, memo=memo)
             sys.exit(0)
 
 
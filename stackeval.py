@@ -0,0 +1,691 @@
+"""
+An evaluator which runs ASTs without recursing in Python. RuntimeEnvironment
+evaluates a node by calling itself on its children, so that every Gossip
+call takes several Python frames, and deep Gossip recursion ends in a
+RecursionError. The StackEvaluator keeps the pending work and the values
+computed so far on explicit stacks instead, so that recursion is limited
+only by memory.
+"""
+import operator
+
+from utils.datatypes import AST, NumLiteral, BinOp, Variable, Value, Let, If, BoolLiteral, UnOp, ASTSequence, Assign, ForLoop, Range, Print, Declare, While, DoWhile, StringLiteral, ListObject, StringSlice, ListCons, ListOp, funct_call, funct_def, funct_ret, ListIndex
+from utils.datatypes import StringType
+
+from core import RuntimeEnvironment, UNSET
+from utils.resolver import Slot, TailCall
+from utils.numbers import gossip_type
+from utils.memo import Memo, MISSING, memo_key
+from utils.errors import DeclarationError, InvalidProgramError, InvalidConditionError, VariableRedeclarationError, InvalidConcatenationError, IndexOutOfBoundsError, InvalidOperation, InvalidArgumentToList, ListError, BadAssignment
+
+
+class StackEvaluator():
+    """
+    Evaluates resolved ASTs as RuntimeEnvironment.evaluate does, on the
+    frames of the same runtime, from two stacks. work holds the steps still
+    to take, each a method and its argument, and values the values of the
+    subexpressions evaluated so far. The step visiting a node pushes the
+    steps visiting its children, under a step which takes their values off
+    values and combines them, so a Gossip call is a few entries of these
+    stacks rather than Python frames.
+
+    The tree-walker turns any error raised while evaluating the operands of
+    + into an InvalidConcatenationError, and any raised by a negation into
+    an InvalidProgramError. Those nodes push guards while their operands are
+    evaluated, which unwind the stacks to where they were, and handle the
+    error the same way.
+    """
+    def __init__(self, runtime: RuntimeEnvironment = None):
+        self.runtime = runtime if runtime is not None else RuntimeEnvironment()
+        self.work = []
+        self.values = []
+        self.guards = []
+        self.visitors = {
+            NumLiteral: self.number,
+            BoolLiteral: self.literal,
+            StringLiteral: self.literal,
+            StringSlice: self.string_slice,
+            ListObject: self.list_object,
+            ListCons: self.list_cons,
+            Variable: self.variable,
+            Declare: self.declare,
+            Assign: self.assign,
+            ASTSequence: self.sequence,
+            Let: self.let,
+            Range: self.range,
+            Print: self.print,
+            ListOp: self.list_op,
+            ListIndex: self.list_index,
+            BinOp: self.binop,
+            UnOp: self.negate,
+            If: self.if_then_else,
+            ForLoop: self.for_loop,
+            While: self.while_loop,
+            DoWhile: self.do_while_loop,
+            funct_ret: self.function_return,
+            funct_def: self.define,
+            funct_call: self.call,
+            TailCall: self.call,
+        }
+
+    def run(self, program: AST) -> Value:
+        """
+        Resolves a top-level program against the runtime, then evaluates it.
+        """
+        runtime = self.runtime
+        with runtime.numbers.context():
+            return self.evaluate(runtime.resolve(program))
+
+    def evaluate(self, program: AST) -> Value:
+        """
+        Evaluates a resolved AST, taking steps off work until none are left.
+        """
+        work = self.work = []
+        values = self.values = []
+        self.guards = []
+        self.push(program)
+        while True:
+            try:
+                while work:
+                    step, argument = work.pop()
+                    step(argument)
+                return values.pop()
+            except Exception as error:
+                self.recover(error)
+
+    def recover(self, error: Exception):
+        """
+        Hands an error to the innermost guard, after unwinding the stacks to
+        where they were when it was pushed. The guard raises an error of its
+        own, which goes to the next guard out. Without guards, the error
+        propagates.
+        """
+        while self.guards:
+            work_depth, values_depth, handle = self.guards.pop()
+            del self.work[work_depth:]
+            del self.values[values_depth:]
+            try:
+                handle()
+            except Exception as e:
+                error = e
+        raise error
+
+    def push(self, node: AST):
+        """
+        Schedules a node to be visited, which leaves its value on values.
+        """
+        visit = self.visitors.get(type(node))
+        if visit is None:
+            visit = self.visitor(type(node))
+        self.work.append((visit, node))
+
+    def visitor(self, kind: type):
+        """
+        Finds the visitor of a subclass of a node, such as a resolved one.
+        """
+        for base in kind.__mro__:
+            if base in self.visitors:
+                self.visitors[kind] = self.visitors[base]
+                return self.visitors[kind]
+        self.visitors[kind] = self.unsupported
+        return self.unsupported
+
+    def unsupported(self, program: AST):
+        raise InvalidProgramError(f"Runtime environment does not support program: {program}.")
+
+    def number(self, node: NumLiteral):
+        numbers = self.runtime.numbers
+        self.values.append(node.value if numbers.exact else numbers.number(node.value))
+
+    def literal(self, node: AST):
+        self.values.append(node.value)
+
+    def string_slice(self, node: StringSlice):
+        if not isinstance(node.var, Variable):
+            return self.unsupported(node)
+        self.work.append((self.slice_string, node))
+        self.push(node.end)
+        self.push(node.start)
+        # The string is looked up by its name, as the tree-walker does.
+        self.push(Variable(node.var.name))
+
+    def slice_string(self, node: StringSlice):
+        values = self.values
+        end = values.pop()
+        start = values.pop()
+        full_string = values.pop()
+        # slice indices must be integers, and numbers may be Fractions
+        start, end = int(start), int(end)
+        try:
+            values.append(full_string[start:end])
+        except:
+            if start < 0 or end > len(full_string):
+                raise IndexOutOfBoundsError("Slice Index out of range")
+            raise IndexOutOfBoundsError()
+
+    def list_object(self, node: ListObject):
+        self.work.append((self.build_list, node))
+        for element in reversed(node.elements):
+            self.push(element)
+
+    def build_list(self, node: ListObject):
+        values = self.values
+        count = len(node.elements)
+        elements = values[len(values) - count:]
+        del values[len(values) - count:]
+        element_type = node.element_type
+        for value in elements:
+            # A list whose type the parser could not infer takes the type of its first element.
+            if element_type is None:
+                element_type = gossip_type(value)
+            if gossip_type(value) is not element_type:
+                raise InvalidArgumentToList(element_type)
+        values.append(elements)
+
+    def list_cons(self, node: ListCons):
+        self.work.append((self.check_cons, node))
+        self.push(node.to_add)
+
+    def check_cons(self, node: ListCons):
+        """
+        Checks the element consed against the type of the list, before the
+        list is evaluated, unless the list must be evaluated to know its type.
+        """
+        base_list = node.base_list
+        to_add = self.values[-1]
+        if isinstance(base_list, ListObject):
+            if base_list.element_type is None:
+                self.work.append((self.check_cons_untyped, node))
+                self.push(base_list)
+                return
+            frame = slot = None
+            the_type = base_list.element_type
+        elif isinstance(base_list, Variable):
+            frame, slot = self.runtime.locate(base_list)
+            the_type = frame.element_types[slot] if frame is not None else None
+            if the_type == None:
+                raise ListError("Variable referenced during Cons operation doesn't exist.")
+        else:
+            raise ListError("Argument to Cons() is not a list.")
+
+        if gossip_type(to_add) is not the_type:
+            raise ListError("Input element is not of the same type as given list type.")
+        self.work.append((self.cons, (frame, slot)))
+        self.push(base_list)
+
+    def check_cons_untyped(self, node: ListCons):
+        values = self.values
+        if gossip_type(values[-2]) is not gossip_type(values[-1][0]):
+            raise ListError("Input element is not of the same type as given list type.")
+        self.cons((None, None))
+
+    def cons(self, target: tuple):
+        values = self.values
+        base_list = values.pop()
+        new_list = [values.pop()]
+        new_list.extend(base_list)
+        frame, slot = target
+        if frame is not None:
+            frame.values[slot] = new_list
+        values.append(new_list)
+
+    def variable(self, node: Variable):
+        frame, slot = self.runtime.locate(node)
+        if frame is None:
+            raise DeclarationError(node.name)
+        self.values.append(frame.values[slot])
+
+    def declare(self, node: Declare):
+        if type(node.var) is not Slot:
+            return self.unsupported(node)
+        frame = self.runtime.frame
+        if frame.values[node.var.slot] is not UNSET:
+            raise VariableRedeclarationError(node.var.name)
+        self.work.append((self.bind, (node, frame)))
+        self.push(node.value)
+
+    def bind(self, declaration: tuple):
+        node, frame = declaration
+        slot = node.var.slot
+        value = node.value
+        declared = self.values[-1]
+        frame.values[slot] = declared
+        if isinstance(value, ListObject):
+            frame.types[slot] = list
+            frame.element_types[slot] = value.element_type or gossip_type(declared[0])
+        elif isinstance(value, Variable):
+            element_type = None
+            value_frame, value_slot = self.runtime.locate(value)
+            if value_frame.types[value_slot] is list:
+                element_type = value_frame.element_types[value_slot]
+            frame.types[slot] = gossip_type(declared)
+            frame.element_types[slot] = element_type
+        else:
+            frame.types[slot] = gossip_type(declared)
+            frame.element_types[slot] = None
+
+    def assign(self, node: Assign):
+        if not isinstance(node.var, Variable):
+            return self.unsupported(node)
+        self.work.append((self.store, node))
+        self.push(node.expression)
+
+    def store(self, node: Assign):
+        value = self.values[-1]
+        var_type = None
+        frame, slot = self.runtime.locate(node.var)
+        if frame is not None:
+            var_type = frame.types[slot]
+        if var_type is not gossip_type(value):
+            raise BadAssignment(node.var.name, var_type, gossip_type(value))
+        frame.values[slot] = value
+
+    def sequence(self, node: ASTSequence):
+        """
+        Evaluates every element in turn, keeping the value of the last.
+        """
+        seq = node.seq
+        self.push(seq[-1])
+        for ast in reversed(seq[:-1]):
+            self.work.append((self.discard, None))
+            self.push(ast)
+
+    def discard(self, _):
+        self.values.pop()
+
+    def let(self, node: Let):
+        if not isinstance(node.var, Variable):
+            return self.unsupported(node)
+        self.work.append((self.enter_let, node))
+        self.push(node.e1)
+
+    def enter_let(self, node: Let):
+        runtime = self.runtime
+        value = self.values.pop()
+        frame = runtime.frames.acquire(node.scope, runtime.frame)
+        frame.values[0] = value
+        frame.types[0] = gossip_type(value)
+        frame.element_types[0] = None
+        runtime.frame = frame
+        self.work.append((self.leave, frame))
+        self.push(node.e2)
+
+    def leave(self, frame):
+        """
+        Closes the frame of a let or a function call, once its body is evaluated.
+        """
+        runtime = self.runtime
+        runtime.frame = frame.parent
+        runtime.frames.release(frame)
+
+    def range(self, node: Range):
+        self.work.append((self.make_range, node))
+        self.push(node.end)
+        self.push(node.start)
+        if node.step is not None:
+            self.push(node.step)
+
+    def make_range(self, node: Range):
+        values = self.values
+        end = values.pop()
+        start = values.pop()
+        step = 1 if node.step is None else values.pop()
+        values.append(self.runtime.numbers.range(start, end, step))
+
+    def print(self, node: Print):
+        expression = node.value
+        if isinstance(expression, ASTSequence):
+            expression_list = expression.seq
+            for expression in expression_list[:-1]:
+                print(expression.value)
+            print(expression_list[-1].value, end="")
+            self.values.append(expression_list[-1].value)
+            return
+        self.work.append((self.print_value, None))
+        self.push(expression)
+
+    def print_value(self, _):
+        print(self.values[-1])
+
+    def list_op(self, node: ListOp):
+        if node.op not in LIST_OPERATION_NAMES:
+            return self.unsupported(node)
+        base_list = node.base_list
+        if not isinstance(base_list, ListObject):
+            value_type = None
+            if isinstance(base_list, Variable):
+                frame, slot = self.runtime.locate(base_list)
+                if frame is not None:
+                    value_type = frame.types[slot]
+            if value_type is not list:
+                raise ListError(f"Argument to {LIST_OPERATION_NAMES[node.op]}() is not a list.")
+        self.work.append((self.apply_list_op, node))
+        self.push(base_list)
+
+    def apply_list_op(self, node: ListOp):
+        values = self.values
+        base_list = values.pop()
+        if node.op == "is-empty?":
+            values.append(len(base_list) == 0)
+        elif len(base_list) == 0:
+            raise ListError(f"No {node.op} in an empty list")
+        elif node.op == "head":
+            values.append(base_list[0])
+        else:
+            values.append(base_list[1:])
+
+    def list_index(self, node: ListIndex):
+        self.work.append((self.index, node))
+        self.push(node.index)
+        self.push(node.base_list)
+
+    def index(self, node: ListIndex):
+        values = self.values
+        ind = int(values.pop())
+        base_list = values.pop()
+        if ind < 0 or ind >= len(base_list):
+            raise ListError("Index out of range.")
+        values.append(base_list[ind])
+
+    def binop(self, node: BinOp):
+        if node.operator == "+":
+            return self.add(node)
+        if node.operator not in BINARY_OPERATORS:
+            return self.unsupported(node)
+        self.work.append((self.apply_binop, node))
+        self.push(node.right)
+        self.push(node.left)
+
+    def apply_binop(self, node: BinOp):
+        values = self.values
+        right = values.pop()
+        left = values.pop()
+        try:
+            if node.operator == "/":
+                values.append(self.runtime.numbers.divide(left, right))
+            else:
+                values.append(BINARY_OPERATORS[node.operator](left, right))
+        except:
+            raise InvalidOperation(node.operator, left, right)
+
+    def add(self, node: BinOp):
+        try:
+            if node.left.type == StringType and node.right.type == StringType:
+                self.values.append(node.left.value + node.right.value)
+                return
+        except:
+            raise InvalidConcatenationError()
+        self.guards.append((len(self.work), len(self.values), self.concatenation_failed))
+        self.work.append((self.apply_add, node))
+        self.push(node.right)
+        self.push(node.left)
+
+    def apply_add(self, node: BinOp):
+        self.guards.pop()
+        values = self.values
+        right = values.pop()
+        left = values.pop()
+        try:
+            values.append(left + right)
+        except:
+            raise InvalidConcatenationError()
+
+    def concatenation_failed(self):
+        raise InvalidConcatenationError()
+
+    def negate(self, node: UnOp):
+        if node.operator != "-":
+            return self.unsupported(node)
+        self.guards.append((len(self.work), len(self.values), lambda: self.negation_failed(node)))
+        self.work.append((self.apply_negate, node))
+        self.push(node.right)
+
+    def apply_negate(self, node: UnOp):
+        self.guards.pop()
+        values = self.values
+        value = values.pop()
+        try:
+            values.append(0 - value)
+        except:
+            self.negation_failed(node)
+
+    def negation_failed(self, node: UnOp):
+        # The tree-walker builds this error without raising it, and goes on to find no case for the negation.
+        InvalidOperation("Unary Negation", node.right)
+        self.unsupported(node)
+
+    def if_then_else(self, node: If):
+        self.work.append((self.branch, node))
+        self.push(node.cond)
+
+    def branch(self, node: If):
+        if self.values.pop() == True:
+            self.push(node.e1)
+        elif node.e2 == None:
+            self.values.append(None)
+        else:
+            self.push(node.e2)
+
+    def for_loop(self, node: ForLoop):
+        """
+        Loops over the values of a range, taken one iteration at a time, or
+        of a sequence, each evaluated in the enclosing frame as its iteration
+        begins. A loop keeps its state in a list: the loop, the iterator
+        over its values, its frame and the value of its last iteration.
+        """
+        if not isinstance(node.var, Variable):
+            return self.unsupported(node)
+        if isinstance(node.val_list, ASTSequence):
+            self.begin_loop(node, iter(node.val_list.seq))
+        else:
+            self.work.append((self.begin_range_loop, node))
+            self.push(node.val_list)
+
+    def begin_range_loop(self, node: ForLoop):
+        self.begin_loop(node, iter(self.values.pop()))
+
+    def begin_loop(self, node: ForLoop, values):
+        runtime = self.runtime
+        frame = runtime.frames.acquire(node.scope, runtime.frame)
+        self.next_iteration([node, values, frame, None])
+
+    def next_iteration(self, loop: list):
+        node, values, frame, result = loop
+        value = next(values, UNSET)
+        if value is UNSET:
+            self.runtime.frames.release(frame)
+            self.values.append(result)
+        elif isinstance(node.val_list, ASTSequence):
+            self.work.append((self.iterate, loop))
+            self.push(value)
+        else:
+            self.values.append(value)
+            self.iterate(loop)
+
+    def iterate(self, loop: list):
+        frame = loop[2]
+        value = self.values.pop()
+        frame.values[0] = value
+        frame.types[0] = gossip_type(value)
+        self.runtime.frame = frame
+        self.work.append((self.end_iteration, loop))
+        self.push(loop[0].stat)
+
+    def end_iteration(self, loop: list):
+        frame = loop[2]
+        loop[3] = self.values.pop()
+        self.runtime.frame = frame.parent
+        frame.reset()
+        self.next_iteration(loop)
+
+    def while_loop(self, node: While):
+        """
+        The condition is tested in the enclosing frame before the loop, and
+        its again in the frame of each iteration after it. A loop keeps its
+        state in a list: the loop, its frame and the value of its last
+        iteration.
+        """
+        self.work.append((self.begin_while, node))
+        self.push(node.cond)
+
+    def begin_while(self, node: While):
+        truth_value = self.values.pop()
+        if type(truth_value) != bool:
+            raise InvalidConditionError(node.cond)
+        runtime = self.runtime
+        frame = runtime.frames.acquire(node.scope, runtime.frame)
+        self.test([node, frame, None], truth_value)
+
+    def do_while_loop(self, node: DoWhile):
+        runtime = self.runtime
+        frame = runtime.frames.acquire(node.scope, runtime.frame)
+        runtime.frame = frame
+        loop = [node, frame, None]
+        self.work.append((self.end_first_iteration, loop))
+        self.push(node.seq)
+
+    def end_first_iteration(self, loop: list):
+        frame = loop[1]
+        loop[2] = self.values.pop()
+        self.runtime.frame = frame.parent
+        frame.reset()
+        self.work.append((self.begin_do_while, loop))
+        self.push(loop[0].cond)
+
+    def begin_do_while(self, loop: list):
+        truth_value = self.values.pop()
+        if type(truth_value) != bool:
+            raise InvalidConditionError
+        self.test(loop, truth_value)
+
+    def test(self, loop: list, truth_value):
+        node, frame, result = loop
+        if not truth_value:
+            self.runtime.frames.release(frame)
+            self.values.append(result)
+            return
+        self.runtime.frame = frame
+        self.work.append((self.end_loop_iteration, loop))
+        self.push(node.again)
+        self.work.append((self.keep_result, loop))
+        self.push(node.seq)
+
+    def keep_result(self, loop: list):
+        loop[2] = self.values.pop()
+
+    def end_loop_iteration(self, loop: list):
+        frame = loop[1]
+        truth_value = self.values.pop()
+        self.runtime.frame = frame.parent
+        frame.reset()
+        self.test(loop, truth_value)
+
+    def function_return(self, node: funct_ret):
+        self.push(node.ret_val)
+
+    def define(self, node: funct_def):
+        if type(node.name) is not Slot:
+            return self.unsupported(node)
+        frame = self.runtime.frame
+        slot = node.name.slot
+        self.runtime.memo.define(node.name.name, node)
+        frame.values[slot] = node
+        frame.types[slot] = str
+        frame.element_types[slot] = None
+        self.number(NumLiteral(0))
+
+    def call(self, node: funct_call):
+        """
+        Evaluates the arguments in the frame of the caller, one at a time
+        into the frame of the callee, then evaluates the body in the latter.
+        A function calling itself in tail position jumps instead, in the
+        frame it is running in.
+        """
+        if not isinstance(node.name, Variable):
+            return self.unsupported(node)
+        runtime = self.runtime
+        function = runtime.function(node)
+
+        if type(node) is TailCall and function.scope is runtime.frame.scope:
+            self.work.append((self.jump, (function, runtime.frame, len(node.arg_val))))
+            for arg in reversed(node.arg_val):
+                self.push(arg)
+            return
+
+        callee = runtime.frames.acquire(function.scope, runtime.frame)
+        self.work.append((self.enter_call, (node.name.name, function, callee)))
+        for x in reversed(range(len(node.arg_val))):
+            self.work.append((self.pass_argument, (callee, x)))
+            self.push(node.arg_val[x])
+
+    def pass_argument(self, argument: tuple):
+        callee, x = argument
+        value = self.values.pop()
+        callee.values[x] = value
+        callee.types[x] = gossip_type(value)
+        callee.element_types[x] = None
+
+    def enter_call(self, call: tuple):
+        name, function, callee = call
+        runtime = self.runtime
+        table = runtime.memo.table(name, function) if runtime.memo.active else None
+        if table is not None:
+            key = memo_key(callee.values[:len(function.var_list)])
+            value = table.get(key)
+            if value is not MISSING:
+                runtime.frames.release(callee)
+                self.values.append(value)
+                return
+            self.work.append((self.remember, (table, key)))
+        runtime.frame = callee
+        self.work.append((self.leave, callee))
+        self.push(function.body)
+
+    def remember(self, entry: tuple):
+        table, key = entry
+        table.put(key, self.values[-1])
+
+    def jump(self, call: tuple):
+        """
+        Rebinds the frame of a function calling itself in tail position to
+        the arguments of the call, and evaluates the body again. The step
+        leaving the frame is still on work, so the stacks do not grow.
+        """
+        function, frame, n = call
+        values = self.values
+        args = values[len(values) - n:]
+        del values[len(values) - n:]
+        frame.rebind(args)
+        self.push(function.body)
+
+
+class StackRuntimeEnvironment(RuntimeEnvironment):
+    """
+    A drop-in replacement for RuntimeEnvironment, whose eval runs programs
+    on a StackEvaluator.
+    """
+    def __init__(self, numbers: str = "fraction", precision: int = 28, memo: Memo = None):
+        super().__init__(numbers, precision, memo=memo)
+        self.evaluator = StackEvaluator(self)
+
+    def eval(self, program: AST or ASTSequence) -> Value:
+        return self.evaluator.run(program)
+
+
+# The names the errors of list operations give them.
+LIST_OPERATION_NAMES = {"is-empty?": "IsEmpty", "head": "Head", "tail": "IsEmpty"}
+
+# Division is the division of the numeric mode of the runtime.
+BINARY_OPERATORS = {
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": None,
+    "%": operator.mod,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    ">": operator.gt,
+    "<=": operator.le,
+    ">=": operator.ge,
+    "&&": lambda l, r: l and r,
+    "||": lambda l, r: l or r,
+}
@@ -1,9 +1,13 @@
+import mmap
+import re
 from fractions import Fraction
+from utils.numbers import exact
 from dataclasses import dataclass
-from typing import Optional, NewType
-from utils.errors import EndOfStream, EndOfTokens, TokenError, StringError, ListOpError
+from typing import BinaryIO, Iterator, Optional, NewType
+from utils.errors import EndOfStream, EndOfTokens, TokenError, StringError, ListOpError, ListError
 from utils.datatypes import Num, Bool, Keyword, Symbols, ListUtils, Identifier, StringToken, ListToken, Operator, Whitespace, NumLiteral, BinOp, UnOp, Variable, Let, Assign, If, BoolLiteral, UnOp, ASTSequence, AST, Buffer, ForLoop, Range, Declare, While, DoWhile, Print, funct_call, funct_def, funct_ret, StringLiteral, StringSlice, ListObject, ListCons, ListOp, ListIndex
-from core import RuntimeEnvironment
+from utils.typechecker import value_type
+from utils.interner import Interner
 
 
 keywords = "let assign for while repeat print declare range do to if then else in deffunct callfun functret".split()
@@ -13,11 +17,9 @@ whitespace = [" ", "\n"]
 symbols = "; , ( ) { } [ ] ' .".split()
 list_utils = "cons head tail empty".split()
 
-r = RuntimeEnvironment()
-
 @dataclass
 class Stream:
-    source: str
+    source: str | mmap.mmap | BinaryIO
     pos: int
 
     def from_string(string:str , position:int = 0):
@@ -26,6 +28,88 @@ class Stream:
         """
         return Stream(string, position)
 
+    def from_file(path: str):
+        """
+        Creates a stream over a file, mapped into memory rather than read,
+        so that its source is never held as a whole string. Empty files,
+        which cannot be mapped, are read.
+        """
+        with open(path, "rb") as f:
+            try:
+                return Stream(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), 0)
+            except ValueError:
+                return Stream(f.read().decode("utf-8"), 0)
+
+    def from_reader(reader: BinaryIO):
+        """
+        Creates a stream over a binary file which need not be seekable, such
+        as standard input, read as it is lexed rather than all at once.
+        """
+        return Stream(reader, 0)
+
+    def chunks(self) -> Iterator[tuple[str, int, int]]:
+        """
+        Generates the rest of the source in chunks of whole lines, as a string
+        and the span of the chunk in it, and moves the stream past each chunk.
+        A string source is not copied. A mapped file or a reader is decoded a
+        chunk at a time, with its line endings translated as reading it as
+        text would.
+        """
+        source = self.source
+        if not isinstance(source, (str, mmap.mmap)):
+            yield from self.read_chunks()
+            return
+        length = len(source)
+        newline = "\n" if isinstance(source, str) else b"\n"
+        released = 0
+        while self.pos < length:
+            start = self.pos
+            end = start + CHUNK_SIZE
+            if end < length:
+                cut = source.rfind(newline, start, end)
+                end = cut + 1 if cut >= start else source.find(newline, end) + 1 or length
+            else:
+                end = length
+            self.pos = end
+            if isinstance(source, str):
+                yield source, start, end
+            else:
+                text = decode_lines(source[start:end])
+                yield text, 0, len(text)
+                # The pages lexed are not needed again: let them leave the resident set.
+                if hasattr(mmap, "MADV_DONTNEED") and end - end % mmap.PAGESIZE > released:
+                    source.madvise(mmap.MADV_DONTNEED, released, end - end % mmap.PAGESIZE - released)
+                    released = end - end % mmap.PAGESIZE
+
+    def read_chunks(self) -> Iterator[tuple[str, int, int]]:
+        """
+        Generates the chunks of a reader as they arrive: whatever whole lines
+        each read completes, so that a slow writer's statements are lexed as
+        soon as their lines are written.
+        """
+        read = getattr(self.source, "read1", self.source.read)
+        pending = bytearray()
+        while data := read(CHUNK_SIZE):
+            pending += data
+            cut = data.rfind(b"\n")
+            if cut >= 0:
+                cut += len(pending) - len(data) + 1
+                text = decode_lines(pending[:cut])
+                del pending[:cut]
+                self.pos += cut
+                yield text, 0, len(text)
+        if pending:
+            text = decode_lines(pending)
+            self.pos += len(pending)
+            yield text, 0, len(text)
+
+    def close(self):
+        """
+        Unmaps the file of a stream created by from_file.
+        """
+        if isinstance(self.source, mmap.mmap):
+            self.source.close()
+
     def next_char(self):
         """
         Returns the next character in the stream.
@@ -47,99 +131,148 @@ class Stream:
 # Define the token types.
 Token = Num | Bool | Keyword | Identifier | Operator | Symbols | StringToken | ListToken | Whitespace
 
-def word_to_token(word):
-    if word in keywords:
-        return Keyword(word)
-    if word in word_operators:
-        return Operator(word)
-    if word == "True":
-        return Bool(True)
-    if word == "False":
-        return Bool(False)
-    if word in symbolic_operators:
-        return Operator(word)
-    if word in symbols:
-        return Symbols(word)
-    if word in whitespace:
-        return Whitespace(word)
-    return Identifier(word)
+# The token each reserved word stands for, in order of precedence.
+WORD_TOKENS = {}
+for word in keywords:
+    WORD_TOKENS.setdefault(word, Keyword(word))
+for word in word_operators:
+    WORD_TOKENS.setdefault(word, Operator(word))
+WORD_TOKENS.setdefault("True", Bool(True))
+WORD_TOKENS.setdefault("False", Bool(False))
+for word in symbolic_operators:
+    WORD_TOKENS.setdefault(word, Operator(word))
+for word in symbols:
+    WORD_TOKENS.setdefault(word, Symbols(word))
+for word in whitespace:
+    WORD_TOKENS.setdefault(word, Whitespace(word))
 
+def word_to_token(word):
+    token = WORD_TOKENS.get(word)
+    if token is None:
+        return Identifier(word)
+    return token
+
+"""
+The lexer is driven by one regular expression, which skips whitespace
+and matches the text of a token, the longest of:
+
+    a number     digits, and the decimal points among them,
+    an operator  a run of operator characters, which a minus ends, so
+                 that | a=-b | is lexed as = and -,
+    a word       letters,
+
+or else a single character, a symbol or one the lexer rejects. The kind
+of token is then decided by the class of its first character.
+
+No token spans a newline, so the source is scanned in the chunks of whole
+lines Stream.chunks gives, each with a single findall.
+"""
+TOKEN_PATTERN = re.compile(r"[ \n]*(\d[\d.]*|[-+*/<>=%&|!][+*/<>=%&|!]*|[^\W\d_]+|[^ \n])")
+OPERATOR_CHARACTERS = frozenset("+-*/<>=%&|!")
+SYMBOL_CHARACTERS = frozenset(symbols)
+CHUNK_SIZE = 1 << 16
+# The most pieces of text the lexer remembers the tokens of, so that sources
+# with many distinct names or numbers lex in bounded memory. The first ones
+# seen are kept, as the most common ones usually are among them.
+TOKEN_CACHE_SIZE = 1 << 16
+
+
+def decode_lines(data: bytes) -> str:
+    """
+    Decodes whole lines of a file, translating their line endings to \\n.
+    """
+    text = data.decode("utf-8")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def number_token(text: str) -> Num:
+    """
+    Builds the exact number a run of digits and decimal points stands for.
+    """
+    point = text.find(".")
+    if point < 0:
+        return Num(int(text))
+    if text.count(".") > 1:
+        raise Exception("Cannot have two decimal points in a number.")
+    fraction = text[point + 1:]
+    return Num(exact(int(text[:point] + fraction), 10 ** len(fraction)), floating=True)
+
+
+def text_to_tokens(text: str) -> Iterator[Token]:
+    """
+    The tokens a piece of text matched by TOKEN_PATTERN stands for. This is
+    one token, except for words with characters \\w accepts as letters but
+    str.isalpha does not, which are split around them. Characters which
+    start no token give None.
+    """
+    first = text[0]
+    if first.isdigit():
+        # int() rejects digits \\d does not match, such as superscripts, as it always has.
+        yield number_token(text)
+    elif first in OPERATOR_CHARACTERS or first in SYMBOL_CHARACTERS or text.isalpha():
+        yield word_to_token(text)
+    else:
+        start = 0
+        for end, c in enumerate(text):
+            if not c.isalpha():
+                if start < end:
+                    yield word_to_token(text[start:end])
+                yield number_token(c) if c.isdigit() else None
+                start = end + 1
+        if start < len(text):
+            yield word_to_token(text[start:])
 
 
 @dataclass
 class Lexer:
     stream: Stream
     save: Token = None
+    tokens: Iterator = None
 
     def from_stream(s):
         return Lexer(s)
-        
-    def next_token(self) -> Token:
-        try:
-            match self.stream.next_char():
-                case c if c.isdigit():
-                    # TODO: Handle different bases.
-                    n = int(c)  
-                    base_multiplier = 10
-                    floating = False
-                    while True:
-                        try:
-                            c = self.stream.next_char()
-                            if c.isdigit() and not floating:
-                                n = n*base_multiplier + int(c)
-                            elif c.isdigit() and floating:
-                                n = n + int(c) / base_multiplier
-                                base_multiplier = base_multiplier * 10
-                            elif c == ".":          
-                                if floating:
-                                    raise Exception("Cannot have two decimal points in a number.")
-                                floating = floating | True
-                            else:
-                                self.stream.unget()
-                                return Num(n, floating= floating)
-                        except EndOfStream:
-                            return Num(n)
-
-                case c if c in symbolic_operators: 
-                     s = c
-                     while True:
-                        try:
-                            c = self.stream.next_char()
-
-                            if c =="-":
-                                self.stream.unget()
-                                return word_to_token(s)
-                            elif c in symbolic_operators:
-                                s = s + c
-                            else:
-                                self.stream.unget()
-                                return word_to_token(s)
-                        except EndOfStream:
-                            return word_to_token(s)
-
-                case c if c.isalpha():
-                    s = c
-                    while True:
-                        try:
-                            c = self.stream.next_char()
-                            if c.isalpha():
-                                s = s + c
-                            else:
-                                self.stream.unget()
-                                return word_to_token(s)
-                        except EndOfStream:
-                            return word_to_token(s)
-
-                case c if c in symbols: 
-                    s = c
-                    return word_to_token(s)
-                case c if c in whitespace:
-                    return self.next_token()
 
+    def scan(self) -> Iterator[Token]:
+        """
+        Generates the tokens of the source, from the position of the stream
+        onwards. Tokens are compared by value and never modified, so the
+        token for a piece of text is built once and reused wherever the
+        text appears again.
+        """
+        findall = TOKEN_PATTERN.findall
+        cache = {}
+        for source, start, end in self.stream.chunks():
+            for text in findall(source, start, end):
+                token = cache.get(text)
+                if token is None:
+                    # ASCII text is a single token, if any, decided by its first character.
+                    first = text[0]
+                    if not text.isascii():
+                        yield from text_to_tokens(text)
+                        continue
+                    elif first.isdigit():
+                        token = number_token(text)
+                    elif first in OPERATOR_CHARACTERS or first in SYMBOL_CHARACTERS or first.isalpha():
+                        token = word_to_token(text)
+                    else:
+                        yield None
+                        continue
+                    if len(cache) < TOKEN_CACHE_SIZE:
+                        cache[text] = token
+                yield token
 
-    
-        except EndOfStream:
-            raise EndOfTokens
+    def next_token(self) -> Token:
+        """
+        Returns the next token, and moves the stream past it.
+        Raises EndOfTokens once the source is exhausted.
+        """
+        if self.tokens is None:
+            self.tokens = self.scan()
+        for token in self.tokens:
+            return token
+        raise EndOfTokens
 
     def peek_token(self):
         """
@@ -152,10 +285,11 @@ class Lexer:
 
     def match(self, expected):
         """
-        Matches the next token to the expected token.
+        Matches the next token to the expected token, which is a keyword,
+        operator or symbol, and so is the same object as the token it matches.
         """
 
-        if self.peek_token() == expected:
+        if self.peek_token() is expected:
             return self.advance()
         else: 
             raise TokenError(f"Expected {expected}, got {self.peek_token()}")
@@ -168,75 +302,48 @@ class Lexer:
         self.save = None
 
     def __iter__(self):
-        return self
+        if self.tokens is None:
+            self.tokens = self.scan()
+        return self.tokens
 
     def __next__(self):
-        try:
-            self.curr_token = self.next_token()
-            return self.curr_token
-        except EndOfTokens:
-            raise StopIteration
+        if self.tokens is None:
+            self.tokens = self.scan()
+        return next(self.tokens)
 
 @dataclass
 class Parser:
     lexer: Lexer
+    interner: Optional[Interner] = None
+
+    def from_lexer(lexer, interner: Interner = None):
+        """
+        Generate a parser from a lexer. Given an Interner, the parser interns
+        every node it builds, sharing it with an equal one parsed before.
+        """
+        return Parser(lexer, interner)
 
-    def from_lexer(lexer):
+    def node(self, node: AST) -> AST:
         """
-        Generate a parser from a lexer.
+        A node just built, or its interned twin. Nodes are built, and so
+        interned, after their children.
         """
-        return Parser(lexer)
+        if self.interner is None:
+            return node
+        return self.interner.intern(node)
 
     def parse_expression(self):
         """
         Parse a complete expression.
         For | a == b |, this will parse the entire expression.
         """
-        match self.lexer.peek_token():
-            case Keyword("if"):
-                return self.parse_if()
-            case Keyword("while"):
-                return self.parse_while()
-            case Keyword("let"):
-                return self.parse_let()
-            case Keyword("assign"):
-                return self.parse_assign()
-            case Keyword("for"):
-                return self.parse_for()
-            case Keyword("range"):
-                return self.parse_range()
-            case Keyword("print"):
-                return self.parse_print()
-            case Keyword("declare"):
-                return self.parse_declare()
-            case Keyword("while"):
-                return self.parse_while()
-            case Keyword("repeat"):
-                return self.parse_repeat()
-            case Keyword("deffunct"):
-                return self.parse_funct_def()
-            case Keyword("callfun"):
-                return self.parse_funct_call()
-            case Keyword("functret"):
-                return self.parse_funct_ret()
-            case Symbols(";"):
-                return self.lexer.__next__()
-            case Symbols("{"):
-                return self.parse_AST_sequence()
-            case Symbols("}"):
-                return self.lexer.__next__()
-            case Symbols(","):
-                return self.lexer.__next__()
-            case Symbols("'"):
-                return self.parse_string()
-            case Symbols("["):
-                return self.parse_list()                        
-
-
-            case _:
-                return self.parse_simple()
-    
+        parse = STATEMENT_PARSERS.get(self.lexer.peek_token())
+        if parse is None:
+            return self.parse_simple()
+        return parse(self)
 
+    def parse_separator(self):
+        return self.lexer.__next__()
 
     def parse_list_op(self,obj):
         self.lexer.match(Symbols("."))
@@ -259,7 +366,7 @@ class Parser:
             # print("In Cons")
             # print(ListCons(to_add,obj))
 
-            return ListCons(to_add,obj)        
+            return self.node(ListCons(to_add,obj))
         else:
             # print("In Rest Operations")
             
@@ -268,21 +375,21 @@ class Parser:
                 s+=op_val
                 s+="?"
 
-                return ListOp(s,obj)
+                return self.node(ListOp(s,obj))
             else:
-                return ListOp(op_val,obj)
+                return self.node(ListOp(op_val,obj))
             
 
     
     def parse_slice(self,obj):
         ind1 = self.parse_expression()
 
-        if(self.lexer.peek_token()==Symbols(",")):
+        if(self.lexer.peek_token() is Symbols(",")):
             self.lexer.advance()
             ind2 = self.parse_expression()
-            return StringSlice(obj,ind1,ind2)
+            return self.node(StringSlice(obj,ind1,ind2))
         else:
-            return ListIndex(ind1,obj)
+            return self.node(ListIndex(ind1,obj))
 
     
 
@@ -333,11 +440,11 @@ class Parser:
         list_elems = []
 
 
-        while self.lexer.peek_token() != Symbols("]"):
+        while self.lexer.peek_token() is not Symbols("]"):
             x = self.parse_expression()
             list_elems.append(x)
 
-            if self.lexer.peek_token() == Symbols("]"):
+            if self.lexer.peek_token() is Symbols("]"):
                 break
             else:
                 self.lexer.match(Symbols(","))
@@ -346,10 +453,14 @@ class Parser:
 
 
         self.lexer.match(Symbols("]")) 
-        list_type = type(r.eval(list_elems[0]))
+        # The type of the first element, when it follows from the expression;
+        # otherwise the runtime takes the type of its value.
+        if not list_elems:
+            raise ListError("The type of an empty list cannot be inferred.")
+        list_type = value_type(list_elems[0])
             
 
-        return ListObject(list_elems,list_type)
+        return self.node(ListObject(list_elems,list_type))
 
 
 
@@ -367,7 +478,7 @@ class Parser:
         str_val = str_val_var.name
         self.lexer.match(Symbols("'"))
 
-        return StringLiteral(value=str_val)
+        return self.node(StringLiteral(value=str_val))
 
 
 
@@ -381,137 +492,65 @@ class Parser:
             case Identifier(name):
                 self.lexer.advance()
 
-                if(self.lexer.peek_token()==Symbols(".")):
-                    return self.parse_list_op(obj=Variable(name))
-                elif(self.lexer.peek_token()==Symbols("[")):
-                    return self.parse_index(obj=Variable(name))
+                if(self.lexer.peek_token() is Symbols(".")):
+                    return self.parse_list_op(obj=self.node(Variable(name)))
+                elif(self.lexer.peek_token() is Symbols("[")):
+                    return self.parse_index(obj=self.node(Variable(name)))
                 
-                return Variable(name)
+                return self.node(Variable(name))
             case Num(value):
                 self.lexer.advance()
-                return NumLiteral(value)
+                return self.node(NumLiteral(value))
             case Bool(value):
                 self.lexer.advance()
-                return BoolLiteral(value)
+                return self.node(BoolLiteral(value))
 
-    def parse_addition(self):
+    def parse_simple(self):
         """
-        Parse an addition expression.
-        For | a + b |, this will parse the entire expression.
+        Parse an expression of operators and their operands.
+        For | a + b * c == d |, this will parse the entire expression.
         """
-        left = self.parse_multiplication()
-        while True:
-            match self.lexer.peek_token():
-                case Operator(op) if op in "+-":
-                    self.lexer.advance()
-                    m = self.parse_multiplication()
-                    left = BinOp(op, left, m)
-                case _:
-                    break
-        return left
+        return self.parse_operators(0)
 
-    def parse_multiplication(self):
+    def parse_operators(self, power):
         """
-        Parse a multiplication expression.
-        For | a * b |, this will parse the entire expression.
+        Parse operators by precedence climbing, for as long as they bind
+        tighter than power: the operators found on the way are left to the
+        calls which parsed the operands before them. Only operators which
+        bind tighter than the one before them, or parentheses, go deeper,
+        so the stack grows with the nesting of an expression, not its length.
         """
-        left = self.parse_mod()
+        left = self.parse_operand()
         while True:
-            match self.lexer.peek_token():
-                case Operator(op) if op in "*/":
-                    self.lexer.advance()
-                    m = self.parse_mod()
-                    left = BinOp(op, left, m)
-                case _:
-                    break
-        return left
-    
-    def parse_uneg(self):
-        right = None
-        if(self.lexer.peek_token()==Operator("-")):
+            operator = self.lexer.peek_token()
+            powers = BINARY_OPERATORS.get(operator)
+            if powers is None or powers[0] < power:
+                return left
             self.lexer.advance()
-            # right = self.parse_atomic_expression()
-            # return UnOp("-",right)
-            if (isinstance( self.lexer.peek_token(),Identifier) or isinstance( self.lexer.peek_token(),Num) or isinstance( self.lexer.peek_token(),Bool)):
-                m = self.parse_atomic_expression()
-                right = UnOp("-",m)
-            else:
-                m = self.parse_expression()
-                right = UnOp("-",m)
-        else:
-                if (isinstance( self.lexer.peek_token(),Identifier) or isinstance( self.lexer.peek_token(),Num) or isinstance( self.lexer.peek_token(),Bool)):
-                    right = self.parse_atomic_expression()
-                else:
-                    right = self.parse_expression()
-
-        return right
-
-
-    def parse_mod(self):
-        """
-        Parse a mod expression.
-        For | a % b |, this will parse the entire expression.
-        """
-        left = self.parse_uneg()
-        while True:
-            match self.lexer.peek_token():
-                case Operator(op) if op in "%":
-                    self.lexer.advance()
-                    m = self.parse_uneg()
-                    left = BinOp(op, left, m)
-                case _:
-                    break
-        return left   
-    def parse_mod(self):
-        """
-        Parse a mod expression.
-        For | a % b |, this will parse the entire expression.
-        """
-        if (isinstance( self.lexer.peek_token(),Identifier) or isinstance( self.lexer.peek_token(),Num) or isinstance( self.lexer.peek_token(),Bool)):
-            left = self.parse_atomic_expression()
-        else:
-            left = self.parse_expression()
-
-        while True:
-            match self.lexer.peek_token():
-                case Operator(op) if op in "%":
-                    self.lexer.advance()
-                    if (isinstance( self.lexer.peek_token(),Identifier) or isinstance( self.lexer.peek_token(),Num) or isinstance( self.lexer.peek_token(),Bool)):
-                        m = self.parse_atomic_expression()
-                        left = BinOp(op, left, m)
-                    else:
-                        m = self.parse_expression()
-                        left = BinOp(op, left, m)
+            left = self.node(BinOp(operator.op, left, self.parse_operators(powers[1])))
 
-                case _:
-                    break
-        return left
-
-    def parse_simple(self):
+    def parse_operand(self):
         """
-        Parse a &&/|| expression.
-        For | a && b |, this will parse the entire expression.
+        Parse the operand of an operator: an atomic expression, a prefix
+        operator applied to its operand, a parenthesized expression, or an
+        expression which starts with a keyword or symbol, such as a call.
         """
-        left = self.parse_comparison()
-        match self.lexer.peek_token():
-            case Operator(op) if op in "&& ||":
-                self.lexer.advance()
-                right = self.parse_comparison()
-                return BinOp(op, left, right)
-        return left
-
-    def parse_comparison(self):
-        """
-        Parse a comparison expression.
-        For | a == b |, this will parse the entire expression.
-        """
-        left = self.parse_addition()
-        match self.lexer.peek_token():
-            case Operator(op) if op in symbolic_operators:
-                self.lexer.advance()
-                right = self.parse_addition()
-                return BinOp(op, left, right)
-        return left
+        token = self.lexer.peek_token()
+        if isinstance(token, (Identifier, Num, Bool)):
+            return self.parse_atomic_expression()
+        power = PREFIX_OPERATORS.get(token)
+        if power is not None:
+            self.lexer.advance()
+            return self.node(UnOp(token.op, self.parse_operators(power)))
+        if token is Symbols("("):
+            self.lexer.advance()
+            expression = self.parse_operators(0)
+            self.lexer.match(Symbols(")"))
+            return expression
+        parse = STATEMENT_PARSERS.get(token)
+        if parse is None or parse is Parser.parse_separator:
+            raise TokenError(f"Expected an expression, got {token}")
+        return parse(self)
 
     def parse_let(self):
         """
@@ -526,7 +565,7 @@ class Parser:
         self.lexer.match(Keyword("in"))
         b = self.parse_expression()
         self.lexer.match(Symbols(";"))
-        return Let(var, a, b)
+        return self.node(Let(var, a, b))
 
     def parse_if(self):
         """
@@ -537,13 +576,13 @@ class Parser:
         cond = self.parse_expression()
         self.lexer.match(Keyword("then"))
         e1 = self.parse_expression()
-        if self.lexer.peek_token() != Keyword("else"):
+        if self.lexer.peek_token() is not Keyword("else"):
 
-            return If(cond, e1, None)
+            return self.node(If(cond, e1, None))
         self.lexer.match(Keyword("else"))
         e2 = self.parse_expression()
         self.lexer.match(Symbols(";"))
-        return If(cond, e1, e2)
+        return self.node(If(cond, e1, e2))
 
     def parse_assign(self):
         """
@@ -555,7 +594,7 @@ class Parser:
         self.lexer.match(Operator("="))
         a = self.parse_expression()
         self.lexer.match(Symbols(";"))
-        return Assign(var, a)
+        return self.node(Assign(var, a))
 
     def parse_for(self):
         """
@@ -571,20 +610,25 @@ class Parser:
         task = self.parse_expression()
 
         self.lexer.match(Symbols(";"))
-        return ForLoop(var, iter, task)
+        return self.node(ForLoop(var, iter, task))
 
     def parse_range(self):
         """
         Parse a range.
-        Examples: | range 1 to 10 |, to define a range from 1 to 10.
+        Examples: | range(1, 10) |, to define a range from 1 to 10, and
+        | range(n, 1, 0-2) |, counting down from n in steps of 2.
         """
         self.lexer.match(Keyword("range"))
         self.lexer.match(Symbols("("))
-        left = self.parse_atomic_expression()
+        left = self.parse_expression()
         self.lexer.match(Symbols(","))
-        right = self.parse_atomic_expression()
+        right = self.parse_expression()
+        step = None
+        if self.lexer.peek_token() is Symbols(","):
+            self.lexer.match(Symbols(","))
+            step = self.parse_expression()
         self.lexer.match(Symbols(")"))
-        return Range(left, right)
+        return self.node(Range(left, right, step))
 
     def parse_print(self):
         """
@@ -596,7 +640,7 @@ class Parser:
         expression = self.parse_expression()
         self.lexer.match(Symbols(")"))
         self.lexer.match(Symbols(";"))
-        return Print(expression)
+        return self.node(Print(expression))
 
     def parse_while(self):
         """
@@ -608,7 +652,7 @@ class Parser:
         self.lexer.match(Keyword("do"))
         task = self.parse_expression()
         self.lexer.match(Symbols(";"))
-        return While(cond, task)
+        return self.node(While(cond, task))
 
     def parse_repeat(self):
         """
@@ -620,7 +664,7 @@ class Parser:
         self.lexer.match(Keyword("while"))
         cond = self.parse_expression()
         self.lexer.match(Symbols(";"))
-        return DoWhile(task, cond)
+        return self.node(DoWhile(task, cond))
 
     def parse_declare(self):
         """
@@ -631,16 +675,16 @@ class Parser:
         self.lexer.match(Operator("="))
         a = self.parse_expression()
         self.lexer.match(Symbols(";"))
-        return Declare(var, a)
+        return self.node(Declare(var, a))
     
     def parse_AST_sequence(self):
         li = []
         self.lexer.match(Symbols("{"))
-        while self.lexer.peek_token() != Symbols("}"):    
+        while self.lexer.peek_token() is not Symbols("}"):    
             var = self.parse_expression()
             li.append(var)
         self.lexer.match(Symbols("}"))
-        return ASTSequence(li)
+        return self.node(ASTSequence(li))
     
     def parse_funct_def(self):
         li_3= []
@@ -648,10 +692,10 @@ class Parser:
         self.lexer.match(Keyword("deffunct"))
         var = self.parse_atomic_expression()
         self.lexer.match(Symbols("("))
-        while self.lexer.peek_token() != Symbols(")"):    
+        while self.lexer.peek_token() is not Symbols(")"):    
             var_1 = self.parse_atomic_expression()
             li.append(var_1)
-            if(self.lexer.peek_token() == Symbols(")")):
+            if(self.lexer.peek_token() is Symbols(")")):
                 break
             self.lexer.match(Symbols(","))
             
@@ -661,7 +705,7 @@ class Parser:
         li_3.append(li)
         li_3.append(li_2)
         self.lexer.match(Symbols(";"))
-        return funct_def(var, li, li_2)
+        return self.node(funct_def(var, li, li_2))
 
         
     def parse_funct_call(self):
@@ -669,16 +713,16 @@ class Parser:
         self.lexer.match(Keyword("callfun"))
         var = self.parse_atomic_expression()
         self.lexer.match(Symbols("("))
-        while self.lexer.peek_token() != Symbols(")"):    
+        while self.lexer.peek_token() is not Symbols(")"):    
             var_1 = self.parse_expression()
             li.append(var_1)
-            if(self.lexer.peek_token() == Symbols(")")):
+            if(self.lexer.peek_token() is Symbols(")")):
                 break
             self.lexer.match(Symbols(","))
             
         self.lexer.match(Symbols(")"))
         self.lexer.match(Symbols(";"))
-        return funct_call(var, li)
+        return self.node(funct_call(var, li))
     
     def parse_funct_ret(self):
         self.lexer.match(Keyword("functret"))
@@ -686,7 +730,7 @@ class Parser:
         li = self.parse_expression()
         self.lexer.match(Symbols(")"))
         self.lexer.match(Symbols(";"))
-        return funct_ret(li)   
+        return self.node(funct_ret(li))
 
     def __iter__(self):
         return self
@@ -696,3 +740,42 @@ class Parser:
             return self.parse_expression()
         except EndOfTokens:
             raise StopIteration
+
+
+# The binding powers of the binary operators, on their left and on their
+# right. An operand is taken by the operator either side of it which binds it
+# tighter; the right power of the operators which associate to the left is
+# the greater one. Comparisons bind looser than arithmetic, and % tighter
+# than * and /.
+BINARY_OPERATORS = {}
+for power, operators in enumerate(["|| | or", "&& & and", "== != < > <= >= =", "+ -", "* /", "%"]):
+    for op in operators.split():
+        BINARY_OPERATORS[Operator(op)] = (2 * power + 1, 2 * power + 2)
+BINARY_OPERATORS[Operator("**")] = (16, 15)
+
+# Prefix operators bind their operand tighter than any binary operator but **,
+# so | -a * b | is | (-a) * b |, and | -a ** b | is | -(a ** b) |.
+PREFIX_OPERATORS = {Operator("-"): 13, Operator("!"): 13, Operator("not"): 13}
+
+# The parser for the expressions each token starts. Tokens are looked up by
+# identity; any other token starts a simple expression.
+STATEMENT_PARSERS = {
+    Keyword("if"): Parser.parse_if,
+    Keyword("while"): Parser.parse_while,
+    Keyword("let"): Parser.parse_let,
+    Keyword("assign"): Parser.parse_assign,
+    Keyword("for"): Parser.parse_for,
+    Keyword("range"): Parser.parse_range,
+    Keyword("print"): Parser.parse_print,
+    Keyword("declare"): Parser.parse_declare,
+    Keyword("repeat"): Parser.parse_repeat,
+    Keyword("deffunct"): Parser.parse_funct_def,
+    Keyword("callfun"): Parser.parse_funct_call,
+    Keyword("functret"): Parser.parse_funct_ret,
+    Symbols(";"): Parser.parse_separator,
+    Symbols("{"): Parser.parse_AST_sequence,
+    Symbols("}"): Parser.parse_separator,
+    Symbols(","): Parser.parse_separator,
+    Symbols("'"): Parser.parse_string,
+    Symbols("["): Parser.parse_list,
+}
@@ -1,6 +1,7 @@
 from dataclasses import dataclass
 from fractions import Fraction
 from typing import Union, Mapping
+import pytest
 from core import RuntimeEnvironment
 from utils.datatypes import (
     AST,
@@ -17,6 +18,7 @@ from utils.datatypes import (
     NumType,
     BoolType,
     ForLoop,
+    Range,
     Assign,
     While,
     DoWhile,
@@ -33,6 +35,12 @@ from utils.datatypes import (
 )
 from utils.typechecker import StaticTypeChecker
 from utils.errors import *
+from compiler import ClosureCompiler, CompiledRuntimeEnvironment
+from stackeval import StackEvaluator, StackRuntimeEnvironment
+from bytecode import BytecodeCompiler, VirtualMachine
+import bytecode
+from transpiler import Transpiler, transpile, run_python
+from utils.resolver import Resolver, Slot
 
 
 def test_eval():
@@ -680,7 +688,1044 @@ def test_rec_funct():
     go_ = funct_call(Variable("hi"), li_)
     r.eval(go)
     assert(r.eval(go_)==5040)
-    
+
+
+# testing the scope resolver
+
+def test_scope_resolver_slots():
+    x = Variable("x")
+    y = Variable("y")
+    i = Variable("i")
+    j = Variable("j")
+    loops = ForLoop(i, Range(NumLiteral(1), NumLiteral(3)), ForLoop(j, Range(NumLiteral(1), NumLiteral(3)), Assign(x, BinOp("+", x, BinOp("*", i, j)))))
+
+    resolver = Resolver()
+    assert resolver.resolve(Declare(y, NumLiteral(0))).var == Slot("y", None, 0, 0)
+    assert resolver.resolve(Declare(x, NumLiteral(0))).var == Slot("x", None, 0, 1)
+    assign = resolver.resolve(loops).stat.stat
+    assert assign.var == Slot("x", None, 2, 1)
+    assert assign.expression.right.left == Slot("i", None, 1, 0)
+    assert assign.expression.right.right == Slot("j", None, 0, 0)
+
+    runtime = RuntimeEnvironment()
+    runtime.eval(Declare(x, NumLiteral(0)))
+    runtime.eval(Declare(y, NumLiteral(1)))
+    runtime.eval(loops)
+    assert runtime.eval(x) == 36
+
+    # y is only declared in the loop's frame on the second iteration; before that, the global one is read.
+    seen = Variable("seen")
+    runtime.eval(Declare(seen, NumLiteral(0)))
+    conditional = ForLoop(i, Range(NumLiteral(1), NumLiteral(2)), ASTSequence([
+        If(BinOp("==", i, NumLiteral(2)), Declare(y, NumLiteral(10)), None),
+        Assign(seen, BinOp("+", BinOp("*", seen, NumLiteral(100)), y)),
+    ]))
+    runtime.eval(conditional)
+    assert runtime.eval(seen) == 110
+    assert runtime.eval(y) == 1
+
+    # Names free in a function body are still looked up in the frames of its caller.
+    runtime.eval(funct_def(Variable("f"), [], BinOp("*", i, NumLiteral(2))))
+    assert runtime.eval(ForLoop(i, Range(NumLiteral(1), NumLiteral(3)), funct_call(Variable("f"), []))) == 6
+
+
+def test_frame_pool_reuses_frames():
+    x = Variable("x")
+    y = Variable("y")
+    i = Variable("i")
+    j = Variable("j")
+    loops = ForLoop(i, Range(NumLiteral(1), NumLiteral(50)), ForLoop(j, Range(NumLiteral(1), NumLiteral(50)), ASTSequence([
+        Declare(y, BinOp("*", i, j)),
+        Assign(x, BinOp("+", x, y)),
+    ])))
+
+    for runtime, run in [(r := RuntimeEnvironment(), r.eval), (c := RuntimeEnvironment(), ClosureCompiler(c).run)]:
+        run(Declare(x, NumLiteral(0)))
+        run(loops)
+        assert run(x) == 1275 * 1275
+        # One frame per loop, reset between iterations, however many iterations run.
+        assert runtime.frames.allocated == 2
+        run(loops)
+        assert runtime.frames.allocated == 2
+
+
+# testing the numeric tower
+
+def test_numeric_tower():
+    x = Variable("x")
+    runtime = RuntimeEnvironment()
+    assert type(runtime.eval(BinOp("/", NumLiteral(6), NumLiteral(3)))) is int
+    assert runtime.eval(BinOp("/", NumLiteral(1), NumLiteral(3))) == Fraction(1, 3)
+    assert runtime.eval(BinOp("*", BinOp("/", NumLiteral(1), NumLiteral(3)), NumLiteral(3))) == 1
+
+    # An int and a Fraction are both numbers, so assigning one over the other is not a BadAssignment.
+    runtime.eval(Declare(x, NumLiteral(1)))
+    assert runtime.eval(Assign(x, BinOp("/", x, NumLiteral(2)))) == Fraction(1, 2)
+    assert runtime.eval(Assign(x, BinOp("*", x, NumLiteral(4)))) == 2
+    assert runtime.eval(ListObject([NumLiteral(1), BinOp("/", NumLiteral(1), NumLiteral(2))], Fraction)) == [1, Fraction(1, 2)]
+
+    from stream import Stream, Lexer
+    numbers = [token.n for token in Lexer.from_stream(Stream.from_string("12 0.1 2.50"))]
+    assert numbers == [12, Fraction(1, 10), Fraction(5, 2)]
+    assert type(numbers[0]) is int
+
+
+def test_numeric_modes():
+    from decimal import Decimal
+    x = Variable("x")
+    i = Variable("i")
+    third = BinOp("/", NumLiteral(1), NumLiteral(3))
+    loop = ForLoop(i, Range(NumLiteral(1), NumLiteral(4)), Assign(x, BinOp("+", x, UnOp("-", BinOp("/", NumLiteral(1), i)))))
+
+    for environment in (RuntimeEnvironment, CompiledRuntimeEnvironment):
+        assert environment().eval(third) == Fraction(1, 3)
+
+        runtime = environment("decimal", 6)
+        assert runtime.eval(third) == Decimal("0.333333")
+        assert runtime.eval(NumLiteral(Fraction(1, 10))) == Decimal("0.1")
+        runtime.eval(Declare(x, NumLiteral(0)))
+        assert runtime.eval(loop) == Decimal("-2.08333")
+
+        runtime = environment("float")
+        assert runtime.eval(third) == 1 / 3
+        assert type(runtime.eval(NumLiteral(2))) is float
+        runtime.eval(Declare(x, NumLiteral(0)))
+        assert runtime.eval(loop) == -(1 + 1 / 2 + 1 / 3 + 1 / 4)
+        # Floats are still Gossip numbers, so lists of them type check.
+        assert runtime.eval(ListObject([NumLiteral(1), third], Fraction)) == [1.0, 1 / 3]
+
+    with pytest.raises(ValueError):
+        RuntimeEnvironment("double")
+
+
+def test_lazy_range():
+    r = RuntimeEnvironment()
+    n = Variable("n")
+    s = Variable("s")
+    i = Variable("i")
+
+    # Ranges produce their values as the loop consumes them.
+    values = r.eval(Range(NumLiteral(0), NumLiteral(10 ** 12)))
+    assert len(values) == 10 ** 12 + 1 and values[-1] == 10 ** 12
+
+    r.eval(Declare(n, NumLiteral(10)))
+    r.eval(Declare(s, NumLiteral(0)))
+    up = ForLoop(i, Range(BinOp("/", n, NumLiteral(2)), BinOp("*", n, NumLiteral(2)), NumLiteral(3)), Assign(s, BinOp("+", s, i)))
+    assert r.eval(up) == 5 + 8 + 11 + 14 + 17 + 20
+    down = ForLoop(i, Range(n, NumLiteral(1), UnOp("-", NumLiteral(4))), Assign(s, BinOp("+", BinOp("*", s, NumLiteral(100)), i)))
+    assert r.eval(down) == 75100602
+
+
+def test_lexer_tokens():
+    from stream import Stream, Lexer
+    from utils.datatypes import Num, Bool, Keyword, Identifier, Operator, Symbols
+
+    source = "let x=-1.25 end\nif x <= 3 then print(True)\tend \n"
+    tokens = list(Lexer.from_stream(Stream.from_string(source)))
+    assert tokens == [Keyword("let"), Identifier("x"), Operator("="), Operator("-"),
+                      Num(Fraction(5, 4), floating=True), Identifier("end"), Keyword("if"),
+                      Identifier("x"), Operator("<="), Num(3), Keyword("then"), Keyword("print"),
+                      Symbols("("), Bool(True), Symbols(")"), None, Identifier("end")]
+
+    # Sources longer than a chunk are split between lines, never inside a token.
+    source = "let abc = 12.5 end\n" * 5000
+    tokens = list(Lexer.from_stream(Stream.from_string(source)))
+    assert len(tokens) == 5 * 5000
+    assert tokens[-5:] == [Keyword("let"), Identifier("abc"), Operator("="), Num(Fraction(25, 2), floating=True), Identifier("end")]
+
+
+def test_fixed_tokens_are_shared():
+    import pickle
+    from stream import Stream, Lexer, Parser
+    from utils.datatypes import Keyword, Operator, Symbols, Identifier, Num
+
+    assert Keyword("let") is Keyword("let") and Keyword("let") is not Keyword("in")
+    assert pickle.loads(pickle.dumps(Symbols(";"))) is Symbols(";")
+    with pytest.raises(AttributeError):
+        Operator("+").op = "-"
+
+    source = "declare a = 1; assign a = a + 2; print(a);\n" * 100
+    tokens = list(Lexer.from_stream(Stream.from_string(source)))
+    fixed = [token for token in tokens if not isinstance(token, (Identifier, Num))]
+    assert len(fixed) == 1100 and len({id(token) for token in fixed}) == 8
+    assert fixed[0] is Keyword("declare") and fixed[-1] is Symbols(";")
+
+    program = list(Parser.from_lexer(Lexer.from_stream(Stream.from_string(source))))
+    assert program[1] == Assign(Variable("a"), BinOp("+", Variable("a"), NumLiteral(2)))
+
+
+def test_operator_precedence():
+    import sys
+    from stream import Stream, Lexer, Parser, symbolic_operators, word_operators, BINARY_OPERATORS, PREFIX_OPERATORS
+    from utils.datatypes import Operator
+
+    def parse(source):
+        return list(Parser.from_lexer(Lexer.from_stream(Stream.from_string(f"print({source});"))))[0].value
+
+    a, b, c = Variable("a"), Variable("b"), Variable("c")
+    for op in symbolic_operators + word_operators:
+        assert Operator(op) in BINARY_OPERATORS or Operator(op) in PREFIX_OPERATORS
+
+    assert parse("a + b * c") == BinOp("+", a, BinOp("*", b, c))
+    assert parse("(a + b) * c") == BinOp("*", BinOp("+", a, b), c)
+    assert parse("a - b - c") == BinOp("-", BinOp("-", a, b), c)
+    assert parse("a * b % c") == BinOp("*", a, BinOp("%", b, c))
+    assert parse("a ** b ** c") == BinOp("**", a, BinOp("**", b, c))
+    assert parse("-a * b") == BinOp("*", UnOp("-", a), b)
+    assert parse("a - -b") == BinOp("-", a, UnOp("-", b))
+    assert parse("a < b && b < c || c == a") == BinOp("||", BinOp("&&", BinOp("<", a, b), BinOp("<", b, c)), BinOp("==", c, a))
+    with pytest.raises(TokenError):
+        parse("a + ")
+
+    # The stack grows with the nesting of an expression, not its length.
+    terms = " + ".join(f"-{i} * (a - {i})" for i in range(10000))
+    limit = sys.getrecursionlimit()
+    depth = 0
+    frame = sys._getframe()
+    while frame is not None:
+        depth, frame = depth + 1, frame.f_back
+    sys.setrecursionlimit(depth + 100)
+    try:
+        expression = parse(terms)
+    finally:
+        sys.setrecursionlimit(limit)
+    assert expression.right == BinOp("*", UnOp("-", NumLiteral(9999)), BinOp("-", a, NumLiteral(9999)))
+
+    # The whole program runs on the stack engine, which resolves and evaluates without recursion too.
+    runtime = StackRuntimeEnvironment()
+    for statement in Parser.from_lexer(Lexer.from_stream(Stream.from_string(f"declare a = 2; declare total = {terms};"))):
+        runtime.eval(statement)
+    assert runtime.eval(Variable("total")) == sum(-i * (2 - i) for i in range(10000))
+
+
+def test_list_element_type_inference():
+    from stream import Stream, Lexer, Parser
+
+    # Parsing infers the type of a list from its first element, without evaluating it.
+    source = "declare l = [1 < 2, False]; declare m = [x * 2, 3]; declare n = ['a', 'b'];"
+    l, m, n = [statement.value for statement in Parser.from_lexer(Lexer.from_stream(Stream.from_string(source)))]
+    assert (l.element_type, m.element_type, n.element_type) == (bool, None, str)
+
+    # Otherwise, the runtime gives the list the type of its first element.
+    r = RuntimeEnvironment()
+    a = Variable("a")
+    l = Variable("l")
+    r.eval(Declare(a, NumLiteral(5)))
+    assert r.eval(Declare(l, ListObject([a, BinOp("*", a, NumLiteral(2))], None))) == [5, 10]
+    assert r.eval(ListCons(NumLiteral(1), l)) == [1, 5, 10]
+    assert r.eval(ListCons(NumLiteral(2), ListObject([a], None))) == [2, 5]
+    with pytest.raises(InvalidArgumentToList):
+        r.eval(ListObject([a, BoolLiteral(True)], None))
+    with pytest.raises(ListError):
+        r.eval(ListCons(BoolLiteral(True), ListObject([a], None)))
+
+
+def test_ast_nodes_are_frozen():
+    import pickle
+    from dataclasses import FrozenInstanceError
+    from utils.resolver import Slot
+
+    node = Declare(Variable("l"), ListObject([NumLiteral(1), BinOp("+", Variable("a"), NumLiteral(2))], Fraction))
+    assert not hasattr(node, "__dict__") and not hasattr(node.var, "__dict__")
+    with pytest.raises(FrozenInstanceError):
+        node.var = Variable("m")
+    assert NumLiteral.type is NumLiteral(1).type and ListObject.type is node.value.type
+
+    # Nodes hash by value, lists like tuples, and the hash is kept.
+    same = Declare(Variable("l"), ListObject([NumLiteral(1), BinOp("+", Variable("a"), NumLiteral(2))], Fraction))
+    assert node == same and hash(node) == hash(same) and node._hash == hash(node)
+    assert len({node, same, Declare(Variable("l"), NumLiteral(1))}) == 2
+    assert hash(Slot("a", None, 0, 1)) != hash(Slot("a", None, 0, 2))
+
+    # Pickles hold the fields of a node, but not its hash.
+    loaded = pickle.loads(pickle.dumps(node))
+    assert loaded == node and not hasattr(loaded, "_hash") and hash(loaded) == hash(node)
+
+    # Evaluating a list literal leaves it as it was, so it can be evaluated again.
+    literal = ListObject([NumLiteral(1), BinOp("*", NumLiteral(2), NumLiteral(3))], Fraction)
+    r = RuntimeEnvironment()
+    assert r.eval(literal) == [1, 6] and r.eval(literal) == [1, 6]
+    assert literal.elements[1] == BinOp("*", NumLiteral(2), NumLiteral(3))
+
+
+def test_flat_ast():
+    import sys
+    from stream import Stream, Lexer, Parser
+    from utils.flatast import FlatAST, Cursor
+    from utils.visualizer import ASTViz
+
+    source = """
+    declare l = [1, 2, 3];
+    deffunct f(x, y) { functret(x * y + l.head); };
+    declare s = 'abc';
+    if 6 < callfun f(2, 3); then print(s[0, 2]); else print(True); ;
+    for i in range(1, 3) do { assign l = l.cons(i); }; ;
+    """
+    program = list(Parser.from_lexer(Lexer.from_stream(Stream.from_string(source))))
+    tree = FlatAST.from_nodes(program)
+    assert len(tree) == len(program) and list(tree.nodes()) == program
+
+    # Cursors read like the nodes they stand for.
+    l, f, s, branch, loop = tree
+    assert l.kind is Declare and l.var.name == "l" and l.value.element_type is Fraction
+    assert [element.value for element in l.value.elements] == [1, 2, 3]
+    assert [param.name for param in f.var_list] == ["x", "y"] and f.body.node() == program[1].body
+    assert branch.cond.right.kind is funct_call and branch.e2.value.value is True
+    assert s.value.type == StringLiteral.type and loop.val_list.step is None
+    assert dict(branch.fields()).keys() == {"cond", "e1", "e2", "type"}
+
+    # Deep expressions and shared nodes are stored without recursion.
+    deep = NumLiteral(0)
+    for i in range(sys.getrecursionlimit() * 2):
+        deep = BinOp("+", deep, NumLiteral(1))
+    shared = Variable("a")
+    tree = FlatAST.from_nodes([Print(deep), BinOp("*", shared, shared)])
+    assert len(tree.kinds) == 2 * sys.getrecursionlimit() * 2 + 1 + 1 + 2
+    product = tree.node(tree.statements[1])
+    assert product.left is product.right
+    assert tree.node(tree.statements[0]).value.right == NumLiteral(1)
+
+    # The runtime and the visualizer walk cursors.
+    r = RuntimeEnvironment()
+    for statement in FlatAST.from_nodes(program):
+        r.eval(statement)
+    assert r.eval(Variable("l")) == [3, 2, 1, 1, 2, 3]
+    viz = ASTViz()
+    viz.treebuilder(program[0], depth=1)
+    nodes = viz.dot.source
+    viz = ASTViz()
+    viz.treebuilder(FlatAST.from_nodes(program[:1]).cursor(0), depth=1)
+    assert viz.dot.source == nodes
+
+
+def test_interner(capsys):
+    import pickle
+    from stream import Stream, Lexer, Parser
+    from utils.interner import Interner
+    from interpreter import get_evaluator
+
+    source = """
+    declare x = 0;
+    deffunct f(n) { functret(n * 2 + 1); };
+    for i in range(1, 5) do { assign x = x + 2 * i + 1; print(x % 3 == 0); };
+    for i in range(1, 5) do { assign x = x + 2 * i + 1; print(x % 3 == 0); };
+    assign x = x + 1;
+    assign x = x + 1;
+    if 0 < callfun f(x); then print(x); else print(0); ;
+    """
+    parse = lambda interner=None: list(Parser.from_lexer(Lexer.from_stream(Stream.from_string(source)), interner))
+    interner = Interner()
+    program = parse(interner)
+    assert program == parse()
+
+    # Equal subtrees, within a statement and across statements, are one object.
+    assert program[2] is program[3] and program[4] is program[5]
+    assert program[4].expression.left is program[4].var and program[6].cond.right.arg_val[0] is program[4].var
+    assert interner.shared > 0 and interner.nodes == interner.shared + len(interner.table)
+    assert interner.report() == f"interner: {interner.nodes} subtrees, {interner.shared} shared, {len(interner.table)} distinct"
+
+    # Shared nodes run like the others on every engine, and pickle as shared.
+    outputs = set()
+    for engine in ("tree", "closure", "bytecode"):
+        evaluate = get_evaluator(RuntimeEnvironment(), engine)
+        for statement in program:
+            evaluate(statement)
+        outputs.add(capsys.readouterr().out)
+    run_python(transpile(program))
+    outputs.add(capsys.readouterr().out)
+    assert len(outputs) == 1 and outputs.pop().endswith("False\n72\n")
+    loaded = pickle.loads(pickle.dumps(program))
+    assert loaded == program and loaded[2] is loaded[3]
+
+    # A full table adds no new nodes, but still shares those it holds.
+    interner = Interner(max_entries=3)
+    program = parse(interner)
+    assert len(interner.table) == 3 and program[0].var is program[4].var
+    assert program[4] is not program[5] and program == parse()
+
+
+def test_compiled_program_runs_many_times():
+    import gossip
+    from stream import Stream, Lexer, Parser
+
+    source = """
+    declare l = [1, 2 * k, 3];
+    deffunct f(x) { functret(x * k + l.head); };
+    declare total = 0;
+    for i in range(1, n) do { assign total = total + callfun f(i); + l[1]; };
+    declare m = l.cons(total);
+    m[0];
+    """
+    for engine in gossip.ENGINES:
+        program = gossip.compile(source, engine=engine)
+        parsed = list(Parser.from_lexer(Lexer.from_stream(Stream.from_string(source))))
+        # f(i) + l[1] for i in 1..n is k * n(n + 1)/2 + n + 2kn.
+        for _ in range(3):
+            assert program.run({"k": 2, "n": 4}) == 2 * 10 + 4 + 16
+            assert program.run({"n": 3, "k": 1}) == 6 + 3 + 6
+        assert list(program.statements) == parsed and len(program.layouts) == 2
+
+    # Bindings are checked like declarations, and converted to the numeric mode.
+    program = gossip.compile("declare y = x / 4; y;", numbers="float")
+    assert program.run({"x": 1}) == 0.25 and type(program.run({"x": 2})) is float
+    with pytest.raises(VariableRedeclarationError):
+        program.run({"y": 1, "x": 1})
+    with pytest.raises(TypeError):
+        program.run({"x": {}})
+    with pytest.raises(ValueError):
+        gossip.compile("1;", engine="bytecode")
+
+
+def test_programs_run_concurrently():
+    import sys
+    from concurrent.futures import ThreadPoolExecutor
+    import gossip
+    from stream import Stream, Lexer, Parser
+    from interpreter import get_evaluator
+    from utils.visualizer import ASTViz
+
+    source = """
+    deffunct f(x) { functret(x * x); };
+    declare total = 0;
+    declare l = [0];
+    for i in range(1, n) do { assign total = total + callfun f(i); + k; assign l = l.cons(i); };
+    total + l.head;
+    """
+    shared = gossip.compile(source, engine="closure")
+    parse = lambda text: list(Parser.from_lexer(Lexer.from_stream(Stream.from_string(text))))
+    viz = ASTViz()
+    viz.treebuilder(parse(source)[3], depth=1)
+    graph = viz.dot.source
+    engines = ["tree", "closure", "stack", "bytecode", "python", "shared"]
+
+    def run(i):
+        n, k = 20 + i % 37, i
+        engine = engines[i % len(engines)]
+        if engine == "shared":
+            result = shared.run({"n": n, "k": k})
+        else:
+            program = parse(f"declare n = {n}; declare k = {k};" + source)
+            if engine == "python":
+                result = run_python(transpile(program))
+            else:
+                evaluate = get_evaluator(RuntimeEnvironment(), engine)
+                for statement in program:
+                    result = evaluate(statement)
+        viz = ASTViz()
+        viz.treebuilder(parse(source)[3], depth=1)
+        return result == n * (n + 1) * (2 * n + 1) // 6 + n * k + n and viz.dot.source == graph
+
+    # Threads switch as often as they can, so that any state they shared would be interleaved.
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(run, range(400)))
+    finally:
+        sys.setswitchinterval(interval)
+    assert all(results) and len(results) == 400
+
+
+def test_parse_cache(tmp_path):
+    import os
+    from utils.parsecache import ParseCache, VERSION
+    from interpreter import compile_gossip
+
+    source_path = str(tmp_path / "program.gos")
+    source = "declare a = 2; assign a = a * 3; print(a);"
+    with open(source_path, "w") as f:
+        f.write(source)
+    cache = ParseCache()
+    cache_dir = tmp_path / "__gossipcache__"
+
+    parsed = list(cache.statements(source, source_path))
+    assert list(cache.statements(source, source_path)) == parsed
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.report() == "parse cache: 1 hit, 1 miss"
+    assert os.listdir(cache_dir) == [f"program.gos.{VERSION}.gosast"]
+
+    # Entries of an edited source, or of other versions of the interpreter, are evicted.
+    (cache_dir / "program.gos.cpython-00-0000000000000000.gosast").write_bytes(b"")
+    (cache_dir / "program.gos.bak.cpython-00-0000000000000000.gosast").write_bytes(b"")
+    edited = source.replace("3", "4")
+    assert list(cache.statements(edited, source_path))[1] == Assign(Variable("a"), BinOp("*", Variable("a"), NumLiteral(4)))
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert sorted(os.listdir(cache_dir)) == ["program.gos.bak.cpython-00-0000000000000000.gosast", f"program.gos.{VERSION}.gosast"]
+
+    # A shared directory keeps the most recently used entries.
+    shared = ParseCache(str(tmp_path / "shared"), max_entries=2)
+    for name in ["one", "two", "three"]:
+        list(shared.statements(source, str(tmp_path / f"{name}.gos")))
+    assert len(os.listdir(tmp_path / "shared")) == 2 and shared.evictions == 1
+
+    cache = ParseCache()
+    compile_gossip(edited, engine="closure", parse_cache=cache, source_path=source_path)
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_stream_from_file(tmp_path):
+    import os
+    from stream import CHUNK_SIZE, Stream, Lexer, Parser
+    from utils.parsecache import ParseCache
+    from interpreter import compile_gossip
+
+    path = tmp_path / "program.gos"
+    path.write_bytes("declare s = 'héllo';\r\nprint(s);\rprint(1.5);\n".encode("utf-8"))
+    with open(path) as f:
+        text = f.read()
+    assert list(Lexer.from_stream(Stream.from_file(str(path)))) == list(Lexer.from_stream(Stream.from_string(text)))
+
+    path.write_bytes(b"")
+    assert list(Lexer.from_stream(Stream.from_file(str(path)))) == []
+
+    # A program of several chunks runs through the parse cache like a string.
+    lines = [f"declare l{'abcdefghij'[i % 10]}{'abcdefghij'[i // 10 % 10]}{'abcdefghij'[i // 100]} = {i};\n" for i in range(1000)]
+    lines *= 1 + CHUNK_SIZE // len("".join(lines))
+    path.write_text("".join(lines[:1000]) + "".join(f"assign {line[8:]}" for line in lines[1000:]))
+    statements = list(ParseCache().statements(Stream.from_file(str(path)), str(path)))
+    assert len(statements) == len(lines)
+    assert statements == list(Parser.from_lexer(Lexer.from_stream(Stream.from_string(path.read_text()))))
+    cache = ParseCache()
+    compile_gossip(Stream.from_file(str(path)), engine="closure", parse_cache=cache, source_path=str(path))
+    assert (cache.hits, cache.misses) == (1, 0)
+
+    # An entry which breaks off is parsed again from where it stops.
+    entry = tmp_path / "__gossipcache__" / os.listdir(tmp_path / "__gossipcache__")[0]
+    entry.write_bytes(entry.read_bytes()[:entry.stat().st_size // 2])
+    cache = ParseCache()
+    assert list(cache.statements(Stream.from_file(str(path)), str(path))) == statements
+    assert (cache.hits, cache.misses, cache.evictions) == (0, 1, 1)
+    assert list(cache.statements(Stream.from_file(str(path)), str(path))) == statements
+    assert cache.hits == 1
+
+
+def test_stream_from_reader(capsys):
+    import io
+    from stream import Stream, Lexer
+    from interpreter import compile_gossip
+
+    class Reader(io.RawIOBase):
+        """
+        Gives a few bytes at a time, splitting characters and line endings,
+        and says when it does.
+        """
+        def __init__(self, data: bytes, size: int):
+            self.data = data
+            self.size = size
+
+        def read1(self, size: int) -> bytes:
+            data, self.data = self.data[:self.size], self.data[self.size:]
+            print("read")
+            return data
+
+    source = "declare s = 'héllo';\r\nprint(s);\rprint(1.5);\nprint(2)".encode("utf-8")
+    expected = list(Lexer.from_stream(Stream.from_string(source.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n"))))
+    for size in [1, 2, 3, 1 << 16]:
+        assert list(Lexer.from_stream(Stream.from_reader(Reader(source, size)))) == expected
+    capsys.readouterr()
+
+    # Each statement runs once its line has been read, before the rest is.
+    for engine in ["tree", "closure", "bytecode"]:
+        compile_gossip(Stream.from_reader(Reader(b"print(1);\nprint(2);\n", 10)), engine=engine)
+        assert capsys.readouterr().out.split() == ["read", "1", "read", "2", "read"]
+
+
+# testing the closure compiler
+
+def eval_tests():
+    return [test_eval, test_bool_eval, test_sequence_eval, test_greater_than, test_for_loop,
+            test_sequence_and_assign, test_while, test_while_initial_cond_false,
+            test_do_while_initial_cond_true, test_do_while_initial_cond_false,
+            test_nested_assignment_scope_loops, test_strings_assignment, test_strings_concat,
+            test_strings_slicing, test_list_assgn_and_variability, test_list_cons, test_list_head,
+            test_list_tail, test_list_isempty, test_list_isempty_true, test_for_func, test_rec_funct,
+            test_scope_resolver_slots, test_numeric_tower, test_lazy_range, test_list_element_type_inference]
+
+
+def test_closure_compiler_matches_eval(monkeypatch):
+    """
+    Runs the tests above again, with every RuntimeEnvironment replaced by
+    one that compiles programs to closures before running them.
+    """
+    monkeypatch.setitem(globals(), "RuntimeEnvironment", CompiledRuntimeEnvironment)
+    for test in eval_tests():
+        test()
+
+
+def test_stack_evaluator_matches_eval(monkeypatch):
+    """
+    Runs the tests above again, with every RuntimeEnvironment replaced by
+    one which evaluates on a StackEvaluator.
+    """
+    monkeypatch.setitem(globals(), "RuntimeEnvironment", StackRuntimeEnvironment)
+    for test in eval_tests():
+        test()
+
+
+def test_stack_evaluator_recursion():
+    import sys
+    from stream import Stream, Lexer, Parser
+
+    source = """
+    deffunct sum(n) { if n == 0 then functret(0); else functret(n + callfun sum(n - 1);); ; };
+    deffunct count(n) { declare i = 0; while i < n do { assign i = i + 1; }; functret(i); };
+    """
+    parse = lambda text: list(Parser.from_lexer(Lexer.from_stream(Stream.from_string(text))))
+    evaluator = StackEvaluator()
+    for statement in parse(source):
+        evaluator.run(statement)
+    # Deeper than Python's recursion limit allows the tree-walker to go.
+    depth = sys.getrecursionlimit() * 2
+    assert evaluator.run(parse(f"callfun sum({depth});")[0]) == depth * (depth + 1) // 2
+    assert evaluator.run(parse("callfun count(5);")[0]) == 5
+    runtime = evaluator.runtime
+    assert runtime.frame is runtime.globals and not evaluator.work and not evaluator.values
+
+    # Expressions nested deeper than that are resolved and evaluated without recursion as well.
+    expression = NumLiteral(1)
+    for _ in range(depth):
+        expression = BinOp("+", expression, NumLiteral(1))
+    assert evaluator.run(ASTSequence([Declare(Variable("deep"), expression), Variable("deep")])) == depth + 1
+
+    # Errors inside + become InvalidConcatenationErrors, and inside negations InvalidProgramErrors, as they do for the tree-walker.
+    with pytest.raises(InvalidConcatenationError):
+        evaluator.run(BinOp("+", NumLiteral(1), BinOp("*", Variable("undefined"), NumLiteral(2))))
+    with pytest.raises(InvalidConcatenationError):
+        evaluator.run(BinOp("+", NumLiteral(1), UnOp("-", StringLiteral("a"))))
+    with pytest.raises(InvalidProgramError):
+        evaluator.run(UnOp("-", Variable("undefined")))
+    assert evaluator.run(BinOp("-", NumLiteral(5), UnOp("-", NumLiteral(2)))) == 7
+
+
+def test_tail_calls():
+    import sys
+    from stream import Stream, Lexer, Parser
+    from utils.resolver import TailCall
+    from utils.scoping import walk
+
+    source = """
+    deffunct loop(n, acc) { if n == 0 then functret(acc); else functret(callfun loop(n - 1, acc + n);); ; };
+    deffunct sum(n) { if n == 0 then functret(0); else functret(n + callfun sum(n - 1);); ; };
+    deffunct scaled(n) { functret(n * factor); };
+    deffunct scale(n) { declare factor = 3; functret(callfun scaled(n);); };
+    """
+    parse = lambda text: list(Parser.from_lexer(Lexer.from_stream(Stream.from_string(text))))
+    statements = parse(source)
+
+    # Only calls whose value is the value of the function are in tail position.
+    resolved = Resolver().resolve(statements[0])
+    assert type(resolved.body.seq[0].e2.ret_val) is TailCall
+    resolved = Resolver().resolve(statements[1])
+    assert type(resolved.body.seq[0].e2.ret_val.right) is funct_call
+
+    # Deeper than Python's recursion limit, on one frame for the whole loop.
+    depth = sys.getrecursionlimit() * 4
+    for runtime in [RuntimeEnvironment(), CompiledRuntimeEnvironment(), StackRuntimeEnvironment()]:
+        for statement in statements:
+            runtime.eval(statement)
+        assert runtime.eval(parse("callfun loop(10, 0);")[0]) == 55
+        allocated = runtime.frames.allocated
+        assert runtime.eval(parse(f"callfun loop({depth}, 0);")[0]) == depth * (depth + 1) // 2
+        assert runtime.frames.allocated == allocated
+        assert runtime.frame is runtime.globals
+        # Other calls in tail position still open a frame, which sees the variables of its caller.
+        assert runtime.eval(parse("callfun scale(5);")[0]) == 15
+
+    vm = VirtualMachine()
+    for statement in statements:
+        vm.run(statement)
+    assert "TAIL_CALL" in vm.module.statements[0].consts[0].disassemble()
+    assert vm.run(parse(f"callfun loop({depth}, 0);")[0]) == depth * (depth + 1) // 2
+    assert vm.run(parse("callfun scale(5);")[0]) == 15
+
+    # A call reading its caller's variable, which it may not have declared
+    # yet, opens a frame even when it calls itself in tail position.
+    source = """
+    deffunct f(n) { if n == 0 then functret(x); else { declare x = n; functret(callfun f(n - 1);); }; };
+    """
+    resolved = Resolver().resolve(parse(source)[0])
+    assert not any(type(node) is TailCall for node in walk(resolved.body))
+    for runtime in [RuntimeEnvironment(), CompiledRuntimeEnvironment(), StackRuntimeEnvironment()]:
+        runtime.eval(parse(source)[0])
+        assert runtime.eval(parse("callfun f(3);")[0]) == 1
+    vm = VirtualMachine()
+    vm.run(parse(source)[0])
+    assert "TAIL_CALL" not in vm.module.statements[0].consts[0].disassemble()
+    assert vm.run(parse("callfun f(3);")[0]) == 1
+
+    # So does one calling other functions, which may read its variables too.
+    source = """
+    deffunct g() { functret(x); };
+    deffunct f(n) { if n == 0 then functret(callfun g();); else { declare x = n; functret(callfun f(n - 1);); }; };
+    """
+    for runtime in [RuntimeEnvironment(), CompiledRuntimeEnvironment(), StackRuntimeEnvironment(), VirtualMachine()]:
+        for statement in parse(source):
+            runtime.eval(statement)
+        assert runtime.eval(parse("callfun f(3);")[0]) == 1
+
+
+def test_memoization(capsys):
+    from stream import Stream, Lexer, Parser
+    from utils.memo import Memo
+    from utils.purity import PurityAnalysis
+
+    source = """
+    deffunct fib(n) { if n < 2 then functret(n); else functret(0 + callfun fib(n - 1); + callfun fib(n - 2);); ; };
+    deffunct check(n) { declare m = 0; declare r = n; while r > 0 do { assign m = m * 10 + r % 10; assign r = (r - r % 10) / 10; }; functret(m); };
+    deffunct even(n) { if n == 0 then functret(True); else functret(callfun odd(n - 1);); ; };
+    deffunct odd(n) { if n == 0 then functret(False); else functret(callfun even(n - 1);); ; };
+    deffunct shout(n) { print(n); functret(n); };
+    deffunct loud(n) { functret(callfun shout(n);); };
+    deffunct scaled(n) { functret(n * factor); };
+    deffunct count(n) { assign calls = calls + 1; functret(n); };
+    """
+    parse = lambda text: list(Parser.from_lexer(Lexer.from_stream(Stream.from_string(text))))
+    functions = {statement.name.name: statement for statement in parse(source)}
+
+    # Pure functions print nothing, and read, assign and call only their own names and pure functions.
+    analysis = PurityAnalysis(functions)
+    assert [name for name, function in functions.items() if analysis.pure(function)] == ["fib", "check", "even", "odd"]
+
+    calls = parse("callfun fib(18); callfun check(1234); callfun even(10); callfun shout(7); callfun shout(7); callfun count(1); callfun count(1); calls;")
+    for runtime in [RuntimeEnvironment, CompiledRuntimeEnvironment, StackRuntimeEnvironment]:
+        plain = runtime()
+        memo = Memo(enabled=True)
+        memoized = runtime(memo=memo)
+        for r in (plain, memoized):
+            r.eval(Declare(Variable("calls"), NumLiteral(0)))
+            for statement in parse(source):
+                r.eval(statement)
+        assert [memoized.eval(call) for call in calls] == [plain.eval(call) for call in calls] == [2584, 4321, True, 7, 7, 1, 1, 2]
+        # Impure functions still print, and assign, every time they are called.
+        assert capsys.readouterr().out.split() == ["7", "7", "7", "7"]
+
+        tables = {table.name: table for table in memo.tables.values() if table is not None}
+        assert sorted(tables) == ["check", "even", "fib", "odd"]
+        assert (tables["fib"].hits, tables["fib"].misses) == (16, 19)
+        assert memo.impure == {"shout", "count"}
+        assert "memo: fib 16 hits, 19 misses (46%), 19 entries" in memo.report()
+        assert memoized.eval(calls[0]) == 2584 and tables["fib"].hits == 17
+        assert memoized.frame is memoized.globals
+
+    # By default nothing is memoized; functions can be memoized by name.
+    runtime = RuntimeEnvironment()
+    for statement in parse(source):
+        runtime.eval(statement)
+    runtime.eval(calls[0])
+    assert not runtime.memo.active and not runtime.memo.tables
+    runtime.memo.enable("check")
+    runtime.eval(calls[0])
+    runtime.eval(calls[1])
+    assert [table.name for table in runtime.memo.tables.values()] == ["check"]
+    runtime.memo.disable("check")
+    assert not runtime.memo.active
+
+    # Tables keep the most recently used arguments, and redefining a function clears them.
+    memo = Memo(enabled=True, max_entries=3)
+    runtime = RuntimeEnvironment(memo=memo)
+    for statement in parse(source):
+        runtime.eval(statement)
+    assert runtime.eval(parse("callfun fib(10);")[0]) == 55
+    (table,) = memo.tables.values()
+    assert len(table.entries) == 3
+    runtime.eval(parse("deffunct fib(n) { functret(n); };")[0])
+    assert not memo.tables and "fib" in memo.ambiguous
+    assert runtime.eval(parse("callfun fib(10);")[0]) == 10
+
+    # A variable declared in one branch only is its caller's when the other runs.
+    source = """
+    deffunct g(n) { if n > 0 then declare x = n; functret(x); };
+    deffunct h(x) { declare r = callfun g(0);; functret(r); };
+    """
+    definitions = {statement.name.name: statement for statement in parse(source)}
+    assert not PurityAnalysis(definitions).pure(definitions["g"])
+    for runtime in [RuntimeEnvironment, CompiledRuntimeEnvironment, StackRuntimeEnvironment]:
+        runtime = runtime(memo=Memo(enabled=True))
+        for statement in parse(source):
+            runtime.eval(statement)
+        assert [runtime.eval(call) for call in parse("callfun h(1); callfun h(2);")] == [1, 2]
+
+
+def test_call_site_caches():
+    from stream import Stream, Lexer, Parser
+
+    source = """
+    deffunct g() { functret(1); };
+    deffunct k() { functret(callfun g();); };
+    deffunct use() { declare t = 0; for i in range(1, 3) do { assign t = t + callfun k();; }; functret(t); };
+    declare a = callfun use();;
+    deffunct k() { functret(2); };
+    declare b = callfun use();;
+    deffunct h() { deffunct k() { functret(3); }; functret(callfun use();); };
+    declare c = callfun h();;
+    declare d = callfun use();;
+    deffunct m() { declare g = 5; functret(callfun k();); };
+    """
+    parse = lambda text: list(Parser.from_lexer(Lexer.from_stream(Stream.from_string(text))))
+    for runtime in [RuntimeEnvironment(), CompiledRuntimeEnvironment(), StackRuntimeEnvironment()]:
+        for statement in parse(source):
+            runtime.eval(statement)
+        # Redefining a function, or shadowing it in a caller, changes what the same call sites call.
+        assert [runtime.eval(Variable(name)) for name in "abcd"] == [3, 6, 9, 6]
+        assert runtime.frame is runtime.globals
+
+    # Global functions no scope shadows are cached, and found again once they are redefined.
+    runtime = RuntimeEnvironment()
+    for statement in parse(source)[:6]:
+        runtime.eval(statement)
+    assert set(runtime.functions) == {"g", "k", "use"}
+    assert runtime.functions["k"][1].body.seq[0].ret_val == NumLiteral(2)
+    with pytest.raises(Exception, match="Not enough arguements"):
+        runtime.eval(parse("callfun k(1);")[0])
+    # Once a scope declares g, calls of it are looked up again, and find the binding shadowing it.
+    definition, call = parse("deffunct n() { declare g = 5; functret(callfun g();); }; callfun n();")
+    runtime.eval(definition)
+    assert "g" in runtime.globals.scope.inner_names
+    with pytest.raises(Exception, match="Function is not defined"):
+        runtime.eval(call)
+
+    # The virtual machine caches them by call site, under the same conditions.
+    vm = VirtualMachine()
+    for statement in parse(source):
+        vm.run(statement)
+    assert [vm.run(Variable(name)) for name in "abcd"] == [3, 6, 9, 6]
+    use = vm.module.statements[2].consts[0]
+    assert [function.code.name for _, function in use.functions.values()] == ["k"]
+    vm = VirtualMachine()
+    for statement in parse(source)[:6]:
+        vm.run(statement)
+    vm.run(definition)
+    assert "g" in vm.module.inner_names
+    with pytest.raises(Exception, match="Function is not defined"):
+        vm.run(call)
+
+
+def test_inlining():
+    from stream import Stream, Lexer, Parser
+    from utils.inliner import Inliner
+
+    source = """
+    declare x = 7;
+    declare y = 2;
+    deffunct minus(x, y) { functret(x - y); };
+    deffunct local() { declare z = 5; functret(z); };
+    deffunct reader() { functret(x + 1); };
+    deffunct outer(x) { functret(callfun reader();); };
+    deffunct fib(n) { if n < 2 then functret(n); else functret(0 + callfun fib(n - 1); + callfun fib(n - 2);); ; };
+    deffunct count(n) { if n == 0 then functret(x); else functret(callfun count(n - 1);); ; };
+    deffunct uses(x) { functret(callfun count(2);); };
+    deffunct calls(n) { functret(callfun fib(n);); };
+    deffunct twice(a) { functret(a + a); };
+    deffunct twice(a) { functret(a * 2); };
+    deffunct big(a) { functret(a + a + a + a + a + a + a + a + a + a + a + a + a + a + a + a + a + a); };
+    deffunct loops(n) { declare t = 0; for i in range(1, n) do { assign t = t + callfun minus(i, 1);; }; functret(t); };
+    declare a = callfun minus(y, x);;
+    declare b = callfun outer(1);;
+    declare c = callfun local();;
+    declare d = callfun uses(10);;
+    declare e = callfun twice(3);;
+    declare f = callfun big(1);;
+    declare g = callfun loops(5);;
+    declare h = callfun calls(10);;
+    declare i = callfun minus(10, 4);;
+    """
+    parse = lambda text: list(Parser.from_lexer(Lexer.from_stream(Stream.from_string(text))))
+    inliner = Inliner()
+    inlined = inliner.inline(parse(source))
+    assert set(inliner.inlined) == {"minus", "local", "reader", "outer", "loops", "calls"}
+    assert inliner.inlined["minus"] == {"top level": 2, "loops": 1}
+    assert inliner.not_inlined == {
+        "count": "is recursive",
+        "fib": "is recursive",
+        "uses": "calls count, which may read its parameters",
+        "twice": "has a name declared more than once",
+        "big": "has 37 nodes, over the limit of 32",
+    }
+    assert "inline: minus inlined at 3 calls, in loops, top level" in inliner.report()
+    # Parameters are renamed, so the arguments still read the variables of the caller.
+    assert inlined[-9].value.var == Variable("minus_x_2") and inlined[-9].value.e2.e1 == Variable("x")
+    # Literal arguments replace their parameters, and the functret around the value goes.
+    assert (inlined[-1].value.left, inlined[-1].value.right) == (NumLiteral(10), NumLiteral(4))
+
+    for runtime in [RuntimeEnvironment(), CompiledRuntimeEnvironment(), StackRuntimeEnvironment()]:
+        for statement in inlined:
+            runtime.eval(statement)
+        assert [runtime.eval(Variable(name)) for name in "abcdefghi"] == [-5, 2, 5, 10, 6, 18, 10, 55, 6]
+        assert runtime.frame is runtime.globals
+    # A call run before the function is defined is left to fail.
+    early = parse("callfun f(); deffunct f() { functret(1); };")
+    assert Inliner().inline(early) == early
+    # Slicing needs a variable, so a literal string is bound to the parameter rather than replacing it.
+    statements = parse("deffunct first(s) { functret(s[0, 2]); }; callfun first('abc');")
+    inliner = Inliner()
+    statements = inliner.inline(statements)
+    assert inliner.inlined == {"first": {"top level": 1}}
+    for runtime in [RuntimeEnvironment(), CompiledRuntimeEnvironment(), StackRuntimeEnvironment(), VirtualMachine()]:
+        assert [runtime.eval(statement) for statement in statements][-1] == "ab"
+
+
+def test_no_cache_skips_bytecode(tmp_path):
+    import os
+    import subprocess
+    import sys
+
+    path = tmp_path / "program.gos"
+    path.write_text("print(1);\n")
+    main = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    run = lambda *flags: subprocess.run([sys.executable, main, "-f", str(path), "-e", "bytecode", *flags], capture_output=True, text=True)
+    assert run("--no-cache").stdout == "1\n"
+    assert not os.path.exists(str(path) + "c")
+    assert run().stdout == "1\n"
+    assert os.path.exists(str(path) + "c")
+
+
+def test_inlined_bytecode_cache(tmp_path, capsys):
+    import os
+    from interpreter import compile_gossip
+    from stream import Stream
+    from utils.inliner import Inliner
+
+    source = "deffunct f() { functret(1); };\nprint(callfun f(););\n"
+    cache = str(tmp_path / "program.gosc")
+    # The module saved without inlining is not the one an inlined run compiles.
+    compile_gossip(Stream.from_string(source), engine="bytecode", cache=cache, inliner=Inliner())
+    assert not os.path.exists(cache)
+    compile_gossip(Stream.from_string(source), engine="bytecode", cache=cache)
+    saved = open(cache, "rb").read()
+    inliner = Inliner()
+    compile_gossip(Stream.from_string(source), engine="bytecode", cache=cache, inliner=inliner)
+    assert inliner.inlined == {"f": {"top level": 1}}
+    assert open(cache, "rb").read() == saved
+    assert capsys.readouterr().out.split() == ["1", "1", "1"]
+
+
+def test_closure_compiler_reruns():
+    r = RuntimeEnvironment()
+    compiler = ClosureCompiler(r)
+    i = Variable("i")
+    x = Variable("x")
+    loop = ForLoop(i, Range(NumLiteral(1), NumLiteral(10)), Assign(x, BinOp("+", x, i)))
+    program = compiler.compile(ASTSequence([Declare(x, NumLiteral(0)), loop, x]))
+
+    assert program() == 55
+    r.globals.clear()
+    assert program() == 55
+    assert r.eval(x) == 55
+
+
+def test_failed_negation_raises():
+    negation = UnOp("-", StringLiteral("a"))
+    for runtime in [RuntimeEnvironment(), CompiledRuntimeEnvironment(), StackRuntimeEnvironment(), VirtualMachine()]:
+        with pytest.raises(InvalidProgramError):
+            runtime.eval(negation)
+
+
+# testing the bytecode vm
+
+def test_bytecode_vm_matches_eval(monkeypatch):
+    monkeypatch.setitem(globals(), "RuntimeEnvironment", VirtualMachine)
+    for test in eval_tests():
+        test()
+
+
+def test_bytecode_superinstructions_and_serialization():
+    i = Variable("i")
+    s = Variable("s")
+    program = [
+        Declare(s, NumLiteral(0)),
+        Declare(i, NumLiteral(0)),
+        While(BinOp("<", i, NumLiteral(10)), ASTSequence([Assign(s, BinOp("+", s, i)), Assign(i, BinOp("+", i, NumLiteral(1)))])),
+        s,
+    ]
+    module = BytecodeCompiler().compile_module(program)
+    listing = module.statements[2].disassemble()
+    assert "COMPARE_FAST_CONST_JUMP" in listing
+    assert "ASSIGN_FAST_CONST" in listing
+    assert "BINARY_FAST_FAST" in listing
+
+    source = "declare s = 0; ..."
+    data = bytecode.dumps(module, source)
+    assert bytecode.loads(data, "some other source") is None
+
+    vm = VirtualMachine()
+    vm.load_module(bytecode.loads(data, source))
+    results = [vm.execute(statement) for statement in vm.module.statements]
+    assert results[-1] == 45
+    assert vm.run(BinOp("*", s, NumLiteral(2))) == 90
+
+def test_transpiled_program_matches_eval(capsys):
+    i = Variable("i")
+    s = Variable("s")
+    n = Variable("n")
+    l = Variable("l")
+    total = Variable("total")
+    program = [
+        funct_def(Variable("triangle"), [n], ASTSequence([
+            Declare(total, NumLiteral(0)),
+            ForLoop(i, Range(NumLiteral(1), NumLiteral(4)), Assign(total, BinOp("+", total, BinOp("*", n, i)))),
+            funct_ret(total),
+        ])),
+        Declare(s, NumLiteral(0)),
+        Declare(i, NumLiteral(0)),
+        While(BinOp("<", i, NumLiteral(10)), ASTSequence([
+            Let(s, NumLiteral(100), Print(s)),
+            Assign(s, BinOp("+", s, funct_call(Variable("triangle"), [i]))),
+            Assign(i, BinOp("+", i, NumLiteral(1))),
+        ])),
+        Declare(l, ListObject([NumLiteral(1), NumLiteral(2)], Fraction)),
+        ListCons(s, l),
+        If(BinOp("==", ListOp("head", l), s), BinOp("/", s, NumLiteral(4)), None),
+    ]
+
+    expected = [RuntimeEnvironment().eval(ASTSequence(program))]
+    expected_output = capsys.readouterr().out
+
+    source = transpile(program)
+    assert "while (i < 10):" in source
+    assert "def triangle(n):" in source
+    assert "s_1 = 100" in source
+    assert run_python(source) == expected[0] == Fraction(225, 2)
+    assert capsys.readouterr().out == expected_output
+
+def test_transpiled_program_errors():
+    from interpreter import get_evaluator
+
+    # Programs are transpiled whole, so there is nothing to run statement by statement.
+    with pytest.raises(ValueError, match="only runs files"):
+        get_evaluator(RuntimeEnvironment(), "python")
+
+    x = Variable("x")
+    source = transpile([Declare(x, NumLiteral(1)), Assign(x, funct_call(Variable("f"), []))])
+    assert "raise BadAssignment" in source
+
+    source = transpile([
+        funct_def(Variable("f"), [], StringLiteral("one")),
+        Declare(x, NumLiteral(1)),
+        Assign(x, funct_call(Variable("f"), [])),
+    ])
+    with pytest.raises(BadAssignment):
+        run_python(source)
+
+    # f reads the loop variable of its caller, which Python's lexical scoping cannot see.
+    with pytest.raises(TranspileError):
+        transpile([
+            funct_def(Variable("f"), [], Variable("i")),
+            ForLoop(Variable("i"), Range(NumLiteral(1), NumLiteral(2)), funct_call(Variable("f"), [])),
+        ])
+
+    from stream import Stream, Lexer, Parser
+    parse = lambda text: list(Parser.from_lexer(Lexer.from_stream(Stream.from_string(text))))
+    # g reads the x f declares, not the top-level one, and f reads its caller's x when n is 0.
+    for text in [
+        "declare x = 1; deffunct g(a){ functret(x + a); }; deffunct f(a){ declare x = 100; functret(callfun g(a);); }; print(callfun f(1););",
+        "deffunct f(n){ if n == 0 then functret(x); else { declare x = n; functret(callfun f(n-1);); }; }; print(callfun f(3););",
+    ]:
+        with pytest.raises(TranspileError):
+            transpile(parse(text))
+    # Reading a variable before declaring it is a DeclarationError, as on the other engines.
+    with pytest.raises(DeclarationError, match="y"):
+        run_python(transpile(parse("print(y); declare y = 1;")))
+
 # main
 if __name__ == "__main__":
     test_eval()
@@ -707,6 +1752,27 @@ if __name__ == "__main__":
     test_list_isempty_true()
     test_for_func()
     test_rec_funct()
+    test_scope_resolver_slots()
+    test_frame_pool_reuses_frames()
+    test_numeric_tower()
+    test_numeric_modes()
+    test_lazy_range()
+    test_lexer_tokens()
+    test_fixed_tokens_are_shared()
+    test_operator_precedence()
+    test_list_element_type_inference()
+    test_ast_nodes_are_frozen()
+    test_flat_ast()
+    test_compiled_program_runs_many_times()
+    test_programs_run_concurrently()
+    test_stack_evaluator_recursion()
+    test_tail_calls()
+    test_call_site_caches()
+    test_inlining()
+    test_closure_compiler_reruns()
+    test_failed_negation_raises()
+    test_bytecode_superinstructions_and_serialization()
+    test_transpiled_program_errors()
 
     # ERROR TESTS
 
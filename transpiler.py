@@ -0,0 +1,717 @@
+import keyword
+from fractions import Fraction
+from utils.datatypes import AST, NumLiteral, BinOp, Variable, Value, Let, If, BoolLiteral, UnOp, ASTSequence, Assign, ForLoop, Range, Print, Declare, While, DoWhile, StringLiteral, ListObject, StringSlice, ListCons, ListOp, funct_call, funct_def, funct_ret, ListIndex
+from utils.numbers import gossip_type
+from utils.scoping import declared_names, undeclared_reads
+
+from utils.errors import DeclarationError, InvalidProgramError, InvalidConditionError, VariableRedeclarationError, InvalidConcatenationError, IndexOutOfBoundsError, InvalidOperation, InvalidArgumentToList, ListError, BadAssignment, TranspileError
+
+
+ARITHMETIC = {"+", "-", "*", "/", "%"}
+COMPARISONS = {"==", "!=", "<", ">", "<=", ">="}
+LOGICAL = {"&&": "and", "||": "or"}
+
+# Names the generated module uses itself, which Gossip variables must not shadow.
+RESERVED = {"Fraction", "print", "type", "int", "len", "range", "main", "bool", "str", "list", "divide", "gossip_type", "inclusive_range"}
+
+STATEMENTS = (ASTSequence, Declare, Assign, Let, If, While, DoWhile, ForLoop, Print, funct_def, ListCons)
+
+ELEMENT_TYPES = {Fraction: "Fraction", str: "str", bool: "bool", list: "list"}
+
+
+class Binding:
+    """
+    A Gossip variable, and the Python variable it was lowered to.
+    """
+    __slots__ = ("name", "type", "element_type")
+
+    def __init__(self, name, type=None, element_type=None):
+        self.name = name
+        self.type = type
+        self.element_type = element_type
+
+
+class Transpiler():
+    """
+    Lowers the AST of a Gossip program into a readable Python module.
+    While and For become Python loops, deffunct becomes def, and variables
+    become Python locals, renamed where an inner scope shadows an outer one.
+    Numbers follow the numeric tower of utils.numbers, and assignments keep
+    their type checks, unless the types of both sides are known statically.
+
+    Gossip scoping is dynamic, Python scoping is lexical. Functions are
+    therefore only lowered when every free name they use is a top-level
+    variable or function, which the two agree on; anything else raises a
+    TranspileError, and the program should run on another engine.
+    """
+    def __init__(self, feedback=False):
+        self.feedback = feedback
+
+    def transpile(self, program: list, source_name: str = "<gossip>") -> str:
+        """
+        Returns the source of a Python module running the program.
+        """
+        program = list(program)
+        self.lines = []
+        self.indent = 1
+        self.constants = {}
+        self.temporaries = 0
+        self.functions = {}
+        self.scopes = [{}]
+        self.global_names = set()
+        self.function_globals = set()
+
+        self.analyse(program)
+        self.global_names = {self.python_name(name) for name in self.shared}
+
+        # main() returns the value of the last statement, like the other engines.
+        for position, statement in enumerate(program):
+            last = position == len(program) - 1
+            if self.feedback:
+                value = self.temporary()
+                self.emit_value(statement, value)
+                self.line(f"print({value})")
+                if last:
+                    self.line(f"return {value}")
+            else:
+                self.emit_value(statement, "return" if last else None)
+
+        header = [
+            f'"""',
+            f"Transpiled from {source_name} by gossip. Run it from the gossip directory,",
+            f"or import it and call main().",
+            f'"""',
+            "from fractions import Fraction",
+            "from utils.numbers import divide, gossip_type, inclusive_range",
+            "from transpiler import both_and, both_or, check_list, cons, list_head, list_index, list_is_empty, list_tail, string_slice",
+            "from utils.errors import BadAssignment, InvalidConditionError, VariableRedeclarationError",
+            "",
+        ]
+        for value, name in self.constants.items():
+            header.append(f"{name} = Fraction({value.numerator}, {value.denominator})")
+        header += ["", "", "def main():"]
+        if self.global_names:
+            header.append(f"    global {', '.join(sorted(self.global_names))}")
+        body = self.lines or ["    pass"]
+        footer = ["", "", 'if __name__ == "__main__":', "    main()", ""]
+        return "\n".join(header + body + footer)
+
+    # Analysis of functions and the names they share with the top level.
+
+    def analyse(self, program: list):
+        """
+        Finds the top-level functions, and checks that their free names are
+        top-level names, so that lexical scoping gives the dynamic result.
+        """
+        top_level, nested = set(), set()
+        for statement in program:
+            self.collect_declarations(statement, top_level, nested, top=True)
+
+        functions = [node for statement in program for node in self.walk(statement) if isinstance(node, funct_def)]
+        # A function sees the variables of the functions calling it, as well as those of nested scopes.
+        local = set().union(*map(declared_names, functions))
+        self.shared = set()
+        for node in functions:
+            own = declared_names(node)
+            for name in undeclared_reads(node):
+                if name in own:
+                    raise TranspileError(f"function '{node.name.name}' may read '{name}' before declaring it, and then reads its caller's, which is only visible through dynamic scoping.")
+                if name in nested or name in local or name not in top_level:
+                    raise TranspileError(f"function '{node.name.name}' uses '{name}', which is only visible through dynamic scoping.")
+                self.shared.add(name)
+            self.shared.add(node.name.name)
+
+    def collect_declarations(self, node, top_level: set, nested: set, top: bool):
+        """
+        Sorts the names declared by a program into those declared at its top
+        level, and those declared inside a nested scope.
+        """
+        match node:
+            case Declare(Variable(name), value):
+                (top_level if top else nested).add(name)
+                self.collect_declarations(value, top_level, nested, top)
+            case funct_def(Variable(name), _, body):
+                if not top:
+                    raise TranspileError(f"function '{name}' must be defined at the top level.")
+                top_level.add(name)
+            case Let(Variable(name), e1, e2):
+                nested.add(name)
+                self.collect_declarations(e1, top_level, nested, top)
+                self.collect_declarations(e2, top_level, nested, False)
+            case ForLoop(Variable(name), sequence, stat):
+                nested.add(name)
+                self.collect_declarations(sequence, top_level, nested, top)
+                self.collect_declarations(stat, top_level, nested, False)
+            case While(cond, seq) | DoWhile(seq, cond):
+                self.collect_declarations(cond, top_level, nested, top)
+                self.collect_declarations(seq, top_level, nested, False)
+            case _:
+                for child in self.children(node):
+                    self.collect_declarations(child, top_level, nested, top)
+
+    def children(self, node) -> list:
+        match node:
+            case ASTSequence(seq):
+                return list(seq)
+            case ListObject(elements, _):
+                return list(elements)
+            case funct_call(name, arg_val):
+                return [name] + list(arg_val)
+            case funct_def(name, var_list, body):
+                return [name, body]
+            case BinOp(_, left, right):
+                return [left, right]
+            case UnOp(_, right):
+                return [right]
+            case If(cond, e1, e2):
+                return [cond, e1] + ([e2] if e2 is not None else [])
+            case Let(var, e1, e2):
+                return [var, e1, e2]
+            case Declare(var, value):
+                return [var, value]
+            case Assign(var, expression):
+                return [var, expression]
+            case ForLoop(var, val_list, stat):
+                return [var, val_list, stat]
+            case While(cond, seq) | DoWhile(seq, cond):
+                return [cond, seq]
+            case Print(value) | funct_ret(value):
+                return [value]
+            case Range(start, end, step):
+                return [start, end] + ([step] if step is not None else [])
+            case StringSlice(var, start, end):
+                return [var, start, end]
+            case ListCons(to_add, base_list):
+                return [to_add, base_list]
+            case ListOp(_, base_list):
+                return [base_list]
+            case ListIndex(index, base_list):
+                return [index, base_list]
+        return []
+
+    def walk(self, node):
+        yield node
+        for child in self.children(node):
+            yield from self.walk(child)
+
+    # Helpers for emitting code.
+
+    def line(self, text: str):
+        self.lines.append("    " * self.indent + text)
+
+    def temporary(self) -> str:
+        self.temporaries += 1
+        return f"_t{self.temporaries}"
+
+    def constant(self, value) -> str:
+        """
+        Whole numbers are Python int literals; other Fractions are hoisted
+        to module constants, so they are only built once.
+        """
+        if type(value) is int:
+            return repr(value)
+        if value.denominator == 1:
+            return repr(value.numerator)
+        if value not in self.constants:
+            self.constants[value] = f"_n{value.numerator}_{value.denominator}".replace("-", "m")
+        return self.constants[value]
+
+    def python_name(self, name: str) -> str:
+        if keyword.iskeyword(name) or name in RESERVED:
+            return name + "_"
+        return name
+
+    def lookup(self, name: str) -> Binding:
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+        return None
+
+    def declare(self, name: str, type=None, element_type=None) -> Binding:
+        """
+        Binds name in the innermost scope, to a Python name no visible variable uses.
+        """
+        live = {binding.name for scope in self.scopes for binding in scope.values()}
+        base = self.python_name(name)
+        python_name, suffix = base, 0
+        while python_name in live and (name not in self.scopes[-1] or self.scopes[-1][name].name != python_name):
+            suffix += 1
+            python_name = f"{base}_{suffix}"
+        binding = Binding(python_name, type, element_type)
+        self.scopes[-1][name] = binding
+        return binding
+
+    def infer(self, node):
+        """
+        Returns the Python type the value of node is known to have, or None.
+        """
+        match node:
+            case NumLiteral(_):
+                return Fraction
+            case BoolLiteral(_):
+                return bool
+            case StringLiteral(_) | StringSlice(_, _, _):
+                return str
+            case ListObject(_, _) | ListCons(_, _) | ListOp("tail", _):
+                return list
+            case ListOp("is-empty?", _):
+                return bool
+            case Variable(name):
+                binding = self.lookup(name)
+                return binding.type if binding is not None else None
+            case BinOp(op, left, right) if op in COMPARISONS:
+                return bool
+            case BinOp(op, left, right) if op in ARITHMETIC:
+                left, right = self.infer(left), self.infer(right)
+                if left is Fraction and right is Fraction:
+                    return Fraction
+                if op == "+" and left is str and right is str:
+                    return str
+            case BinOp(op, left, right) if op in LOGICAL:
+                if self.infer(left) is bool and self.infer(right) is bool:
+                    return bool
+            case UnOp("-", right):
+                return Fraction if self.infer(right) is Fraction else None
+            case funct_ret(value):
+                return self.infer(value)
+        return None
+
+    def element_type(self, node: ListObject):
+        """
+        The element type of a list literal, inferring it from the bindings
+        of the variables in its first element if the parser could not.
+        """
+        if node.element_type is None and node.elements:
+            return self.infer(node.elements[0])
+        return node.element_type
+
+    def pure(self, node) -> bool:
+        """
+        Whether evaluating node has no effects, so it may be skipped by short-circuiting.
+        """
+        for child in self.walk(node):
+            if isinstance(child, (funct_call, Print, Assign, Declare, ListCons, funct_def, While, DoWhile, ForLoop, Let)):
+                return False
+        return True
+
+    def sink(self, target, expression: str):
+        """
+        Sends the value of a node to its target: a variable, a return, or nowhere.
+        """
+        if target is None:
+            if not expression.isidentifier():
+                self.line(expression)
+        elif target == "return":
+            self.line(f"return {expression}")
+        else:
+            self.line(f"{target} = {expression}")
+
+    # Expressions.
+
+    def expression(self, node: AST) -> str:
+        """
+        Lowers node to a Python expression, emitting any statements it needs first.
+        """
+        match node:
+            case NumLiteral(value):
+                return self.constant(value)
+
+            case BoolLiteral(value):
+                return repr(value)
+
+            case StringLiteral(value):
+                return repr(value)
+
+            case Variable(name):
+                binding = self.lookup(name)
+                return binding.name if binding is not None else self.python_name(name)
+
+            case BinOp(op, left, right) if op in LOGICAL:
+                l = self.expression(left)
+                r = self.expression(right)
+                if self.pure(right):
+                    return f"({l} {LOGICAL[op]} {r})"
+                return f"both_{LOGICAL[op]}({l}, {r})"
+
+            case BinOp("/", left, right):
+                return f"divide({self.expression(left)}, {self.expression(right)})"
+
+            case BinOp(op, left, right) if op in ARITHMETIC or op in COMPARISONS:
+                return f"({self.expression(left)} {op} {self.expression(right)})"
+
+            case UnOp("-", right):
+                return f"(0 - {self.expression(right)})"
+
+            case funct_call(Variable(name), arg_val):
+                args = ", ".join(self.expression(arg) for arg in arg_val)
+                return f"{self.python_name(name)}({args})"
+
+            case funct_ret(value):
+                return self.expression(value)
+
+            case StringSlice(var, start, end):
+                return f"string_slice({self.expression(var)}, {self.expression(start)}, {self.expression(end)})"
+
+            case ListObject(elements, _):
+                element_type = self.element_type(node)
+                values = ", ".join(self.expression(element) for element in elements)
+                if element_type is not None and all(self.infer(element) is element_type for element in elements):
+                    return f"[{values}]"
+                return f"check_list([{values}], {type_name(element_type)})"
+
+            case ListOp("head", base_list):
+                return f"list_head({self.expression(base_list)})"
+
+            case ListOp("tail", base_list):
+                return f"list_tail({self.expression(base_list)})"
+
+            case ListOp("is-empty?", base_list):
+                return f"list_is_empty({self.expression(base_list)})"
+
+            case ListIndex(index, base_list):
+                return f"list_index({self.expression(base_list)}, {self.expression(index)})"
+
+            case Range(start, end, step):
+                start, end = self.expression(start), self.expression(end)
+                step = self.expression(step) if step is not None else "1"
+                return f"inclusive_range({start}, {end}, {step})"
+
+        if not isinstance(node, STATEMENTS):
+            raise TranspileError(f"cannot transpile {node}.")
+
+        # Statements are lowered first, and their value read from a temporary.
+        value = self.temporary()
+        self.emit_value(node, value)
+        return value
+
+    def condition(self, node: AST, strict: bool) -> str:
+        """
+        Lowers a condition. Strict conditions, as used by If, test `== True`,
+        which only differs from truthiness for values that are not bools.
+        """
+        expression = self.expression(node)
+        if strict and self.infer(node) is not bool:
+            return f"{expression} == True"
+        return expression
+
+    # Statements.
+
+    def emit_value(self, node: AST, target):
+        """
+        Lowers node to Python statements, sending its value to target.
+        """
+        match node:
+            case ASTSequence(seq):
+                for statement in seq[:-1]:
+                    self.emit_value(statement, None)
+                self.emit_value(seq[-1], target)
+
+            case Declare(Variable(name), value):
+                value_type = self.infer(value)
+                element_type = None
+                if isinstance(value, ListObject):
+                    element_type = self.element_type(value)
+                elif isinstance(value, Variable) and self.lookup(value.name) is not None:
+                    element_type = self.lookup(value.name).element_type
+                expression = self.expression(value)
+                if name in self.scopes[-1]:
+                    self.line(f"raise VariableRedeclarationError({name!r})")
+                binding = self.declare(name, value_type, element_type)
+                self.line(f"{binding.name} = {expression}")
+                self.sink(target, binding.name)
+
+            case Assign(Variable(name), expression):
+                value_type = self.infer(expression)
+                binding = self.lookup(name)
+                expression = self.expression(expression)
+                python_name = binding.name if binding is not None else self.python_name(name)
+                if binding is not None and binding.type is not None and binding.type is value_type:
+                    self.line(f"{python_name} = {expression}")
+                else:
+                    value = self.temporary()
+                    self.line(f"{value} = {expression}")
+                    self.line(f"if gossip_type({value}) is not gossip_type({python_name}):")
+                    self.line(f"    raise BadAssignment({name!r}, gossip_type({python_name}), gossip_type({value}))")
+                    self.line(f"{python_name} = {value}")
+                self.sink(target, python_name)
+
+            case Let(Variable(name), e1, e2):
+                value_type = self.infer(e1)
+                expression = self.expression(e1)
+                self.scopes.append({})
+                binding = self.declare(name, value_type)
+                self.line(f"{binding.name} = {expression}")
+                self.emit_value(e2, target)
+                self.scopes.pop()
+
+            case If(cond, e1, e2):
+                self.line(f"if {self.condition(cond, strict=True)}:")
+                self.block(e1, target)
+                if e2 is not None:
+                    self.line("else:")
+                    self.block(e2, target)
+                elif target is not None:
+                    self.line("else:")
+                    self.indent += 1
+                    self.sink(target, "None")
+                    self.indent -= 1
+
+            case While(cond, sequence):
+                result = self.temporary() if target == "return" else target
+                if result is not None:
+                    self.line(f"{result} = None")
+                start = len(self.lines)
+                truth_value = self.expression(cond)
+                if self.infer(cond) is bool and len(self.lines) == start:
+                    self.line(f"while {truth_value}:")
+                    self.block(sequence, result, scope=True)
+                else:
+                    # The first test must be a bool; later ones see the scope of the iteration.
+                    truth_value = self.check_condition(truth_value, cond)
+                    self.line(f"while {truth_value}:")
+                    self.indent += 1
+                    self.scopes.append({})
+                    self.emit_value(sequence, result)
+                    self.line(f"{truth_value} = {self.expression(cond)}")
+                    self.scopes.pop()
+                    self.indent -= 1
+                if target == "return":
+                    self.line(f"return {result}")
+
+            case DoWhile(sequence, cond):
+                result = self.temporary() if target is None or target == "return" else target
+                self.line(f"{result} = None")
+                self.line("while True:")
+                self.indent += 1
+                self.scopes.append({})
+                self.emit_value(sequence, result)
+                self.scopes.pop()
+                truth_value = self.check_condition(self.expression(cond), cond)
+                self.line(f"if not {truth_value}:")
+                self.line("    break")
+                self.indent -= 1
+                if target == "return":
+                    self.line(f"return {result}")
+
+            case ForLoop(Variable(name), sequence, stat):
+                result = self.temporary() if target == "return" else target
+                if result is not None:
+                    self.line(f"{result} = None")
+                match sequence:
+                    case Range(start, end, None):
+                        start, end = self.expression(start), self.expression(end)
+                        self.scopes.append({})
+                        binding = self.declare(name, Fraction)
+                        self.line(f"for {binding.name} in range(int({start}), int({end}) + 1):")
+                    case Range(start, end, step):
+                        values = self.expression(sequence)
+                        self.scopes.append({})
+                        binding = self.declare(name, Fraction)
+                        self.line(f"for {binding.name} in {values}:")
+                    case ASTSequence(seq):
+                        values = ", ".join(self.expression(expression) for expression in seq)
+                        types = {self.infer(expression) for expression in seq}
+                        self.scopes.append({})
+                        binding = self.declare(name, types.pop() if len(types) == 1 else None)
+                        self.line(f"for {binding.name} in ({values},):")
+                    case _:
+                        values = self.expression(sequence)
+                        self.scopes.append({})
+                        binding = self.declare(name)
+                        self.line(f"for {binding.name} in {values}:")
+                self.block(stat, result)
+                self.scopes.pop()
+                if target == "return":
+                    self.line(f"return {result}")
+
+            case Print(ASTSequence(expression_list)):
+                for expression in expression_list[:-1]:
+                    self.line(f"print({expression.value!r})")
+                self.line(f"print({expression_list[-1].value!r}, end='')")
+                self.sink(target, repr(expression_list[-1].value))
+
+            case Print(expression):
+                value = self.expression(expression)
+                if target is not None and not value.isidentifier():
+                    temporary = self.temporary()
+                    self.line(f"{temporary} = {value}")
+                    value = temporary
+                self.line(f"print({value})")
+                self.sink(target, value)
+
+            case funct_def(Variable(name), arg_list, body):
+                self.function(name, arg_list, body)
+                self.sink(target, self.constant(0))
+
+            case ListCons(to_add, base_list):
+                value = self.expression(to_add)
+                if isinstance(base_list, Variable):
+                    binding = self.lookup(base_list.name)
+                    if binding is None or binding.element_type is None:
+                        raise TranspileError(f"the element type of '{base_list.name}' is not known statically.")
+                    element_type = type_name(binding.element_type)
+                    self.line(f"{binding.name} = cons({value}, {binding.name}, {element_type})")
+                    self.sink(target, binding.name)
+                elif isinstance(base_list, ListObject):
+                    element_type = type_name(self.element_type(base_list))
+                    self.sink(target, f"cons({value}, {self.expression(base_list)}, {element_type})")
+                else:
+                    raise TranspileError("the argument to cons() is not a list.")
+
+            case _:
+                self.sink(target, self.expression(node))
+
+    def block(self, node: AST, target, scope=False):
+        """
+        Lowers node to an indented block, in a new scope if it is a loop body.
+        """
+        self.indent += 1
+        if scope:
+            self.scopes.append({})
+        start = len(self.lines)
+        self.emit_value(node, target)
+        if len(self.lines) == start:
+            self.line("pass")
+        if scope:
+            self.scopes.pop()
+        self.indent -= 1
+
+    def check_condition(self, expression: str, cond: AST) -> str:
+        """
+        Stores a loop condition in a temporary, raising if it is not a bool.
+        """
+        truth_value = self.temporary()
+        self.line(f"{truth_value} = {expression}")
+        self.line(f"if type({truth_value}) is not bool:")
+        self.line(f"    raise InvalidConditionError({truth_value})")
+        return truth_value
+
+    def function(self, name: str, params: list, body: AST):
+        """
+        Lowers a function definition to a def, returning the value of its body.
+        """
+        saved_scopes = self.scopes
+        self.scopes = [saved_scopes[0], {}]
+        python_name = self.python_name(name)
+        self.scopes[0][name] = Binding(python_name, str)
+        parameters = [self.declare(param.name).name for param in params]
+        self.line(f"def {python_name}({', '.join(parameters)}):")
+        self.indent += 1
+        local, nested = {param.name for param in params}, set()
+        self.collect_declarations(body, local, nested, top=True)
+        assigned = set()
+        for node in self.walk(body):
+            if isinstance(node, Assign):
+                name = node.var.name
+            elif isinstance(node, ListCons) and isinstance(node.base_list, Variable):
+                name = node.base_list.name
+            else:
+                continue
+            if name in self.shared and name not in local | nested:
+                assigned.add(self.python_name(name))
+        if assigned:
+            self.line(f"global {', '.join(sorted(assigned))}")
+        self.emit_value(body, "return")
+        self.indent -= 1
+        self.scopes = saved_scopes
+
+
+def transpile(program: list, source_name: str = "<gossip>", feedback=False) -> str:
+    """
+    Returns the source of a Python module running the program.
+    """
+    return Transpiler(feedback).transpile(program, source_name)
+
+
+def run_python(source: str, filename: str = "<gossip>") -> Value:
+    """
+    Compiles transpiled source with CPython and runs it in-process.
+    """
+    namespace = {"__name__": "__gossip__"}
+    exec(compile(source, filename, "exec"), namespace)
+    try:
+        return namespace["main"]()
+    except UnboundLocalError as e:
+        # A local read before it was assigned, which CPython names in the message only.
+        raise DeclarationError(str(e).split("'")[1]) from e
+    except NameError as e:
+        raise DeclarationError(e.name) from e
+
+
+"""
+Helpers used by the generated modules, for the operations with no single
+Python equivalent.
+"""
+
+
+def both_and(left, right):
+    return left and right
+
+
+def both_or(left, right):
+    return left or right
+
+
+def type_name(element_type) -> str:
+    """
+    The name of an element type in the transpiled module. None, for a list
+    whose type is not known statically, leaves it to the first element.
+    """
+    if element_type is None:
+        return "None"
+    return ELEMENT_TYPES.get(element_type, element_type.__name__)
+
+
+def check_list(values: list, element_type) -> list:
+    if element_type is None and values:
+        element_type = gossip_type(values[0])
+    for value in values:
+        if gossip_type(value) is not element_type:
+            raise InvalidArgumentToList(element_type)
+    return values
+
+
+def cons(value, values: list, element_type) -> list:
+    if element_type is None and values:
+        element_type = gossip_type(values[0])
+    if gossip_type(value) is not element_type:
+        raise ListError("Input element is not of the same type as given list type.")
+    new_list = [value]
+    new_list.extend(values)
+    return new_list
+
+
+def list_head(values: list):
+    if type(values) is not list:
+        raise ListError("Argument to Head() is not a list.")
+    if len(values) == 0:
+        raise ListError("No head in an empty list")
+    return values[0]
+
+
+def list_tail(values: list) -> list:
+    if type(values) is not list:
+        raise ListError("Argument to IsEmpty() is not a list.")
+    if len(values) == 0:
+        raise ListError("No tail in an empty list")
+    return values[1:]
+
+
+def list_is_empty(values: list) -> bool:
+    if type(values) is not list:
+        raise ListError("Argument to IsEmpty() is not a list.")
+    return len(values) == 0
+
+
+def list_index(values: list, index):
+    index = int(index)
+    if(index<0 or index>=len(values)):
+        raise ListError("Index out of range.")
+    return values[index]
+
+
+def string_slice(string: str, start, end) -> str:
+    start, end = int(start), int(end)
+    if(start<0 or end>len(string)):
+        raise IndexOutOfBoundsError("Slice Index out of range")
+    return string[start:end]
@@ -1,16 +1,17 @@
 from dataclasses import dataclass
 from fractions import Fraction
 from typing import Union, Mapping, Optional, List
+from utils.numbers import exact
 
 # Supported variable types
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class NumType:
     pass
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class BoolType:
     pass
 
@@ -18,182 +19,215 @@ class BoolType:
 SimType = NumType | BoolType
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class StringType:
     pass
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ListType:
     pass
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Funct_obj:
     pass 
 
 """
 The following are used in the evaluation step.
+
+Nodes are frozen dataclasses with slots: they have no __dict__, and passes
+build new nodes rather than modify the ones they are given. The type of a
+literal is shared by its class. A node is hashed by value, like a tuple of
+its fields with lists as tuples, and the hash is computed once, on first use;
+it is not pickled, as the hashes of strings differ between processes.
 """
 
 
-@dataclass
-class NumLiteral:
-    value: Fraction
+class Node:
+    __slots__ = ("_hash",)
+
+    def __hash__(self):
+        try:
+            return self._hash
+        except AttributeError:
+            pass
+        values = [type(self)]
+        for field in self.__match_args__:
+            value = getattr(self, field)
+            values.append(tuple(value) if type(value) is list else value)
+        h = hash(tuple(values))
+        object.__setattr__(self, "_hash", h)
+        return h
+
+
+def ast_node(cls):
+    """
+    Makes a subclass of Node an AST node class.
+    """
+    cls = dataclass(frozen=True, slots=True)(cls)
+    cls.__hash__ = Node.__hash__
+    return cls
+
+
+@ast_node
+class NumLiteral(Node):
+    value: int | Fraction
     type = NumType()
 
     def __init__(self, *args):
-        self.value = Fraction(*args)
+        object.__setattr__(self, "value", exact(*args))
 
 
-@dataclass
-class BoolLiteral:
+@ast_node
+class BoolLiteral(Node):
     value: bool
     type = BoolType()
 
 
-@dataclass
-class StringLiteral:
+@ast_node
+class StringLiteral(Node):
     value: str
-    type: Optional[StringType] = StringType()
+    type = StringType()
 
 
-@dataclass
-class ListObject:
+@ast_node
+class ListObject(Node):
     elements: list()
     element_type: int | float | str | list | bool
-    type: Optional[ListType] = ListType()
+    type = ListType()
 
 
-@dataclass
-class ListCons:
+@ast_node
+class ListCons(Node):
     to_add: "AST"
     base_list: "AST"
     # If I have an empty
 
 
-@dataclass
-class ListOp:
+@ast_node
+class ListOp(Node):
     op: str
     base_list: "AST"
     index : Optional[SimType] = None
 
 
-@dataclass
-class ListIndex:
+@ast_node
+class ListIndex(Node):
     index: 'AST'
     base_list: 'AST'
 
 
-@dataclass
-class BinOp:
+@ast_node
+class BinOp(Node):
     operator: str
     left: "AST"
     right: "AST"
     type: Optional[SimType] = None
 
 
-@dataclass
-class UnOp:
+@ast_node
+class UnOp(Node):
     operator: str
     right: "AST"
     type = NumType()
 
 
-@dataclass
-class Variable:
+@ast_node
+class Variable(Node):
     name: str
     type: Optional[NumType | BoolType | StringType | ListType] = None
 
 
-@dataclass
-class StringSlice:
+@ast_node
+class StringSlice(Node):
     var: Variable
     start: 'AST'
     end: 'AST'
 
 
-@dataclass
-class Let:
+@ast_node
+class Let(Node):
     var: "AST"
     e1: "AST"
     e2: "AST" = None
 
 
-@dataclass
-class Assign:
+@ast_node
+class Assign(Node):
     var: Variable
     e1: "AST"
 
 
-@dataclass
-class If:
+@ast_node
+class If(Node):
     cond: "AST"
     e1: "AST"
     e2: "AST"
     type: Optional[SimType] = None
 
 
-@dataclass
-class Range:
+@ast_node
+class Range(Node):
     start: "AST"
     end: "AST"
+    step: Optional["AST"] = None
     type: Optional[SimType] = None
 
 
-@dataclass
-class ASTSequence:
+@ast_node
+class ASTSequence(Node):
     seq: list["AST"] | list
     type: Optional[SimType] = None
     length = lambda self: len(self.seq)
 
 
-@dataclass
-class ForLoop:
+@ast_node
+class ForLoop(Node):
     var: "AST"
     val_list: "AST"
     stat: "AST"
 
 
-@dataclass
-class Print:
+@ast_node
+class Print(Node):
     value: "AST"
 
 
-@dataclass
-class Declare:
+@ast_node
+class Declare(Node):
     var: "AST"
     value: "AST"
 
 
-@dataclass
-class Assign:
+@ast_node
+class Assign(Node):
     var: "AST"
     expression: "AST"
 
 
-@dataclass
-class While:
+@ast_node
+class While(Node):
     cond: "AST"
     seq: "AST"
 
 
-@dataclass
-class DoWhile:
+@ast_node
+class DoWhile(Node):
     seq: "AST"
     cond: "AST"
 
-@dataclass
-class funct_def:
+@ast_node
+class funct_def(Node):
     name: str
     var_list : list['AST']
     body : 'AST'
 
-@dataclass
-class funct_ret:
+@ast_node
+class funct_ret(Node):
     ret_val: 'AST'
 
-@dataclass
-class funct_call:
+@ast_node
+class funct_call(Node):
     name: 'AST'
     arg_val: list['AST']
 
@@ -222,26 +256,57 @@ AST = (
 )
 
 
-Value = Fraction | bool | str | list
+Value = int | Fraction | bool | str | list
 
 
 """
 The following are used in the lexer.
+
+Keywords, operators, symbols and booleans stand for a fixed piece of text,
+and there is exactly one token for each: constructing one again returns the
+same object. The parser compares them by identity, and lexing or parsing a
+program allocates no tokens for them. The other tokens carry values, and are
+frozen dataclasses, so that every token can be hashed.
 """
 
 
-@dataclass
+class FixedToken:
+    __slots__ = ()
+    __match_args__: tuple[str]
+
+    def __init_subclass__(cls):
+        cls.instances = {}
+
+    def __new__(cls, value):
+        token = cls.instances.get(value)
+        if token is None:
+            token = cls.instances[value] = object.__new__(cls)
+            object.__setattr__(token, cls.__match_args__[0], value)
+        return token
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} tokens are shared, and cannot be modified.")
+
+    def __reduce__(self):
+        return type(self), (getattr(self, self.__match_args__[0]),)
+
+    def __repr__(self):
+        field = self.__match_args__[0]
+        return f"{type(self).__name__}({field}={getattr(self, field)!r})"
+
+
+@dataclass(frozen=True, slots=True)
 class Num:
-    n: int | float
+    n: int | Fraction
     floating: bool = False
 
 
-@dataclass
-class Bool:
+class Bool(FixedToken):
+    __slots__ = __match_args__ = ("b",)
     b: bool
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class StringToken:
     s: str
 
@@ -251,23 +316,23 @@ class ListToken:
     l: list
 
 
-@dataclass
-class Keyword:
+class Keyword(FixedToken):
+    __slots__ = __match_args__ = ("word",)
     word: str
 
 
-@dataclass
-class Whitespace:
+class Whitespace(FixedToken):
+    __slots__ = __match_args__ = ("word",)
     word: str
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Identifier:
     word: str
 
 
-@dataclass
-class Operator:
+class Operator(FixedToken):
+    __slots__ = __match_args__ = ("op",)
     op: str
 
 
@@ -276,8 +341,8 @@ class Buffer:
     buf: str
 
 
-@dataclass
-class Symbols:
+class Symbols(FixedToken):
+    __slots__ = __match_args__ = ("symbol",)
     symbol: str
 
 @dataclass
@@ -165,4 +165,12 @@ class InvalidFileExtensionError(Exception):
     Raised when the file extension is not valid.
     """
     def __init__(self, ext):
-        print(f"InvalidFileExtension: {ext} is not a valid file extension for gossip language.")
\ No newline at end of file
+        print(f"InvalidFileExtension: {ext} is not a valid file extension for gossip language.")
+
+class TranspileError(Exception):
+    """
+    Raised when a program cannot be lowered to Python with the same semantics.
+    """
+    def __init__(self, message):
+        self.message = message
+        print(f"{RED}TranspileError{RESET}: {message}")
@@ -0,0 +1,285 @@
+"""
+A flat store for the ASTs of huge, typically machine-generated, programs.
+Instead of an object per node, a FlatAST keeps its nodes in columns of
+arrays, a struct of arrays:
+
+    kinds      the kind of each node, an index into KINDS,
+    starts     where the fields of each node start in fields,
+    fields     the fields of every node, in the order of __match_args__,
+    items      the elements of list fields, each list prefixed by its length,
+
+and the payloads of literals and names, once each, in constants. A field is
+a tagged index: the index of a child node, of a list in items or of a
+constant, shifted left past a two bit tag, or just the tag for None.
+
+A Cursor points at a node of a FlatAST, and reads its fields like the node
+would, giving cursors for child nodes. node() converts a cursor back into
+the dataclass nodes of its subtree, and FlatAST.from_nodes converts them
+into a FlatAST; nodes shared within a statement stay shared either way.
+"""
+from array import array
+from typing import Iterable, Iterator
+
+from utils.datatypes import (
+    Node,
+    AST,
+    NumLiteral,
+    BoolLiteral,
+    StringLiteral,
+    ListObject,
+    ListCons,
+    ListOp,
+    ListIndex,
+    BinOp,
+    UnOp,
+    Variable,
+    StringSlice,
+    Let,
+    Assign,
+    If,
+    Range,
+    ASTSequence,
+    ForLoop,
+    Print,
+    Declare,
+    While,
+    DoWhile,
+    funct_def,
+    funct_ret,
+    funct_call,
+)
+
+KINDS = [
+    NumLiteral, BoolLiteral, StringLiteral, ListObject, ListCons, ListOp, ListIndex,
+    BinOp, UnOp, Variable, StringSlice, Let, Assign, If, Range, ASTSequence,
+    ForLoop, Print, Declare, While, DoWhile, funct_def, funct_ret, funct_call,
+]
+KIND_INDEX = {kind: i for i, kind in enumerate(KINDS)}
+# The position of each field of each kind among the fields of its nodes.
+FIELD_POSITIONS = [{name: i for i, name in enumerate(kind.__match_args__)} for kind in KINDS]
+BLANK_FIELDS = [array("I", [0]) * len(kind.__match_args__) for kind in KINDS]
+
+NODE, CONSTANT, LIST, NONE = range(4)
+
+
+class FlatAST:
+    """
+    The top-level statements of a program, stored flat. Iterating over it
+    gives a Cursor for each statement.
+    """
+
+    def __init__(self):
+        self.kinds = array("B")
+        self.starts = array("I")
+        self.fields = array("I")
+        self.items = array("I")
+        self.constants = []
+        self.constant_index = {}
+        self.statements = array("I")
+
+    def from_nodes(program: Iterable[AST]):
+        """
+        Stores the statements of a program, such as those a Parser generates,
+        one at a time, so the nodes of only one are needed at once.
+        """
+        tree = FlatAST()
+        for statement in program:
+            tree.append(statement)
+        return tree
+
+    def append(self, statement: AST) -> "Cursor":
+        """
+        Stores a top-level statement after the others.
+        """
+        index = self.add(statement)
+        self.statements.append(index)
+        return self.cursor(index)
+
+    def add(self, root: AST) -> int:
+        """
+        Stores the nodes of an AST, and returns the index of its root. Nodes
+        are stored parent first, from a stack rather than by recursion, so
+        that deeply nested expressions store like any other.
+        """
+        seen = {}
+        index = self.allocate(root, seen)
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            start = self.starts[seen[id(node)][0]]
+            for i, name in enumerate(node.__match_args__):
+                self.fields[start + i] = self.encode(getattr(node, name), seen, stack)
+        return index
+
+    def allocate(self, node: AST, seen: dict) -> int:
+        index = len(self.kinds)
+        # The node is kept with its index, so that its id is not reused while storing.
+        seen[id(node)] = (index, node)
+        kind = KIND_INDEX[type(node)]
+        self.kinds.append(kind)
+        self.starts.append(len(self.fields))
+        self.fields.extend(BLANK_FIELDS[kind])
+        return index
+
+    def encode(self, value, seen: dict, stack: list) -> int:
+        if isinstance(value, Node):
+            if id(value) in seen:
+                return seen[id(value)][0] << 2 | NODE
+            stack.append(value)
+            return self.allocate(value, seen) << 2 | NODE
+        if value is None:
+            return NONE
+        if type(value) is list:
+            encoded = [self.encode(element, seen, stack) for element in value]
+            position = len(self.items)
+            self.items.append(len(encoded))
+            self.items.extend(encoded)
+            return position << 2 | LIST
+        return self.constant(value) << 2 | CONSTANT
+
+    def constant(self, value) -> int:
+        # 1, True and 1.0 are equal, but are different constants, so each type has an index of its own.
+        indices = self.constant_index.get(type(value))
+        if indices is None:
+            indices = self.constant_index[type(value)] = {}
+        index = indices.get(value)
+        if index is None:
+            index = indices[value] = len(self.constants)
+            self.constants.append(value)
+        return index
+
+    def decode(self, value: int):
+        """
+        The value of a field: a Cursor for a node, a list, a constant or None.
+        """
+        tag = value & 3
+        if tag == NODE:
+            return self.cursor(value >> 2)
+        if tag == CONSTANT:
+            return self.constants[value >> 2]
+        if tag == LIST:
+            position = value >> 2
+            return [self.decode(element) for element in self.items[position + 1:position + 1 + self.items[position]]]
+        return None
+
+    def children(self, index: int) -> Iterator[int]:
+        """
+        The indices of the nodes the fields of a node hold, directly or in lists.
+        """
+        start = self.starts[index]
+        for value in self.fields[start:start + len(FIELD_POSITIONS[self.kinds[index]])]:
+            tag = value & 3
+            if tag == NODE:
+                yield value >> 2
+            elif tag == LIST:
+                position = value >> 2
+                for element in self.items[position + 1:position + 1 + self.items[position]]:
+                    if element & 3 == NODE:
+                        yield element >> 2
+
+    def node(self, index: int) -> AST:
+        """
+        Builds the dataclass nodes of the subtree at index, children first,
+        from a stack rather than by recursion.
+        """
+        built = {}
+        stack = [index]
+        while stack:
+            top = stack[-1]
+            if top in built:
+                stack.pop()
+                continue
+            pending = [child for child in self.children(top) if child not in built]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            start = self.starts[top]
+            kind = KINDS[self.kinds[top]]
+            values = [self.rebuild(value, built) for value in self.fields[start:start + len(kind.__match_args__)]]
+            built[top] = kind(*values)
+        return built[index]
+
+    def rebuild(self, value: int, built: dict):
+        tag = value & 3
+        if tag == NODE:
+            return built[value >> 2]
+        if tag == LIST:
+            position = value >> 2
+            return [self.rebuild(element, built) for element in self.items[position + 1:position + 1 + self.items[position]]]
+        return self.decode(value)
+
+    def nodes(self) -> Iterator[AST]:
+        """
+        Generates the statements as dataclass nodes, one at a time.
+        """
+        for index in self.statements:
+            yield self.node(index)
+
+    def cursor(self, index: int) -> "Cursor":
+        return CURSORS[self.kinds[index]](self, index)
+
+    def __iter__(self) -> Iterator["Cursor"]:
+        for index in self.statements:
+            yield self.cursor(index)
+
+    def __len__(self) -> int:
+        return len(self.statements)
+
+    def nbytes(self) -> int:
+        """
+        The size of the columns, leaving out the constants they share.
+        """
+        columns = (self.kinds, self.starts, self.fields, self.items, self.statements)
+        return sum(column.itemsize * len(column) for column in columns)
+
+
+class Cursor:
+    """
+    A node of a FlatAST. Each kind of node has a subclass of Cursor, whose
+    fields read like those of the node, as a Cursor for a child node, a list
+    of them, a constant or None, and which has the same __match_args__ and
+    type. kind is the class of the node, and node() builds it.
+    """
+    __slots__ = ("tree", "index")
+    kind = None
+
+    def __init__(self, tree: FlatAST, index: int):
+        self.tree = tree
+        self.index = index
+
+    def fields(self) -> Iterator[tuple[str, object]]:
+        for name in self.__match_args__:
+            yield name, getattr(self, name)
+
+    def node(self) -> AST:
+        return self.tree.node(self.index)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Cursor) and self.tree is other.tree and self.index == other.index
+
+    def __hash__(self) -> int:
+        return hash((id(self.tree), self.index))
+
+    def __repr__(self) -> str:
+        return f"Cursor({self.kind.__name__}, {self.index})"
+
+
+def field(position: int) -> property:
+    def get(cursor: Cursor):
+        tree = cursor.tree
+        value = tree.fields[tree.starts[cursor.index] + position]
+        if value & 3 == NODE:
+            return tree.cursor(value >> 2)
+        return tree.decode(value)
+    return property(get)
+
+
+CURSORS = []
+for kind in KINDS:
+    attributes = {"__slots__": (), "kind": kind, "__match_args__": kind.__match_args__}
+    if hasattr(kind, "type") and "type" not in kind.__match_args__:
+        attributes["type"] = kind.type
+    for position, name in enumerate(kind.__match_args__):
+        attributes[name] = field(position)
+    CURSORS.append(type(f"{kind.__name__}Cursor", (Cursor,), attributes))
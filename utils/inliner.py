@@ -0,0 +1,313 @@
+"""
+Inlining of small Gossip functions. An Inliner copies the body of a small,
+non-recursive top-level function into the places it is called from, so that
+running the call costs as little as a let rather than finding the function,
+checking its arguments and opening a frame for it.
+
+A call is replaced by lets binding the arguments to the parameters, in the
+order they are evaluated, around the body. Scoping is dynamic, so the lets
+would hide the variables of the caller which have the names of parameters,
+from the arguments evaluated after them and from the body; the parameters
+are renamed to names the program does not use. The body keeps the variables
+it declares, as the innermost let opens a scope of its own, like the frame
+of the call did. A literal argument replaces its parameter instead, when
+the body does not assign it.
+
+Renaming a parameter is only safe when nothing but the body reads it. Since
+a called function reads the variables of its caller which it does not
+declare, a function is only inlined when every function it calls is known,
+and reads none of its parameters. Calls are resolved by name at runtime too,
+so only a function defined once, at the top level, with a name nothing else
+declares, is inlined, and only where its definition has run before.
+"""
+from collections import Counter
+from typing import Iterable, Iterator
+
+from utils.datatypes import AST, BinOp, Variable, Let, If, UnOp, ASTSequence, Assign, ForLoop, Range, Print, Declare, While, DoWhile, ListObject, StringSlice, ListCons, ListOp, NumLiteral, funct_call, funct_def, funct_ret, ListIndex, BoolLiteral, StringLiteral
+from utils.scoping import walk, undeclared_reads
+
+
+def rebuild(node: AST, visit) -> AST:
+    """
+    Returns node with visit applied to each of its subexpressions, the body
+    and parameters of a function definition included.
+    """
+    match node:
+        case Variable(_):
+            return node
+        case Declare(var, value):
+            return Declare(visit(var), visit(value))
+        case Assign(var, expression):
+            return Assign(visit(var), visit(expression))
+        case Let(var, e1, e2):
+            return Let(visit(var), visit(e1), visit(e2))
+        case ForLoop(var, val_list, stat):
+            return ForLoop(visit(var), visit(val_list), visit(stat))
+        case While(cond, seq):
+            return While(visit(cond), visit(seq))
+        case DoWhile(seq, cond):
+            return DoWhile(visit(seq), visit(cond))
+        case funct_def(name, var_list, body):
+            return funct_def(visit(name), [visit(param) for param in var_list], visit(body))
+        case funct_call(name, arg_val):
+            return funct_call(visit(name), [visit(arg) for arg in arg_val])
+        case If(cond, e1, e2):
+            return If(visit(cond), visit(e1), visit(e2) if e2 is not None else None, node.type)
+        case ASTSequence(seq):
+            return ASTSequence([visit(ast) for ast in seq], node.type)
+        case BinOp(op, left, right):
+            return BinOp(op, visit(left), visit(right), node.type)
+        case UnOp(op, right):
+            return UnOp(op, visit(right))
+        case Print(value):
+            return Print(visit(value))
+        case funct_ret(value):
+            return funct_ret(visit(value))
+        case Range(start, end, step):
+            return Range(visit(start), visit(end), visit(step) if step is not None else None, node.type)
+        case StringSlice(var, start, end):
+            return StringSlice(visit(var), visit(start), visit(end))
+        case ListObject(elements, element_type):
+            return ListObject([visit(element) for element in elements], element_type)
+        case ListCons(to_add, base_list):
+            return ListCons(visit(to_add), visit(base_list))
+        case ListOp(op, base_list):
+            return ListOp(op, visit(base_list), node.index)
+        case ListIndex(index, base_list):
+            return ListIndex(visit(index), visit(base_list))
+    return node
+
+
+def every_node(node: AST) -> Iterator[AST]:
+    """
+    Every node of a program, those of the functions it defines included.
+    """
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        rebuild(node, lambda child: stack.append(child) or child)
+
+
+def substitute(node: AST, values: dict) -> AST:
+    """
+    Returns node with the variables named in values replaced by their values.
+    """
+    if type(node) is Variable:
+        return values.get(node.name, node)
+    return rebuild(node, lambda child: substitute(child, values))
+
+
+def result(node: AST) -> AST:
+    """
+    Returns node without the functret and the sequence of one element its
+    value is wrapped in, which are its value already, as functret does not
+    return early.
+    """
+    match node:
+        case funct_ret(value):
+            return result(value)
+        case ASTSequence([only]):
+            return result(only)
+        case ASTSequence(seq) if seq:
+            return ASTSequence([*seq[:-1], result(seq[-1])], node.type)
+        case If(cond, e1, e2):
+            return If(cond, result(e1), result(e2) if e2 is not None else None, node.type)
+    return node
+
+
+class Inliner:
+    """
+    Inlines the calls of the functions of a program whose bodies have at
+    most max_size nodes. inlined counts the calls inlined, by function and
+    by the function they were made from; not_inlined gives the reason each
+    function called which was not inlined was not.
+    """
+    def __init__(self, max_size: int = 32):
+        self.max_size = max_size
+        self.inlined = {}
+        self.not_inlined = {}
+
+    def inline(self, statements: Iterable[AST]) -> list:
+        """
+        Returns the statements of a program with the calls of small functions
+        inlined. The whole program is read first, as a function may be
+        defined again by a later statement.
+        """
+        statements = list(statements)
+        self.names = set()
+        declarations = Counter()
+        for statement in statements:
+            for node in every_node(statement):
+                match node:
+                    case Variable(name):
+                        self.names.add(name)
+                    case funct_def(Variable(name), var_list, _):
+                        declarations[name] += 1
+                        declarations.update(param.name for param in var_list)
+                    case Declare(Variable(name), _) | Let(Variable(name), _, _) | ForLoop(Variable(name), _, _):
+                        declarations[name] += 1
+        defined = [statement for statement in statements if type(statement) is funct_def]
+        self.functions = {function.name.name: function for function in defined if declarations[function.name.name] == 1}
+        self.shadowed = {function.name.name for function in defined} - self.functions.keys()
+        self.definitions = {}
+        self.candidates = {}
+        self.caller = "top level"
+
+        inlined = []
+        for statement in statements:
+            statement = self.visit(statement)
+            if type(statement) is funct_def and statement.name.name in self.functions:
+                self.definitions[statement.name.name] = statement
+            inlined.append(statement)
+        return inlined
+
+    def visit(self, program: AST) -> AST:
+        match program:
+            case funct_def(Variable(name), _, _):
+                outer, self.caller = self.caller, name
+                program = rebuild(program, self.visit)
+                self.caller = outer
+                return program
+
+            case funct_call(Variable(name), arg_val):
+                program = rebuild(program, self.visit)
+                function = self.candidate(name)
+                if function is None or len(function.var_list) != len(arg_val):
+                    return program
+                callers = self.inlined.setdefault(name, Counter())
+                callers[self.caller] += 1
+                return self.expand(function, program.arg_val)
+
+        return rebuild(program, self.visit)
+
+    def expand(self, function: funct_def, arg_val: list) -> AST:
+        """
+        The lets which stand for a call of function with arg_val. A literal
+        argument of a parameter the body never assigns or calls, nor slices,
+        conses onto or indexes, where the engines expect a variable, replaces
+        the parameter instead, and needs no let.
+        """
+        name = function.name.name
+        changed = set()
+        for node in walk(function.body):
+            match node:
+                case Assign(Variable(var), _) | funct_call(Variable(var), _):
+                    changed.add(var)
+                case StringSlice(Variable(var), _, _) | ListCons(_, Variable(var)) | ListOp(_, Variable(var)) | ListIndex(_, Variable(var)):
+                    changed.add(var)
+        values, bindings = {}, []
+        for param, arg in zip(function.var_list, arg_val):
+            if type(arg) in (NumLiteral, BoolLiteral, StringLiteral) and param.name not in changed:
+                values[param.name] = arg
+            else:
+                var = values[param.name] = Variable(self.fresh(f"{name}_{param.name}"))
+                bindings.append((var, arg))
+        body = result(substitute(function.body, values))
+        if not bindings:
+            if not any(type(node) is Declare for node in walk(function.body)):
+                return body
+            # The variables of the body still need a scope of their own.
+            bindings.append((Variable(self.fresh(f"{name}_scope")), NumLiteral(0)))
+        for var, arg in reversed(bindings):
+            body = Let(var, arg, body)
+        return body
+
+    def fresh(self, base: str) -> str:
+        n = 1
+        while f"{base}_{n}" in self.names:
+            n += 1
+        self.names.add(f"{base}_{n}")
+        return f"{base}_{n}"
+
+    def candidate(self, name: str) -> funct_def:
+        """
+        Returns the definition of the function name if its calls are
+        inlined at this point of the program, or None.
+        """
+        function = self.definitions.get(name)
+        if function is None:
+            if name in self.shadowed:
+                self.not_inlined[name] = "has a name declared more than once"
+            return None
+        try:
+            return self.candidates[name]
+        except KeyError:
+            pass
+        reason = self.objection(name, function)
+        if reason is not None:
+            self.not_inlined[name] = reason
+            function = None
+        self.candidates[name] = function
+        return function
+
+    def objection(self, name: str, function: funct_def) -> str:
+        """
+        Why function may not be inlined, or None if it may.
+        """
+        if self.reaches(name, name):
+            return "is recursive"
+        nodes = list(walk(function.body))
+        if len(nodes) > self.max_size:
+            return f"has {len(nodes)} nodes, over the limit of {self.max_size}"
+        params = {param.name for param in function.var_list}
+        for node in nodes:
+            match node:
+                case funct_def(_, _, _):
+                    return "defines functions"
+                case Declare(Variable(var), _) | Let(Variable(var), _, _) | ForLoop(Variable(var), _, _) if var in params:
+                    return f"declares its parameter {var}"
+                case funct_call(Variable(callee), _):
+                    free = self.free_names(callee)
+                    if free is None or free & params:
+                        return f"calls {callee}, which may read its parameters"
+        return None
+
+    def reaches(self, name: str, target: str, seen: set = None) -> bool:
+        """
+        Whether a call of name may call target.
+        """
+        seen = set() if seen is None else seen
+        seen.add(name)
+        function = self.functions.get(name)
+        if function is None:
+            return False
+        for node in walk(function.body):
+            match node:
+                case funct_call(Variable(callee), _):
+                    if callee == target:
+                        return True
+                    if callee not in seen and self.reaches(callee, target, seen):
+                        return True
+        return False
+
+    def free_names(self, name: str, calling: tuple = ()) -> set:
+        """
+        The variables of its caller a call of name may read or assign, or None
+        if any may be. A recursive call adds nothing the outer one does not.
+        """
+        function = self.functions.get(name)
+        if function is None:
+            return None
+        if name in calling:
+            return set()
+        names = undeclared_reads(function, calls=False)
+        params = {param.name for param in function.var_list}
+        for node in walk(function.body):
+            match node:
+                case funct_call(Variable(callee), _):
+                    free = self.free_names(callee, calling + (name,))
+                    if free is None:
+                        return None
+                    # Only the parameters are surely declared wherever the call is made.
+                    names |= free - params
+        return names
+
+    def report(self) -> str:
+        lines = []
+        for name, callers in self.inlined.items():
+            calls = sum(callers.values())
+            lines.append(f"inline: {name} inlined at {calls} call{'s' if calls != 1 else ''}, in {', '.join(callers)}")
+        for name, reason in self.not_inlined.items():
+            lines.append(f"inline: {name} {reason}, and was not inlined")
+        return "\n".join(lines) or "inline: no calls inlined"
@@ -0,0 +1,47 @@
+"""
+Hash-consing for ASTs. An Interner replaces every node it is given by the
+first structurally equal node it has seen, so that a subexpression repeated
+throughout a program, such as | x % p == 0 |, is one node object however
+often it appears, and whatever is worked out for that node, such as its type
+or the code compiled for it, is worked out once.
+
+Nodes are frozen and hashed by value, so an equal node can stand for
+another anywhere. The Parser interns every node it builds when it is given
+an Interner; since it builds children before their parents, the children of
+a node are interned by the time it is, and equal subtrees are the same
+object all the way down.
+"""
+from utils.datatypes import AST
+
+
+class Interner:
+    """
+    Interns nodes into a table of distinct ones. nodes counts the nodes
+    interned, and shared those replaced by an equal node of the table.
+    Once the table holds max_entries nodes, new ones are no longer added,
+    so that interning a program of mostly distinct subtrees takes bounded
+    memory; those already in the table are still shared.
+    """
+
+    def __init__(self, max_entries: int = 1 << 20):
+        self.table = {}
+        self.max_entries = max_entries
+        self.nodes = 0
+        self.shared = 0
+
+    def intern(self, node: AST) -> AST:
+        """
+        Returns the node of the table equal to node, adding node if there is
+        none. The children of node should have been interned first.
+        """
+        self.nodes += 1
+        shared = self.table.get(node)
+        if shared is not None:
+            self.shared += 1
+            return shared
+        if len(self.table) < self.max_entries:
+            self.table[node] = node
+        return node
+
+    def report(self) -> str:
+        return f"interner: {self.nodes} subtrees, {self.shared} shared, {len(self.table)} distinct"
@@ -0,0 +1,154 @@
+"""
+Memoization of pure Gossip functions. A Memo keeps, for each pure function
+it is asked to, a table of the values it returned for the arguments it was
+called with, so that calling it again with the same arguments, as a naive
+recursive Fibonacci does all the time, looks its value up instead of
+evaluating the body again.
+
+Which functions are pure is decided by a PurityAnalysis over the functions
+the program defined so far, which the runtime reports to the Memo as their
+definitions run.
+"""
+from collections import OrderedDict
+from typing import Iterable
+
+from utils.datatypes import Value, funct_def
+from utils.purity import PurityAnalysis
+
+
+# The value of a lookup of arguments a table does not hold.
+MISSING = object()
+
+
+def memo_key(args: list) -> tuple:
+    """
+    The key of a list of argument values. Values are keyed along with their
+    type, since True == 1 and a list is not hashable.
+    """
+    return tuple(freeze(value) for value in args)
+
+
+def freeze(value: Value) -> tuple:
+    if type(value) is list:
+        return (list, tuple(freeze(element) for element in value))
+    return (type(value), value)
+
+
+class MemoTable:
+    """
+    The values a function returned, keyed by its arguments, of which the
+    max_entries most recently used are kept. hits and misses count lookups.
+    """
+    __slots__ = ("name", "entries", "max_entries", "hits", "misses")
+
+    def __init__(self, name: str, max_entries: int):
+        self.name = name
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple):
+        value = self.entries.get(key, MISSING)
+        if value is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key: tuple, value: Value):
+        self.entries[key] = value
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+class Memo:
+    """
+    The memo tables of a runtime. Functions are memoized when they are pure
+    and memoization is enabled for them: for every function if enabled, or
+    for those named in names. active tells whether any function may be, so
+    that calls need not ask otherwise.
+
+    define records each function definition which runs. A name defined as
+    two different functions, whether redefined or defined again in another
+    function, may call either, so it is dropped from the definitions the
+    purity analysis is given, and every table is cleared.
+    """
+    def __init__(self, enabled: bool = False, names: Iterable[str] = (), max_entries: int = 1 << 16):
+        self.enabled = enabled
+        self.names = set(names)
+        self.active = enabled or bool(self.names)
+        self.max_entries = max_entries
+        self.definitions = {}
+        self.ambiguous = set()
+        self.analysis = PurityAnalysis(self.definitions)
+        self.tables = {}
+        self.impure = set()
+
+    def enable(self, *names: str):
+        """
+        Enables memoization of the pure functions named, or of every pure function.
+        """
+        if names:
+            self.names.update(names)
+        else:
+            self.enabled = True
+        self.active = True
+
+    def disable(self, *names: str):
+        """
+        Disables memoization of the functions named, or of every function
+        not enabled by name. Their tables are kept, unused.
+        """
+        if names:
+            self.names.difference_update(names)
+        else:
+            self.enabled = False
+        self.active = self.enabled or bool(self.names)
+
+    def define(self, name: str, function: funct_def):
+        defined = self.definitions.get(name)
+        if defined is function or name in self.ambiguous:
+            return
+        if defined is None:
+            self.definitions[name] = function
+            # Functions calling the name were impure until now, and may no longer be.
+            self.analysis.forget()
+            self.tables = {f: table for f, table in self.tables.items() if table is not None}
+            self.impure.clear()
+        elif defined != function:
+            del self.definitions[name]
+            self.ambiguous.add(name)
+            self.analysis.forget()
+            self.tables.clear()
+            self.impure.clear()
+
+    def table(self, name: str, function: funct_def) -> MemoTable:
+        """
+        Returns the table of function, called by name, or None if it is not
+        memoized.
+        """
+        if not self.enabled and name not in self.names:
+            return None
+        try:
+            return self.tables[function]
+        except KeyError:
+            pass
+        if self.analysis.pure(function):
+            table = self.tables[function] = MemoTable(name, self.max_entries)
+            return table
+        self.tables[function] = None
+        self.impure.add(name)
+        return None
+
+    def report(self) -> str:
+        lines = []
+        for table in self.tables.values():
+            if table is not None:
+                lookups = table.hits + table.misses
+                rate = f"{table.hits / lookups:.0%}" if lookups else "-"
+                lines.append(f"memo: {table.name} {table.hits} hits, {table.misses} misses ({rate}), {len(table.entries)} entries")
+        for name in sorted(self.impure):
+            lines.append(f"memo: {name} is not pure, and was not memoized")
+        return "\n".join(lines) or "memo: no functions memoized"
@@ -0,0 +1,120 @@
+"""
+Gossip's numeric tower. Numbers are native ints while they are whole, which
+keeps counters and indices on CPython's fast integer paths, and become
+Fractions only when a division leaves a remainder. Both are the same type to
+Gossip: type checks see every number as a Fraction.
+
+A runtime may trade exactness for speed with a NumericMode, representing
+numbers as Decimals rounded to a precision, or as machine floats instead.
+"""
+import decimal
+import operator
+from contextlib import nullcontext
+from decimal import Decimal
+from fractions import Fraction
+from utils.errors import InvalidProgramError
+
+NUMERIC_MODES = ["fraction", "decimal", "float"]
+
+# Every representation of a number is the one Gossip number type.
+NUMBER_TYPES = {int: Fraction, float: Fraction, Decimal: Fraction}
+
+
+def exact(*args) -> int | Fraction:
+    """
+    Builds a number from the arguments Fraction takes, as an int if it is whole.
+    """
+    if len(args) == 1 and type(args[0]) is int:
+        return args[0]
+    value = Fraction(*args)
+    return value.numerator if value.denominator == 1 else value
+
+
+def divide(left, right):
+    """
+    Divides exactly, staying an int when the division leaves no remainder.
+    """
+    if type(left) is int and type(right) is int:
+        if right != 0 and left % right == 0:
+            return left // right
+        return Fraction(left, right)
+    result = left / right
+    if type(result) is Fraction and result.denominator == 1:
+        return result.numerator
+    return result
+
+
+def gossip_type(value) -> type:
+    """
+    The type of a value, as Gossip's type checks see it.
+    """
+    the_type = type(value)
+    return NUMBER_TYPES.get(the_type, the_type)
+
+
+def inclusive_range(start, end, step=1) -> range:
+    """
+    The values of | range(start, end, step) |, from start to end inclusive,
+    as a lazy Python range. Bounds and step are truncated to integers.
+    """
+    start, end, step = int(start), int(end), int(step)
+    if step == 0:
+        raise InvalidProgramError("The step of a range cannot be 0.")
+    return range(start, end + 1 if step > 0 else end - 1, step)
+
+
+class NumericMode():
+    """
+    The representation a runtime gives numbers: "fraction", the exact tower
+    above, "decimal", Decimals rounded to precision significant digits, or
+    "float". Literals are parsed exactly, and converted by number when they
+    are evaluated; arithmetic on converted values stays in the mode, except
+    for division, which is divide.
+
+    Decimal arithmetic rounds to the precision of the thread's current
+    context, so runtimes evaluate programs inside context().
+    """
+    __slots__ = ("name", "precision", "exact", "number", "divide", "decimal")
+
+    def __init__(self, name: str = "fraction", precision: int = 28):
+        if name not in NUMERIC_MODES:
+            raise ValueError(f"Unknown numeric mode '{name}', expected one of {NUMERIC_MODES}.")
+        self.name = name
+        self.precision = precision
+        self.exact = name == "fraction"
+        self.decimal = None
+        if name == "fraction":
+            self.number = exact
+            self.divide = divide
+        elif name == "decimal":
+            self.decimal = decimal.Context(prec=precision)
+            self.number = self.to_decimal
+            self.divide = operator.truediv
+        else:
+            self.number = float
+            self.divide = operator.truediv
+
+    def to_decimal(self, value) -> Decimal:
+        if type(value) is Fraction:
+            return self.decimal.divide(Decimal(value.numerator), Decimal(value.denominator))
+        return self.decimal.create_decimal(value)
+
+    def range(self, start, end, step=1):
+        """
+        Iterates lazily over the values of a range, as numbers of the mode.
+        """
+        values = inclusive_range(start, end, step)
+        return values if self.exact else map(self.number, values)
+
+    def context(self):
+        """
+        Returns a context manager to evaluate programs in.
+        """
+        if self.decimal is None:
+            return nullcontext()
+        return decimal.localcontext(self.decimal)
+
+    def __repr__(self):
+        if self.decimal is not None:
+            return f"NumericMode({self.name!r}, precision={self.precision})"
+        return f"NumericMode({self.name!r})"
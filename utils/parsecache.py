@@ -0,0 +1,235 @@
+"""
+A cache of parsed programs on disk, much like __pycache__. The statements
+parsed from a source are pickled to an entry in a __gossipcache__ directory
+next to it, or in a directory of the user's choosing, and later runs of the
+same source load them instead of lexing and parsing it again.
+
+An entry is keyed by the hash of the source and of the version of the
+interpreter which parsed it, and is evicted once either changes. A
+directory keeps at most max_entries entries, the least recently used going
+first.
+
+Entries are written and read in blocks of BLOCK_SIZE statements, each a run
+of pickles sharing one memo, so that neither parsing nor loading a program
+holds more than a block of it in memory.
+"""
+import hashlib
+import mmap
+import os
+import pickle
+import sys
+import threading
+from typing import BinaryIO, Iterator, Optional
+
+import stream
+import utils.datatypes
+import utils.numbers
+import utils.typechecker
+from stream import Stream, Lexer, Parser
+from utils.datatypes import AST
+
+MAGIC = b"GOSA"
+DIRECTORY = "__gossipcache__"
+EXTENSION = ".gosast"
+BLOCK_SIZE = 256
+
+
+def interpreter_version() -> str:
+    """
+    Identifies the interpreter the ASTs of a cache come from: the Python
+    implementation, which pickles them, and a hash of the modules which lex,
+    parse and define them, and of this one, which lays out the entries, so
+    that any change to those invalidates every entry.
+    """
+    digest = hashlib.sha256()
+    for module in (stream, utils.datatypes, utils.numbers, utils.typechecker, sys.modules[__name__]):
+        with open(module.__file__, "rb") as f:
+            digest.update(f.read())
+    return f"{sys.implementation.cache_tag}-{digest.hexdigest()[:16]}"
+
+
+VERSION = interpreter_version()
+
+
+class ParseCache():
+    """
+    Parses programs through the cache. hits and misses count the programs
+    loaded from an entry and those parsed again; evictions counts the entries
+    removed. A ParseCache may be shared by threads, which count under lock.
+    """
+
+    def __init__(self, directory: str = None, max_entries: int = 256):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def entry_path(self, source_path: str) -> str:
+        """
+        The path of the entry for the source at source_path. Entries in a
+        shared directory are told apart by the hash of the path of their source.
+        """
+        source_path = os.path.abspath(source_path)
+        name = os.path.basename(source_path)
+        if self.directory is None:
+            directory = os.path.join(os.path.dirname(source_path), DIRECTORY)
+        else:
+            directory = self.directory
+            name += "-" + hashlib.sha256(source_path.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(directory, f"{name}.{VERSION}{EXTENSION}")
+
+    def statements(self, source: str | Stream, source_path: str) -> Iterator[AST]:
+        """
+        Generates the statements of the program, from its entry if it is
+        valid, or else by parsing the source, as the caller consumes them.
+        The statements are saved once the whole source has been parsed.
+        """
+        stream = source if isinstance(source, Stream) else Stream.from_string(source)
+        source = stream.source
+        path = self.entry_path(source_path)
+        program = self.load(path, source)
+        loaded = 0
+        if program is not None:
+            self.count(hits=1)
+            try:
+                for statement in program:
+                    yield statement
+                    loaded += 1
+                return
+            except Exception:
+                self.evict(path)
+            # The entry broke off: parse the statements it did not have.
+            self.count(hits=-1)
+
+        self.count(misses=1)
+        # Each process and thread writes a temporary file of its own, which replaces the entry once complete.
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        entry = self.create(temporary)
+        try:
+            for n, statement in enumerate(Parser.from_lexer(Lexer.from_stream(stream))):
+                # Statements are pickled as they are parsed, before anything runs them.
+                if entry is not None:
+                    try:
+                        if n % BLOCK_SIZE == 0:
+                            pickler = pickle.Pickler(entry, pickle.HIGHEST_PROTOCOL)
+                        pickler.dump(statement)
+                    except (RecursionError, pickle.PicklingError, OSError):
+                        entry.close()
+                        self.evict(temporary, count=False)
+                        entry = None
+                if n >= loaded:
+                    yield statement
+            if entry is not None:
+                self.store(path, source, entry)
+        finally:
+            if entry is not None:
+                entry.close()
+                self.evict(temporary, count=False)
+
+    def load(self, path: str, source: str | bytes) -> Optional[Iterator[AST]]:
+        """
+        Opens an entry, and returns the statements it loads a block at a time.
+        Returns None if there is none, and evicts it if it was parsed from
+        another source.
+        """
+        try:
+            f = open(path, "rb")
+        except OSError:
+            return None
+        if f.read(len(MAGIC) + 32) != MAGIC + key(source):
+            f.close()
+            self.evict(path)
+            return None
+        try:
+            os.utime(path)
+            with f:
+                entry = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        entry.seek(len(MAGIC) + 32)
+        return self.blocks(entry)
+
+    def blocks(self, entry: mmap.mmap) -> Iterator[AST]:
+        with entry:
+            size = len(entry)
+            while entry.tell() < size:
+                unpickler = pickle.Unpickler(entry)
+                for _ in range(BLOCK_SIZE):
+                    if entry.tell() == size:
+                        break
+                    yield unpickler.load()
+
+    def create(self, temporary: str) -> Optional[BinaryIO]:
+        """
+        Opens the file an entry is written to until it is complete, with room
+        for its header, or returns None if it cannot be written.
+        """
+        try:
+            os.makedirs(os.path.dirname(temporary), exist_ok=True)
+            entry = open(temporary, "wb")
+            entry.write(bytes(len(MAGIC) + 32))
+            return entry
+        except OSError:
+            return None
+
+    def store(self, path: str, source: str | bytes, entry: BinaryIO):
+        """
+        Completes an entry and moves it into place, then evicts the entries
+        of the same source made by other versions of the interpreter, and the
+        least recently used ones beyond max_entries.
+        """
+        directory = os.path.dirname(path)
+        try:
+            entry.seek(0)
+            entry.write(MAGIC + key(source))
+            entry.close()
+            os.replace(entry.name, path)
+            names = [name for name in os.listdir(directory) if name.endswith(EXTENSION)]
+        except OSError:
+            return
+
+        prefix = os.path.basename(path)[:-len(f".{VERSION}{EXTENSION}")] + "."
+        entries = []
+        for name in names:
+            entry = os.path.join(directory, name)
+            if name.startswith(prefix) and "." not in name[len(prefix):-len(EXTENSION)] and entry != path:
+                self.evict(entry)
+                continue
+            try:
+                entries.append((os.stat(entry).st_mtime, entry))
+            except OSError:
+                pass
+        entries.sort()
+        for _, entry in entries[:max(0, len(entries) - self.max_entries)]:
+            self.evict(entry)
+
+    def evict(self, path: str, count: bool = True):
+        try:
+            os.remove(path)
+            if count:
+                self.count(evictions=1)
+        except OSError:
+            pass
+
+    def count(self, hits: int = 0, misses: int = 0, evictions: int = 0):
+        with self.lock:
+            self.hits += hits
+            self.misses += misses
+            self.evictions += evictions
+
+    def report(self) -> str:
+        hits = "hit" if self.hits == 1 else "hits"
+        misses = "miss" if self.misses == 1 else "misses"
+        return f"parse cache: {self.hits} {hits}, {self.misses} {misses}"
+
+
+def key(source: str | bytes) -> bytes:
+    """
+    The key of the entry for a source, as a string or the bytes of a file:
+    the hash of the source and of the version of the interpreter.
+    """
+    digest = hashlib.sha256(VERSION.encode("utf-8") + b"\0")
+    digest.update(source.encode("utf-8") if isinstance(source, str) else source)
+    return digest.digest()
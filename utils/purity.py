@@ -0,0 +1,63 @@
+"""
+Purity analysis of Gossip functions. A function is pure when its value
+depends on its arguments alone, and calling it has no effect but its value:
+it prints nothing, assigns and conses onto its own variables only, reads no
+variable but its own, and calls pure functions only.
+
+Scoping is dynamic, so a variable a function has not declared itself by the
+time it reads it is one of its caller's, and reading or assigning it makes
+the function impure.
+Calls are resolved dynamically too, so the analysis is given the definition
+of each name of a function, and a name which may stand for more than one
+function makes any function calling it impure.
+"""
+from typing import Iterator, Mapping
+
+from utils.datatypes import Variable, Print, funct_call, funct_def
+from utils.scoping import walk, undeclared_reads
+
+
+class PurityAnalysis:
+    """
+    Decides which functions are pure. definitions maps the name of every
+    function which may be called to its only definition; names missing from
+    it are taken to be impure. Verdicts are kept until forget is called,
+    which should be done whenever definitions changes.
+    """
+    def __init__(self, definitions: Mapping[str, funct_def]):
+        self.definitions = definitions
+        self.verdicts = {}
+
+    def pure(self, function: funct_def, calling: tuple = ()) -> bool:
+        """
+        Returns whether function is pure. calling holds the functions being
+        analysed, which a recursive call assumes pure; a function is then
+        pure if nothing it can reach is impure. Until the outermost of them
+        is decided, only impure verdicts are certain, and kept.
+        """
+        verdict = self.verdicts.get(function)
+        if verdict is not None:
+            return verdict
+        if function in calling:
+            return True
+        verdict = self.analyse(function, calling + (function,))
+        if not verdict or not calling:
+            self.verdicts[function] = verdict
+        return verdict
+
+    def analyse(self, function: funct_def, calling: tuple) -> bool:
+        undeclared = undeclared_reads(function, calls=False)
+        for node in walk(function.body):
+            match node:
+                case Print(_):
+                    return False
+                case Variable(name) if name in undeclared:
+                    return False
+                case funct_call(Variable(name), _):
+                    callee = self.definitions.get(name)
+                    if callee is None or not self.pure(callee, calling):
+                        return False
+        return True
+
+    def forget(self):
+        self.verdicts.clear()
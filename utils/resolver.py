@@ -0,0 +1,332 @@
+from utils.datatypes import ast_node, AST, NumLiteral, BinOp, Variable, Let, If, BoolLiteral, UnOp, ASTSequence, Assign, ForLoop, Range, Print, Declare, While, DoWhile, StringLiteral, ListObject, StringSlice, ListCons, ListOp, funct_call, funct_def, funct_ret, ListIndex
+from utils.scoping import walk, declared_names, undeclared_reads
+
+
+class Scope:
+    """
+    The static layout of a frame: the slot each name declared in it is stored at.
+    Scopes are chained to the scope enclosing them, up to the top level of a
+    program or a function body.
+
+    On the global scope, inner_names holds the names also declared by some
+    scope inside the program, which may shadow a global binding at runtime.
+    A name which is not is always found in the global frame, from any frame.
+    """
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.slots = {}
+        self.inner_names = set()
+
+    def declare(self, name: str) -> int:
+        if name not in self.slots:
+            self.slots[name] = len(self.slots)
+        return self.slots[name]
+
+    def __len__(self):
+        return len(self.slots)
+
+
+"""
+Resolved nodes. Each is a subclass of the node it replaces, so that passes
+matching on the original node types accept resolved programs unchanged.
+"""
+
+
+@ast_node
+class Slot(Variable):
+    """
+    A variable statically bound to a slot of the frame depth frames up.
+    """
+    depth: int = 0
+    slot: int = 0
+
+
+@ast_node
+class ResolvedLet(Let):
+    scope: Scope = None
+
+
+@ast_node
+class ResolvedForLoop(ForLoop):
+    scope: Scope = None
+
+
+@ast_node
+class ResolvedWhile(While):
+    """
+    The condition is tested once before the loop, and then again at the end
+    of every iteration, where it also sees the variables of the iteration:
+    again is the condition resolved in that scope.
+    """
+    scope: Scope = None
+    again: AST = None
+
+
+@ast_node
+class ResolvedDoWhile(DoWhile):
+    scope: Scope = None
+    again: AST = None
+
+
+@ast_node
+class ResolvedFunction(funct_def):
+    scope: Scope = None
+
+
+@ast_node
+class TailCall(funct_call):
+    """
+    A call whose value is the value of the function it is made from. When
+    the function calls itself there, the engines rebind the arguments in the
+    frame of the running call and evaluate the body again, rather than
+    opening a frame for the new call.
+    """
+
+
+def tail_calls(program: AST) -> AST:
+    """
+    Marks the calls in tail position of a function body: the body itself,
+    the value of a functret, the last element of a sequence and the branches
+    of an if. functret does not return early, so only the last element of a
+    sequence is in tail position. Loops and lets are not looked into, since
+    their scopes are still open when their bodies end.
+
+    The nodes in tail position are rebuilt from a stack of their own, so
+    that chains of ifs however long are marked without recursion.
+    """
+    work, results = [(program, False)], []
+    while work:
+        node, built = work.pop()
+        if built:
+            match node:
+                case funct_ret(_):
+                    results.append(funct_ret(results.pop()))
+                case ASTSequence(seq):
+                    results.append(ASTSequence([*seq[:-1], results.pop()], node.type))
+                case If(cond, _, None):
+                    results.append(If(cond, results.pop(), None, node.type))
+                case If(cond, _, _):
+                    e2 = results.pop()
+                    results.append(If(cond, results.pop(), e2, node.type))
+            continue
+        match node:
+            case funct_call(name, arg_val):
+                results.append(TailCall(name, arg_val))
+            case funct_ret(value):
+                work += [(node, True), (value, False)]
+            case ASTSequence(seq) if seq:
+                work += [(node, True), (seq[-1], False)]
+            case If(_, e1, e2):
+                work.append((node, True))
+                if e2 is not None:
+                    work.append((e2, False))
+                work.append((e1, False))
+            case _:
+                results.append(node)
+    return results.pop()
+
+
+def reuses_frame(function: funct_def) -> bool:
+    """
+    Whether the calls function makes of itself in tail position may run in
+    the frame of the call making them. Scoping is dynamic, so a call which
+    reads a name before it is sure to have declared it finds the variable
+    of its caller, and when the caller is the function itself, that is a
+    variable of the frame the call would have emptied. Any other function
+    it calls may read the variables of that frame too, and which function
+    a name calls is only known at runtime, so a function calling others
+    keeps a frame per call.
+    """
+    name = function.name.name
+    if any(type(node) is funct_call and node.name.name != name for node in walk(function.body)):
+        return False
+    return not undeclared_reads(function) & declared_names(function)
+
+
+class Resolver:
+    """
+    Resolves every name in a program to a (depth, slot) pair before it runs,
+    so the runtime can index the arrays of its frames instead of searching
+    dictionaries scope by scope.
+
+    Names are resolved to the innermost scope that has declared them at that
+    point of the program. Gossip scoping is dynamic, so names free in a
+    function body are left as Variables, and looked up through the frames of
+    the callers at runtime.
+    """
+    def __init__(self, scope: Scope = None):
+        self.globals = scope if scope is not None else Scope()
+        self.scope = self.globals
+
+    def resolve(self, program: AST) -> AST:
+        """
+        Resolves a top-level statement, declaring its names in the global scope.
+        """
+        self.scope = self.globals
+        return self.visit(program)
+
+    def lookup(self, name: str, node: Variable = None) -> Variable:
+        depth, scope = 0, self.scope
+        while scope is not None:
+            if name in scope.slots:
+                return Slot(name, getattr(node, "type", None), depth, scope.slots[name])
+            scope = scope.parent
+            depth += 1
+        return Variable(name, getattr(node, "type", None))
+
+    def declare(self, name: str) -> Slot:
+        if self.scope is not self.globals:
+            self.globals.inner_names.add(name)
+        return Slot(name, None, 0, self.scope.declare(name))
+
+    def enter(self, scope: Scope = None) -> Scope:
+        self.scope = scope if scope is not None else Scope(self.scope)
+        return self.scope
+
+    def visit(self, program: AST) -> AST:
+        """
+        Resolves program. The work left is kept on a stack rather than on
+        Python's, so that expressions however deeply nested are resolved:
+        each node pushes the resolution of its children, in the order they
+        run, and a step building the node from what they resolved to.
+        """
+        self.work, self.results = [(self.expand, program)], []
+        while self.work:
+            step, argument = self.work.pop()
+            step(argument)
+        return self.results.pop()
+
+    def then(self, build, *children: AST):
+        """
+        Resolves children in order, then calls build with what they resolved
+        to. What build returns, unless None, is the resolved node.
+        """
+        self.work.append((self.gather, (build, len(children))))
+        self.work.extend((self.expand, child) for child in reversed(children))
+
+    def gather(self, argument: tuple):
+        build, n = argument
+        values = self.results[len(self.results) - n:]
+        del self.results[len(self.results) - n:]
+        node = build(*values)
+        if node is not None:
+            self.results.append(node)
+
+    def expand(self, program: AST):
+        match program:
+            case Variable(name):
+                self.results.append(self.lookup(name, program))
+
+            case Declare(Variable(name), value):
+                self.then(lambda value: Declare(self.declare(name), value), value)
+
+            case Assign(Variable(name), expression):
+                var = self.lookup(name)
+                self.then(lambda expression: Assign(var, expression), expression)
+
+            case Let(Variable(name), e1, e2):
+                def bind(e1):
+                    outer = self.scope
+                    scope = self.enter()
+                    var = self.declare(name)
+
+                    def build(e2):
+                        self.scope = outer
+                        return ResolvedLet(var, e1, e2, scope)
+                    self.then(build, e2)
+                self.then(bind, e1)
+
+            case ForLoop(Variable(name), val_list, stat):
+                def bind(val_list):
+                    outer = self.scope
+                    scope = self.enter()
+                    var = self.declare(name)
+
+                    def build(stat):
+                        self.scope = outer
+                        return ResolvedForLoop(var, val_list, stat, scope)
+                    self.then(build, stat)
+                self.then(bind, val_list)
+
+            case While(cond, seq):
+                def loop(first):
+                    outer = self.scope
+                    scope = self.enter()
+
+                    def build(seq, again):
+                        self.scope = outer
+                        return ResolvedWhile(first, seq, scope, again)
+                    self.then(build, seq, cond)
+                self.then(loop, cond)
+
+            case DoWhile(seq, cond):
+                outer = self.scope
+                scope = self.enter()
+
+                def leave(seq, again):
+                    self.scope = outer
+                    self.then(lambda cond: ResolvedDoWhile(seq, cond, scope, again), cond)
+                self.then(leave, seq, cond)
+
+            case funct_def(Variable(name), var_list, body):
+                jumps = reuses_frame(program)
+                var = self.declare(name)
+                outer = self.scope
+                scope = self.enter(Scope())
+                for param in var_list:
+                    self.declare(param.name)
+
+                def build(body):
+                    self.scope = outer
+                    return ResolvedFunction(var, var_list, tail_calls(body) if jumps else body, scope)
+                self.then(build, body)
+
+            case funct_call(Variable(name), arg_val):
+                var = self.lookup(name)
+                self.then(lambda *args: funct_call(var, list(args)), *arg_val)
+
+            case If(cond, e1, None):
+                self.then(lambda cond, e1: If(cond, e1, None, program.type), cond, e1)
+
+            case If(cond, e1, e2):
+                self.then(lambda cond, e1, e2: If(cond, e1, e2, program.type), cond, e1, e2)
+
+            case ASTSequence(seq):
+                self.then(lambda *seq: ASTSequence(list(seq), program.type), *seq)
+
+            case BinOp(op, left, right):
+                self.then(lambda left, right: BinOp(op, left, right, program.type), left, right)
+
+            case UnOp(op, right):
+                self.then(lambda right: UnOp(op, right), right)
+
+            case Print(value):
+                self.then(Print, value)
+
+            case funct_ret(value):
+                self.then(funct_ret, value)
+
+            case Range(start, end, None):
+                self.then(lambda start, end: Range(start, end, None, program.type), start, end)
+
+            case Range(start, end, step):
+                self.then(lambda start, end, step: Range(start, end, step, program.type), start, end, step)
+
+            case StringSlice(var, start, end):
+                self.then(StringSlice, var, start, end)
+
+            case ListObject(elements, element_type):
+                self.then(lambda *elements: ListObject(list(elements), element_type), *elements)
+
+            case ListCons(to_add, base_list):
+                self.then(ListCons, to_add, base_list)
+
+            case ListOp(op, base_list):
+                self.then(lambda base_list: ListOp(op, base_list, program.index), base_list)
+
+            case ListIndex(index, base_list):
+                self.then(ListIndex, index, base_list)
+
+            case _:
+                # Literals, and anything the runtime will reject, are left as they are.
+                self.results.append(program)
@@ -0,0 +1,132 @@
+"""
+Static analysis of Gossip's dynamic scoping. A function reads its own
+variable when it has declared it by the time it reads it; otherwise the
+name is looked up through the frames of its callers, and it reads theirs.
+undeclared_reads tells which names a function may read from its callers,
+for the passes which must not change what those reads find.
+"""
+from typing import Iterator
+
+from utils.datatypes import AST, BinOp, Variable, Let, If, UnOp, ASTSequence, Assign, ForLoop, Range, Print, Declare, While, DoWhile, ListObject, StringSlice, ListCons, ListOp, funct_call, funct_def, funct_ret, ListIndex
+
+
+def children(node: AST) -> list:
+    """
+    The subexpressions of a node evaluated as part of it. The body of a
+    function definition is not, nor is the name of a called function.
+    """
+    match node:
+        case ASTSequence(seq):
+            return list(seq)
+        case ListObject(elements, _):
+            return list(elements)
+        case funct_call(_, arg_val):
+            return list(arg_val)
+        case funct_def(name, _, _):
+            return [name]
+        case BinOp(_, left, right):
+            return [left, right]
+        case UnOp(_, right):
+            return [right]
+        case If(cond, e1, e2):
+            return [cond, e1] + ([e2] if e2 is not None else [])
+        case Let(var, e1, e2):
+            return [var, e1, e2]
+        case Declare(var, value):
+            return [var, value]
+        case Assign(var, expression):
+            return [var, expression]
+        case ForLoop(var, val_list, stat):
+            return [var, val_list, stat]
+        case While(cond, seq) | DoWhile(seq, cond):
+            return [cond, seq]
+        case Print(value) | funct_ret(value):
+            return [value]
+        case Range(start, end, step):
+            return [start, end] + ([step] if step is not None else [])
+        case StringSlice(var, start, end):
+            return [var, start, end]
+        case ListCons(to_add, base_list):
+            return [to_add, base_list]
+        case ListOp(_, base_list):
+            return [base_list]
+        case ListIndex(index, base_list):
+            return [index, base_list]
+    return []
+
+
+def walk(node: AST) -> Iterator[AST]:
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(children(node))
+
+
+def declared_names(function: funct_def) -> set:
+    """
+    The names a function declares: its parameters, and the variables and
+    functions declared in its body.
+    """
+    names = {param.name for param in function.var_list}
+    for node in walk(function.body):
+        match node:
+            case Declare(Variable(name), _) | Let(Variable(name), _, _) | ForLoop(Variable(name), _, _) | funct_def(Variable(name), _, _):
+                names.add(name)
+    return names
+
+
+def undeclared_reads(function: funct_def, calls: bool = True) -> set:
+    """
+    The names the body of function reads, assigns or, if calls, calls at a
+    point where it may not have declared them, so that they may be found in
+    the frame of a caller. A declaration holds from where it runs to the
+    end of its scope; if does not open a scope, so one made in a branch of
+    an if holds after it only if the other branch makes it too.
+    """
+    reads = set()
+    scan(function.body, {param.name for param in function.var_list}, reads, calls)
+    return reads
+
+
+def scan(node: AST, declared: set, reads: set, calls: bool) -> set:
+    """
+    Adds the names node reads before they are declared to reads, given the
+    names declared before it runs, and returns those declared once it has.
+    """
+    match node:
+        case ASTSequence(seq):
+            for ast in seq:
+                declared = scan(ast, declared, reads, calls)
+        case Declare(Variable(name), value):
+            declared = scan(value, declared, reads, calls) | {name}
+        case Assign(Variable(name), expression):
+            declared = scan(expression, declared, reads, calls)
+            if name not in declared:
+                reads.add(name)
+        case funct_def(Variable(name), _, _):
+            # The body is a function of its own, which reads from the frames of its callers.
+            declared = declared | {name}
+        case If(cond, e1, e2):
+            declared = scan(cond, declared, reads, calls)
+            then = scan(e1, declared, reads, calls)
+            declared = then & scan(e2, declared, reads, calls) if e2 is not None else declared
+        case Let(Variable(name), e1, e2):
+            declared = scan(e1, declared, reads, calls)
+            scan(e2, declared | {name}, reads, calls)
+        case ForLoop(Variable(name), val_list, stat):
+            declared = scan(val_list, declared, reads, calls)
+            scan(stat, declared | {name}, reads, calls)
+        case While(cond, seq) | DoWhile(seq, cond):
+            # The scope of the body is opened again for every iteration, and the condition may run before it.
+            scan(cond, declared, reads, calls)
+            scan(seq, declared, reads, calls)
+        case _:
+            # Expressions declare nothing that outlives them, so their names are read where they stand.
+            for child in walk(node):
+                match child:
+                    case Variable(name) if name not in declared:
+                        reads.add(name)
+                    case funct_call(Variable(name), _) if calls and name not in declared:
+                        reads.add(name)
+    return declared
@@ -1,7 +1,51 @@
 from dataclasses import dataclass
-from utils.datatypes import AST, NumLiteral, BinOp, Variable, Let, Value, If, BoolLiteral, UnOp, ASTSequence, NumType, BoolType
+from fractions import Fraction
+from typing import Optional
+from utils.datatypes import AST, NumLiteral, BinOp, Variable, Let, Value, If, BoolLiteral, UnOp, ASTSequence, NumType, BoolType, StringLiteral, StringSlice, ListObject, ListCons, ListOp, ListIndex
 from utils.errors import TypeCheckError
 
+
+def value_type(node: AST) -> Optional[type]:
+    """
+    The type of the value of an expression, as gossip_type gives it, when it
+    follows from the expression alone. Returns None when it depends on the
+    values of variables or calls, or when evaluating the expression fails.
+    """
+    match node:
+        case NumLiteral(_):
+            return Fraction
+        case BoolLiteral(_):
+            return bool
+        case StringLiteral(_) | StringSlice(_, _, _):
+            return str
+        case ListObject(_, _) | ListCons(_, _) | ListOp("tail", _):
+            return list
+        case ListOp("is-empty?", _):
+            return bool
+        case ListOp("head", ListObject(_, element_type)) | ListIndex(_, ListObject(_, element_type)):
+            return element_type
+        case BinOp(op, _, _) if op in ["==", "!=", "<", ">", "<=", ">="]:
+            return bool
+        case BinOp(op, left, right) if op in ["&&", "||"]:
+            if value_type(left) is bool and value_type(right) is bool:
+                return bool
+        case BinOp("+", left, right):
+            left = value_type(left)
+            if left in (Fraction, str, list) and value_type(right) is left:
+                return left
+        case BinOp(op, left, right) if op in ["-", "*", "/", "%"]:
+            if value_type(left) is Fraction and value_type(right) is Fraction:
+                return Fraction
+        case UnOp("-", right):
+            if value_type(right) is Fraction:
+                return Fraction
+        case If(_, e1, e2):
+            e1 = value_type(e1)
+            if e1 is not None and value_type(e2) is e1:
+                return e1
+    return None
+
+
 class StaticTypeChecker:
     def __init__(self):
         pass
@@ -59,6 +103,6 @@ class StaticTypeChecker:
             
             case Let(var, e1, e2):
                 e1 = self.check(e1)
-                var.type = e1.type
+                var = Variable(var.name, e1.type)
                 e2 = self.check(e2)
                 return Let(var, e1, e2)
\ No newline at end of file
@@ -27,13 +27,11 @@ from utils.datatypes import (
     Print,
 )
 from core import RuntimeEnvironment
+from utils.flatast import Cursor
 import graphviz as gv
 from math import floor
 
-dot = gv.Digraph()
-dot.node_attr.update(shape="box", style="rounded")
 node_id = "node_{}"
-depth = 0
 
 
 class ASTViz:
@@ -41,6 +39,9 @@ class ASTViz:
     An visualizer for Abstract Syntax Trees. Uses graphviz to create a visual representation of the AST.
     Recursively traverses the AST with the treebuilder method.
 
+    Each visualizer draws on a graph of its own, dot, so that visualizers
+    on different threads do not draw on each other's graphs.
+
     Parameters
     ----------
     depth: int
@@ -52,38 +53,41 @@ class ASTViz:
 
     def __init__(self, depth: int = 0, code=None):
         self.depth = depth
-        dot.clear(keep_attrs=False)
-        dot.attr(label=code)
+        self.dot = gv.Digraph()
+        self.dot.node_attr.update(shape="box", style="rounded")
+        self.dot.attr(label=code)
 
     def treebuilder(self, node: AST, depth: int = 0):
         """
-        Takes an AST and returns a treebuilder for that AST.
+        Takes an AST, or a Cursor for a node of a FlatAST, and returns a treebuilder for that AST.
         """
+        dot = self.dot
         id = node_id.format(self.depth)
         self.depth += 1
+        kind = node.kind if isinstance(node, Cursor) else type(node)
 
-        if type(node) == If:
+        if kind == If:
             dot.node(id, "If", shape="diamond")
             dot.edge(id, self.treebuilder(node.cond, self.depth))
             dot.edge(id, self.treebuilder(node.e1, self.depth))
             dot.edge(id, self.treebuilder(node.e2, self.depth))
 
-        if type(node) == While:
+        if kind == While:
             dot.node(id, "While", shape="invtriangle")
             dot.edge(id, self.treebuilder(node.cond, self.depth))
             dot.edge(id, self.treebuilder(node.seq, self.depth))
 
-        if type(node) == ForLoop:
+        if kind == ForLoop:
             dot.node(id, "For", shape="invtriangle")
             dot.edge(id, self.treebuilder(node.var, self.depth))
             dot.edge(id, self.treebuilder(node.val_list, self.depth))
             dot.edge(id, self.treebuilder(node.stat, self.depth))
 
-        if type(node) == Print:
+        if kind == Print:
             dot.node(id, "Print")
             dot.edge(id, self.treebuilder(node.value, self.depth))
 
-        if type(node) == ASTSequence:
+        if kind == ASTSequence:
             dot.node(id, "Sequence", shape="square")
             AST_id = "AST_{}_{}"
             past_node = id
@@ -94,28 +98,25 @@ class ASTViz:
                 dot.edge(past_node, current_node)
                 past_node = current_node
 
-        if type(node) == Range:
-            dot.node(id, f"{floor(node.start.value)}")
-            range_id = "range_{}_{}"
-            past_node = id
-            for _ in range(floor(node.start.value) + 1, floor(node.end.value)):
-                current_node = range_id.format(_, self.depth)
-                dot.node(current_node, f"{_}")
-                dot.edge(past_node, current_node)
-                past_node = current_node
+        if kind == Range:
+            dot.node(id, "Range")
+            dot.edge(id, self.treebuilder(node.start, self.depth))
+            dot.edge(id, self.treebuilder(node.end, self.depth))
+            if node.step is not None:
+                dot.edge(id, self.treebuilder(node.step, self.depth))
 
-        if type(node) == Declare:
+        if kind == Declare:
             dot.node(id, "Declare")
             dot.edge(id, self.treebuilder(node.var, self.depth))
             dot.edge(id, self.treebuilder(node.value, self.depth))
 
-        if type(node) == Variable:
+        if kind == Variable:
             dot.node(id, node.name)
 
-        if type(node) == NumLiteral:
+        if kind == NumLiteral:
             dot.node(id, str(node.value))
 
-        if type(node) == BinOp:
+        if kind == BinOp:
             dot.node(id, node.operator)
             dot.edge(id, self.treebuilder(node.left, self.depth))
             dot.edge(id, self.treebuilder(node.right, self.depth))